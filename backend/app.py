@@ -1,48 +1,85 @@
+import os
+
+import click
 from flask import Flask
 from flask_cors import CORS
 from config import Config
 from models import db
-from routes.articles import articles_bp
-from routes.rewrite import rewrite_bp
-import os
 
-app = Flask(__name__)
-app.config.from_object(Config)
 
-# Enable CORS for all routes
-# Allow all origins for production (Render) to work with Vercel deployments
-# This is safe for a public API
+def create_app(config=Config):
+    """Build the Flask app.
+
+    Creating the app never touches the database: run ``flask --app app
+    upgrade-db`` (or ``python migrations.py``) to create and upgrade the
+    schema, or set AUTO_MIGRATE=true to do it here. Heavy service modules
+    (HTTP client, HTML parsers, numpy, the Cohere SDK) are imported on
+    first use, so worker start-up only pays for Flask and SQLAlchemy.
+    """
+    from migrations import upgrade_schema
+    from routes.articles import articles_bp
+    from routes.metrics import metrics_bp
+    from routes.rewrite import rewrite_bp
+    from services import tracing
+    from services.job_queue import batch_queue, rewrite_queue
+
+    app = Flask(__name__)
+    app.config.from_object(config)
+
+    # Enable CORS for all routes
+    # Allow all origins for production (Render) to work with Vercel deployments
+    # This is safe for a public API
+
+    # Check multiple ways to detect production environment
+    is_production = (
+        os.getenv("RENDER") is not None or  # Render sets this
+        os.getenv("FLASK_ENV") == "production" or
+        os.getenv("ENVIRONMENT") == "production" or
+        not os.getenv("FLASK_DEBUG", "").lower() == "true"
+    )
+
+    # For now, always allow all origins to ensure it works
+    # You can restrict this later if needed by uncommenting the production check
+    CORS(app, resources={r"/api/*": {"origins": "*"}})
+
+    # Alternative: Uncomment below to restrict in development
+    # if is_production:
+    #     CORS(app, resources={r"/api/*": {"origins": "*"}})
+    # else:
+    #     allowed_origins = [
+    #         "http://localhost:8080",
+    #         "http://127.0.0.1:8080",
+    #         "https://assignment-liart-two-59.vercel.app",
+    #     ]
+    #     CORS(app, resources={r"/api/*": {"origins": allowed_origins}})
 
-# Check multiple ways to detect production environment
-is_production = (
-    os.getenv("RENDER") is not None or  # Render sets this
-    os.getenv("FLASK_ENV") == "production" or
-    os.getenv("ENVIRONMENT") == "production" or
-    not os.getenv("FLASK_DEBUG", "").lower() == "true"
-)
+    db.init_app(app)
+    rewrite_queue.init_app(app)
+    batch_queue.init_app(app)
+    tracing.init_app(app)
 
-# For now, always allow all origins to ensure it works
-# You can restrict this later if needed by uncommenting the production check
-CORS(app, resources={r"/api/*": {"origins": "*"}})
+    if config.AUTO_MIGRATE:
+        with app.app_context():
+            upgrade_schema()
 
-# Alternative: Uncomment below to restrict in development
-# if is_production:
-#     CORS(app, resources={r"/api/*": {"origins": "*"}})
-# else:
-#     allowed_origins = [
-#         "http://localhost:8080",
-#         "http://127.0.0.1:8080",
-#         "https://assignment-liart-two-59.vercel.app",
-#     ]
-#     CORS(app, resources={r"/api/*": {"origins": allowed_origins}})
+    @app.cli.command("upgrade-db")
+    def upgrade_db():
+        """Create missing tables and apply pending migrations."""
+        upgrade_schema()
+        click.echo("[SUCCESS] Database schema is up to date.")
 
-db.init_app(app)
+    app.register_blueprint(articles_bp, url_prefix="/api/articles")
+    app.register_blueprint(rewrite_bp, url_prefix="/api/rewrite")
+    app.register_blueprint(metrics_bp)
+    return app
 
-with app.app_context():
-    db.create_all()
 
-app.register_blueprint(articles_bp, url_prefix="/api/articles")
-app.register_blueprint(rewrite_bp, url_prefix="/api/rewrite")
+# Module-level app for `gunicorn app:app` and `flask --app app`
+app = create_app()
 
 if __name__ == "__main__":
+    # Local development server: make sure the schema exists before serving
+    from migrations import upgrade_schema
+    with app.app_context():
+        upgrade_schema()
     app.run(debug=True)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark GET /api/articles/ and /api/articles/search on a large archive.
+
+Builds a throwaway SQLite database with N synthetic articles and compares the
+full list response against keyset-paginated and sparse-fieldset requests,
+reporting response time, peak Python memory (tracemalloc) and body size.
+
+Usage (from the backend directory):
+    python benchmarks/bench_articles_list.py --articles 100000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def build_app(db_path):
+    # Point the app at the throwaway database before it is imported
+    os.environ["DATABASE_URL"] = "sqlite:///" + db_path
+    # Per-request trace lines would swamp the report
+    os.environ.setdefault("TRACE_LOG", "false")
+    from app import create_app
+    from migrations import upgrade_schema
+    app = create_app()
+    with app.app_context():
+        upgrade_schema()
+    return app
+
+
+def populate(app, count, content_size):
+    from models import db, Article
+    paragraph = ("Synthetic archive content for benchmarking list endpoints. " * 40)[:content_size]
+    with app.app_context():
+        db.session.execute(
+            Article.__table__.insert(),
+            [
+                {
+                    "title": f"Article {i}",
+                    "content": paragraph,
+                    "source_url": f"https://example.com/blogs/article-{i}/",
+                    "type": "original" if i % 2 else "updated",
+                    "references": ["https://a.example.com", "https://b.example.com"],
+                }
+                for i in range(count)
+            ],
+        )
+        db.session.commit()
+
+
+def measure(client, url, repeat):
+    timings = []
+    peak = 0
+    size = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        started = time.perf_counter()
+        response = client.get(url)
+        body = response.get_data()
+        timings.append(time.perf_counter() - started)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        size = len(body)
+        assert response.status_code == 200, (url, response.status_code)
+    return min(timings), peak, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=100000)
+    parser.add_argument("--content-size", type=int, default=2000, help="characters of content per article")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_app(os.path.join(tmp, "bench.db"))
+        print(f"Populating {args.articles} articles...")
+        populate(app, args.articles, args.content_size)
+        client = app.test_client()
+
+        cases = [
+            ("full list", "/api/articles/"),
+            ("full list, id/title/type", "/api/articles/?fields=id,title,type"),
+            ("page of 50", "/api/articles/?limit=50"),
+            ("page of 50, id/title/type", "/api/articles/?limit=50&fields=id,title,type"),
+            ("deep page of 50", f"/api/articles/?limit=50&cursor={args.articles - 100}"),
+            ("page of 50, type=original", "/api/articles/?limit=50&type=original"),
+            ("full-text search, top 20", "/api/articles/search?q=article+4999&limit=20"),
+        ]
+        print(f"{'case':<28} {'time (ms)':>10} {'peak mem (MB)':>14} {'body (KB)':>10}")
+        for name, url in cases:
+            # Full-list responses are slow enough that one run is representative
+            repeat = args.repeat if "limit" in url else 1
+            seconds, peak, size = measure(client, url, repeat)
+            print(f"{name:<28} {seconds * 1000:>10.1f} {peak / 1e6:>14.1f} {size / 1e3:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of scrape -> rewrite -> read against local fake upstreams.
+
+Starts the fake blog, Serper and Cohere servers from fake_services.py, runs
+the app in a child process (threaded WSGI server, fresh SQLite database)
+pointed at them, and drives it over HTTP:
+
+    scrape   POST /api/articles/scrape for --articles posts
+    rewrite  POST /api/rewrite/<id> for --rewrites articles, each polled until
+             its job finishes (latency is submit -> job done)
+    read     --concurrency clients mixing GET /api/articles/?limit=50 and
+             GET /api/articles/<id> for --duration seconds
+
+Each phase reports requests, errors, requests per second and p50/p95/p99
+latency; the app process's peak RSS is reported at the end. Results are
+saved as JSON (--output) so runs can be compared.
+
+Usage (from the backend directory):
+    python benchmarks/bench_e2e.py --articles 50 --rewrites 20 --concurrency 8
+    python benchmarks/bench_e2e.py --cohere-latency 1.5 --error-rate 0.05 --output before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import requests  # noqa: E402
+from fake_services import BlogHandler, CohereHandler, FakeService, SerperHandler, ServiceProfile  # noqa: E402
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+
+def serve(port):
+    """Child process: run the app on ``port`` until killed."""
+    sys.path.insert(0, BACKEND_DIR)
+    from werkzeug.serving import make_server
+    from app import create_app
+    from migrations import upgrade_schema
+
+    app = create_app()
+    with app.app_context():
+        upgrade_schema()
+    make_server("127.0.0.1", port, app, threaded=True).serve_forever()
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = max(1, round(p / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies, errors, elapsed):
+    values = sorted(latencies)
+    total = len(values) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "rps": round(total / elapsed, 2) if elapsed else None,
+        **{f"p{p}_ms": round(percentile(values, p) * 1000, 1) if values else None for p in (50, 95, 99)},
+    }
+
+
+def peak_rss_kb(pid):
+    """Peak resident set size of a live process (Linux), or None."""
+    try:
+        with open(f"/proc/{pid}/status", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class AppProcess:
+    def __init__(self, env, log_path):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.port = s.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.log_path = log_path
+        # Logs go to a file: an undrained pipe would block the server once it fills up
+        self.log = open(log_path, "w", encoding="utf-8")
+        self.process = subprocess.Popen(
+            [sys.executable, "-W", "ignore", os.path.abspath(__file__), "--serve", str(self.port)],
+            cwd=BACKEND_DIR, env=env, stdout=self.log, stderr=subprocess.STDOUT,
+        )
+
+    def log_tail(self, size=2000):
+        with open(self.log_path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()[-size:]
+
+    def wait_ready(self, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"App exited during start-up:\n{self.log_tail()}")
+            try:
+                if requests.get(f"{self.url}/metrics", timeout=1).status_code == 200:
+                    return
+            except requests.RequestException:
+                time.sleep(0.1)
+        raise RuntimeError("App did not start in time")
+
+    def stop(self):
+        """Stop the app; returns its peak RSS in KB."""
+        rss = peak_rss_kb(self.process.pid)
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.log.close()
+        if rss is None:
+            import resource
+            rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        return rss
+
+
+def run_scrape(base, articles):
+    started = time.perf_counter()
+    response = requests.post(f"{base}/api/articles/scrape", json={"limit": articles}, timeout=600)
+    elapsed = time.perf_counter() - started
+    ok = response.status_code == 200
+    result = summarize([elapsed] if ok else [], 0 if ok else 1, elapsed)
+    if ok:
+        body = response.json()
+        result.update(scraped=body["scraped"], added=body["added"], articles_per_second=round(body["scraped"] / elapsed, 2))
+    return result
+
+
+def run_rewrites(base, article_ids, concurrency, poll_interval):
+    def rewrite(article_id):
+        session = requests.Session()
+        started = time.perf_counter()
+        response = session.post(f"{base}/api/rewrite/{article_id}", json={}, timeout=60)
+        if response.status_code != 202:
+            return None
+        job_url = f"{base}/api/rewrite/jobs/{response.json()['id']}"
+        while True:
+            job = session.get(job_url, timeout=60).json()
+            if job["status"] in TERMINAL_STATUSES:
+                return time.perf_counter() - started if job["status"] == "succeeded" else None
+            time.sleep(poll_interval)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(rewrite, article_ids))
+    elapsed = time.perf_counter() - started
+    latencies = [o for o in outcomes if o is not None]
+    return summarize(latencies, len(outcomes) - len(latencies), elapsed)
+
+
+def run_reads(base, article_ids, concurrency, duration):
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies = []
+    errors = [0]
+
+    def client(index):
+        session = requests.Session()
+        n = index
+        own = []
+        own_errors = 0
+        while not stop.is_set():
+            n += 1
+            if n % 2:
+                url = f"{base}/api/articles/{article_ids[n % len(article_ids)]}"
+            else:
+                url = f"{base}/api/articles/?limit=50"
+            started = time.perf_counter()
+            try:
+                ok = session.get(url, headers={"Accept-Encoding": "gzip"}, timeout=30).status_code == 200
+            except requests.RequestException:
+                ok = False
+            if ok:
+                own.append(time.perf_counter() - started)
+            else:
+                own_errors += 1
+        with lock:
+            latencies.extend(own)
+            errors[0] += own_errors
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, errors[0], time.perf_counter() - started)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=50, help="posts on the fake blog, all of them scraped")
+    parser.add_argument("--rewrites", type=int, default=20, help="articles to rewrite")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients for rewrites and reads")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of read load")
+    parser.add_argument("--poll-interval", type=float, default=0.1, help="seconds between job status polls")
+    parser.add_argument("--blog-latency", type=float, default=0.05)
+    parser.add_argument("--serper-latency", type=float, default=0.3)
+    parser.add_argument("--cohere-latency", type=float, default=1.0)
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of upstream requests failing with 503")
+    parser.add_argument("--page-bytes", type=int, default=20000, help="text per blog/reference page")
+    parser.add_argument("--completion-bytes", type=int, default=6000, help="text per Cohere completion")
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/e2e-<time>.json)")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    def profile(latency, payload):
+        return ServiceProfile(latency=latency, jitter=args.jitter, error_rate=args.error_rate, payload_bytes=payload)
+
+    blog = FakeService(BlogHandler, profile(args.blog_latency, args.page_bytes), posts=args.articles).start()
+    serper = FakeService(SerperHandler, profile(args.serper_latency, 2000), reference_base=f"{blog.url}/refs/").start()
+    cohere = FakeService(CohereHandler, profile(args.cohere_latency, args.completion_bytes)).start()
+
+    results = {"phases": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+            CACHE_DB_PATH=os.path.join(tmp, "cache.db"),
+            SIMILARITY_INDEX_DIR=os.path.join(tmp, "similarity_index"),
+            NEAR_DUPLICATE_INDEX_DIR=os.path.join(tmp, "near_duplicate_index"),
+            BLOG_BASE_URL=f"{blog.url}/blogs/",
+            SERPER_URL=f"{serper.url}/search",
+            SERPER_API_KEY="bench",
+            COHERE_BASE_URL=cohere.url,
+            COHERE_API_KEY="bench",
+            SCRAPER_MAX_LIMIT=str(max(args.articles, 500)),
+        )
+        env.setdefault("TRACE_LOG", "false")
+        app = AppProcess(env, os.path.join(tmp, "app.log"))
+        try:
+            app.wait_ready()
+            base = app.url
+
+            results["phases"]["scrape"] = run_scrape(base, args.articles)
+            ids = [a["id"] for a in requests.get(f"{base}/api/articles/?type=original", timeout=60).json()]
+            if not ids:
+                raise RuntimeError("The scrape phase stored no articles")
+            results["phases"]["rewrite"] = run_rewrites(base, ids[:args.rewrites], args.concurrency, args.poll_interval)
+            ids = [a["id"] for a in requests.get(f"{base}/api/articles/", timeout=60).json()]
+            results["phases"]["read"] = run_reads(base, ids, args.concurrency, args.duration)
+        finally:
+            results["peak_rss_mb"] = round(app.stop() / 1024, 1)
+            for service in (blog, serper, cohere):
+                service.stop()
+
+    results["upstreams"] = {"blog": blog.counters(), "serper": serper.counters(), "cohere": cohere.counters()}
+    results["settings"] = {k: v for k, v in vars(args).items() if k not in ("serve", "output")}
+    results["environment"] = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+    print(f"{'phase':<8} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, phase in results["phases"].items():
+        cells = [f"{phase[k]:>9}" if phase[k] is not None else f"{'-':>9}" for k in ("p50_ms", "p95_ms", "p99_ms")]
+        print(f"{name:<8} {phase['requests']:>8} {phase['errors']:>6} {phase['rps']:>8} {' '.join(cells)}")
+    print(f"app peak RSS: {results['peak_rss_mb']} MB")
+
+    output = args.output or os.path.join(
+        BENCH_DIR, "results", f"e2e-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark HTML extraction over saved page fixtures.
+
+Each fixture ``name.html`` comes with ``name.expected.txt`` holding the
+article title on the first line and the main text below it. The previous
+BeautifulSoup extraction is compared against services.html_extract with
+every installed backend, reporting pages per second, MB/s, how often the
+title matched and the word-level precision/recall/F1 of the content
+against the expected text (boilerplate such as comments and footers
+lowers precision, missed paragraphs lower recall).
+
+Usage (from the backend directory):
+    python benchmarks/bench_html_extract.py --repeat 20
+    python benchmarks/bench_html_extract.py --fixtures /path/to/saved/pages
+"""
+
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+from services import html_extract  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "html")
+WORD_RE = re.compile(r"\w+")
+
+
+def legacy_extract(html):
+    """The extraction previously inlined in scraper.parse_article_page."""
+    psoup = BeautifulSoup(html, "html.parser")
+    title = psoup.find("h1")
+    if not title:
+        title = psoup.find("title")
+    content = "\n\n".join(p.get_text().strip() for p in psoup.find_all("p") if len(p.get_text().strip()) > 50)
+    if not content or len(content) < 100:
+        article_divs = psoup.find_all("div", class_=lambda x: x and ("article" in x.lower() or "content" in x.lower() or "post" in x.lower()))
+        for div in article_divs:
+            div_text = div.get_text().strip()
+            if len(div_text) > 100:
+                content = div_text
+                break
+    return {"title": title.get_text().strip() if title else None, "content": content}
+
+
+def load_fixtures(directory):
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            html = f.read()
+        expected = None
+        expected_path = path[:-len(".html")] + ".expected.txt"
+        if os.path.exists(expected_path):
+            with open(expected_path, "r", encoding="utf-8") as f:
+                title, _, content = f.read().partition("\n")
+            expected = {"title": title.strip(), "content": content}
+        fixtures.append((os.path.basename(path), html, expected))
+    return fixtures
+
+
+def word_scores(extracted, expected):
+    got = Counter(WORD_RE.findall(extracted.lower()))
+    want = Counter(WORD_RE.findall(expected.lower()))
+    overlap = sum((got & want).values())
+    precision = overlap / sum(got.values()) if got else 0.0
+    recall = overlap / sum(want.values()) if want else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1
+
+
+def run(name, extract, fixtures, repeat):
+    total_bytes = sum(len(html.encode("utf-8")) for _, html, _ in fixtures)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for _, html, _ in fixtures:
+            extract(html)
+    elapsed = time.perf_counter() - started
+
+    titles = 0
+    scores = []
+    for _, html, expected in fixtures:
+        if expected is None:
+            continue
+        result = extract(html)
+        titles += (result["title"] or "").strip() == expected["title"]
+        scores.append(word_scores(result["content"] or "", expected["content"]))
+
+    pages = len(fixtures) * repeat
+    row = f"{name:<24} {pages / elapsed:>9.1f} {total_bytes * repeat / elapsed / 1e6:>7.2f}"
+    if scores:
+        precision, recall, f1 = (sum(s[i] for s in scores) / len(scores) for i in range(3))
+        row += f" {titles:>4}/{len(scores):<3} {precision:>9.3f} {recall:>7.3f} {f1:>6.3f}"
+    print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="directory of .html files (and optional .expected.txt)")
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the corpus for the timing")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        sys.exit(f"No .html fixtures in {args.fixtures}")
+    size = sum(len(html) for _, html, _ in fixtures) / 1e3
+    print(f"{len(fixtures)} fixtures, {size:.0f} KB, {args.repeat} passes")
+    print(f"{'extractor':<24} {'pages/s':>9} {'MB/s':>7} {'titles':>8} {'precision':>9} {'recall':>7} {'F1':>6}")
+
+    run("legacy bs4", legacy_extract, fixtures, args.repeat)
+    for name in html_extract.available_backends():
+        backend = html_extract.get_backend(name)
+        run(f"html_extract {name}", lambda html, b=backend: html_extract.extract_article(html, b), fixtures, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
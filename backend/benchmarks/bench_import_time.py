@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Import-time profile of the app module, i.e. what a fresh worker pays to boot.
+
+Runs ``python -X importtime -c "import app"`` in fresh interpreters, reports
+the median cumulative import time of ``app`` and of the slowest top-level
+packages, and checks that the heavy service dependencies (HTTP client,
+HTML parsers, numpy) are not imported until first use. Exits non-zero when
+one of them is loaded eagerly or the median exceeds ``--budget-ms``, so it
+can run as a CI check.
+
+Usage (from the backend directory):
+    python benchmarks/bench_import_time.py --runs 5 --top 15
+    python benchmarks/bench_import_time.py --budget-ms 800 --json import_time.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded lazily by the services that need them; importing app must not pull them in
+LAZY_MODULES = ("requests", "urllib3", "bs4", "lxml", "selectolax", "numpy", "cohere")
+
+
+def profile_once(module):
+    """Return (wall seconds, {top-level package: cumulative µs}, root cumulative µs)."""
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.gettempdir(), "bench_import_time.db"))
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    wall = time.perf_counter() - started
+
+    packages = {}
+    root = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        name = name.strip()
+        cumulative = int(cumulative_us)
+        if name == module:
+            root = cumulative
+        # A package's outermost import includes its submodules, so keep the largest
+        top = name.split(".")[0]
+        packages[top] = max(packages.get(top, 0), cumulative)
+    return wall, packages, root
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app", help="module to import")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to sample")
+    parser.add_argument("--top", type=int, default=15, help="slowest packages to list")
+    parser.add_argument("--budget-ms", type=float, help="fail when the median import time exceeds this")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    # The first run warms the bytecode cache; it is not counted
+    profile_once(args.module)
+    samples = [profile_once(args.module) for _ in range(args.runs)]
+
+    import_ms = statistics.median(root for _, _, root in samples) / 1000
+    wall_ms = statistics.median(wall for wall, _, _ in samples) * 1000
+    packages = {}
+    for _, run_packages, _ in samples:
+        for name, cumulative in run_packages.items():
+            packages.setdefault(name, []).append(cumulative)
+    package_ms = {name: statistics.median(values) / 1000 for name, values in packages.items()}
+    eager = sorted(name for name in LAZY_MODULES if name in package_ms)
+
+    print(f"import {args.module}: {import_ms:.1f} ms median over {args.runs} runs "
+          f"(interpreter start + import: {wall_ms:.1f} ms)")
+    print(f"{'package':<28} {'cumulative ms':>13}")
+    for name, ms in sorted(package_ms.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{name:<28} {ms:>13.1f}")
+
+    failures = []
+    if eager:
+        failures.append(f"imported eagerly: {', '.join(eager)}")
+    if args.budget_ms is not None and import_ms > args.budget_ms:
+        failures.append(f"{import_ms:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "module": args.module,
+                "runs": args.runs,
+                "import_ms": round(import_ms, 1),
+                "wall_ms": round(wall_ms, 1),
+                "packages_ms": {name: round(ms, 1) for name, ms in package_ms.items()},
+                "eager_lazy_modules": eager,
+                "failures": failures,
+            }, f, indent=2)
+
+    for failure in failures:
+        print(f"[FAIL] {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark scrape_oldest_articles against a local fixture blog server.
+
+The server serves an index page linking to N synthetic blog posts and sleeps
+for a fixed latency on every request to simulate a remote host. The concurrent
+scraper is compared against the old one-request-at-a-time loop.
+
+Usage (from the backend directory):
+    python benchmarks/bench_scraper.py --articles 50 200 --latency 0.05
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+from services import scraper  # noqa: E402
+
+PARAGRAPH = (
+    "Customer support automation works best when the assistant has access to "
+    "accurate, up to date knowledge about the product and its policies. "
+)
+
+
+def make_handler(total, latency):
+    class BlogHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency)
+            if self.path.rstrip("/") == "/blogs":
+                links = "".join(f'<a href="/blogs/post-{i}/">Post {i}</a>' for i in range(total))
+                body = f"<html><body><nav>{links}</nav></body></html>"
+            elif self.path.startswith("/blogs/post-"):
+                post = self.path.strip("/").split("-")[-1]
+                paragraphs = "".join(f"<p>{PARAGRAPH * 3} ({post}.{n})</p>" for n in range(40))
+                body = (
+                    f"<html><head><title>Post {post}</title></head><body>"
+                    f"<div class='header'><a href='/'>Home</a></div>"
+                    f"<article><h1>Synthetic post {post}</h1>{paragraphs}</article>"
+                    f"<footer><p>Copyright</p></footer></body></html>"
+                )
+            else:
+                self.send_response(404)
+                self.end_headers()
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return BlogHandler
+
+
+def sequential_scrape(base_url, limit):
+    """The original implementation: one fresh requests.get per page, parsed inline."""
+    response = requests.get(base_url, timeout=10)
+    links = scraper.extract_blog_links(response.text, base_url)[-limit:]
+    articles = []
+    for url in links:
+        page = requests.get(url, timeout=10)
+        article = scraper.parse_article_page(url, page.text)
+        if article:
+            articles.append(article)
+    return articles
+
+
+def run(total, latency):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(total, latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/blogs/"
+
+    try:
+        # Warm the parse pool so process start-up is not billed to the first run
+        scraper.scrape_oldest_articles(limit=1, base_url=base_url)
+
+        started = time.perf_counter()
+        old = sequential_scrape(base_url, total)
+        sequential_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        new = scraper.scrape_oldest_articles(limit=total, base_url=base_url)
+        concurrent_time = time.perf_counter() - started
+    finally:
+        server.shutdown()
+
+    assert len(old) == len(new) == total, (len(old), len(new))
+    return sequential_time, concurrent_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--latency", type=float, default=0.05, help="per-request server latency in seconds")
+    args = parser.parse_args()
+
+    print(f"{'articles':>8} {'sequential (s)':>15} {'concurrent (s)':>15} {'speedup':>8}")
+    for total in args.articles:
+        sequential_time, concurrent_time = run(total, args.latency)
+        print(f"{total:>8} {sequential_time:>15.2f} {concurrent_time:>15.2f} {sequential_time / concurrent_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
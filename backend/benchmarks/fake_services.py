@@ -0,0 +1,214 @@
+"""
+Local stand-ins for the services the backend talks to, for benchmarks.
+
+Each fake runs a ThreadingHTTPServer on 127.0.0.1 with its own
+ServiceProfile: a fixed latency plus random jitter per request, the share
+of requests that fail with a 503, and the size of the payload it returns.
+
+    blog    GET /blogs/ (index of every post), GET /blogs/post-<n>/ and
+            GET /refs/<n> (reference pages that search results point to)
+    serper  POST /search, answering like google.serper.dev
+    cohere  POST /v2/chat, plain or streamed like api.cohere.com
+
+Point the app at them with BLOG_BASE_URL, SERPER_URL and COHERE_BASE_URL.
+"""
+
+import json
+import random
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PARAGRAPH = (
+    "Customer support automation works best when the assistant has access to "
+    "accurate, up to date knowledge about the product and its policies. "
+)
+
+
+@dataclass
+class ServiceProfile:
+    latency: float = 0.0  # seconds added to every request
+    jitter: float = 0.0  # up to this many extra seconds, uniformly random
+    error_rate: float = 0.0  # share of requests answered with 503
+    payload_bytes: int = 8000  # approximate size of the page, result list or completion
+
+
+def _paragraphs(seed, size):
+    """About ``size`` bytes of <p> paragraphs that differ per ``seed``.
+
+    The words are shuffled per seed so that pages are not near-duplicates
+    of each other (the app links or skips those instead of rewriting them).
+    """
+    rng = random.Random(seed)
+    words = (PARAGRAPH * 2).split()
+    out = []
+    total = 0
+    n = 0
+    while total < size:
+        rng.shuffle(words)
+        text = f"{' '.join(words)} (section {seed}.{n})"
+        out.append(f"<p>{text}</p>")
+        total += len(text) + 7
+        n += 1
+    return "".join(out)
+
+
+class _FakeHandler(BaseHTTPRequestHandler):
+    profile = ServiceProfile()
+    stats = None  # per-server counters, set by FakeService
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _delay_or_fail(self):
+        """Apply the profile's latency; returns False after sending an injected error."""
+        with self.stats["lock"]:
+            self.stats["requests"] += 1
+        delay = self.profile.latency + random.uniform(0, self.profile.jitter)
+        if delay:
+            time.sleep(delay)
+        if random.random() < self.profile.error_rate:
+            with self.stats["lock"]:
+                self.stats["errors"] += 1
+            self._send(503, b'{"message": "injected failure"}', "application/json")
+            return False
+        return True
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class BlogHandler(_FakeHandler):
+    posts = 50
+
+    def do_GET(self):
+        if not self._delay_or_fail():
+            return
+        path = self.path.split("?")[0].rstrip("/")
+        if path == "/blogs":
+            # Newest first, like the real blog, so the oldest posts are at the end
+            links = "".join(
+                f'<li><a href="/blogs/post-{i}/">Post {i}</a></li>' for i in reversed(range(self.posts))
+            )
+            body = f"<html><body><nav><ul>{links}</ul></nav></body></html>"
+        elif path.startswith("/blogs/post-") or path.startswith("/refs/"):
+            name = path.rsplit("/", 1)[-1]
+            body = (
+                f"<html><head><title>{name}</title></head><body>"
+                f"<div class='header'><a href='/'>Home</a></div>"
+                f"<article><h1>Synthetic page {name}</h1>"
+                f"{_paragraphs(name, self.profile.payload_bytes)}</article>"
+                f"<footer><p>Copyright</p></footer></body></html>"
+            )
+        else:
+            self._send(404, b"not found", "text/plain")
+            return
+        self._send(200, body.encode("utf-8"), "text/html; charset=utf-8")
+
+
+class SerperHandler(_FakeHandler):
+    reference_base = ""  # where the result links point, e.g. the blog fake's /refs/
+
+    def do_POST(self):
+        query = self._read_json().get("q", "")
+        if not self._delay_or_fail():
+            return
+        seed = zlib.crc32(query.encode("utf-8"))
+        organic = []
+        size = 0
+        position = 1
+        # Always at least a few results; larger payloads just mean more of them
+        while position <= 3 or size < self.profile.payload_bytes:
+            item = {
+                "title": f"Result {position} for {query}",
+                "link": f"{self.reference_base}{seed}-{position}",
+                "snippet": PARAGRAPH,
+                "position": position,
+            }
+            organic.append(item)
+            size += len(json.dumps(item))
+            position += 1
+        body = json.dumps({"searchParameters": {"q": query}, "organic": organic})
+        self._send(200, body.encode("utf-8"), "application/json")
+
+
+class CohereHandler(_FakeHandler):
+    def do_POST(self):
+        request = self._read_json()
+        if not self._delay_or_fail():
+            return
+        words = (PARAGRAPH.split() * (self.profile.payload_bytes // len(PARAGRAPH) + 1))
+        text = " ".join(words)[:self.profile.payload_bytes]
+        message_id = uuid.uuid4().hex
+        usage = {
+            "billed_units": {"input_tokens": 1000, "output_tokens": len(text) // 4},
+            "tokens": {"input_tokens": 1000, "output_tokens": len(text) // 4},
+        }
+        if request.get("stream"):
+            self._stream(message_id, text, usage)
+            return
+        body = {
+            "id": message_id,
+            "finish_reason": "COMPLETE",
+            "message": {"role": "assistant", "content": [{"type": "text", "text": text}]},
+            "usage": usage,
+        }
+        self._send(200, json.dumps(body).encode("utf-8"), "application/json")
+
+    def _stream(self, message_id, text, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(data):
+            self.wfile.write(f"event: {data['type']}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+
+        event({"type": "message-start", "id": message_id, "delta": {"message": {"role": "assistant"}}})
+        event({"type": "content-start", "index": 0, "delta": {"message": {"content": {"type": "text", "text": ""}}}})
+        for start in range(0, len(text), 64):
+            event({"type": "content-delta", "index": 0, "delta": {"message": {"content": {"text": text[start:start + 64]}}}})
+            self.wfile.flush()
+        event({"type": "content-end", "index": 0})
+        event({"type": "message-end", "delta": {"finish_reason": "COMPLETE", "usage": usage}})
+
+
+class FakeService:
+    """One fake upstream on its own port; use as a context manager or start()/stop()."""
+
+    def __init__(self, handler, profile, **attrs):
+        self.stats = {"requests": 0, "errors": 0, "lock": threading.Lock()}
+        handler_class = type(handler.__name__, (handler,), dict(attrs, profile=profile, stats=self.stats))
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def counters(self):
+        return {"requests": self.stats["requests"], "errors": self.stats["errors"]}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
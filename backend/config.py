@@ -5,9 +5,154 @@ load_dotenv()  # 👈 THIS IS CRITICAL
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 
+def _database_url():
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        return "sqlite:///" + os.path.join(BASE_DIR, "database.db")
+    # Render/Heroku hand out postgres:// URLs, which SQLAlchemy no longer accepts
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    return url
+
+def _is_memory_sqlite(url):
+    if not url.startswith("sqlite"):
+        return False
+    database = url.split("://", 1)[-1].lstrip("/").split("?", 1)[0]
+    return database in ("", ":memory:") or "mode=memory" in url
+
+def _engine_options(url):
+    options = {}
+    # In-memory SQLite gets a single shared connection (StaticPool), which
+    # rejects queue pool sizing arguments
+    if not _is_memory_sqlite(url):
+        options.update(
+            pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        )
+    if url.startswith("sqlite"):
+        # Busy timeout in seconds; the PRAGMAs are applied per connection in models.py
+        options["connect_args"] = {"timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")) / 1000}
+    else:
+        options["pool_recycle"] = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+        options["pool_pre_ping"] = True
+    return options
+
 class Config:
-    SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(BASE_DIR, "database.db")
+    SQLALCHEMY_DATABASE_URI = _database_url()
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # SQLite connection settings (ignored for other databases)
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+    ARTICLES_PAGE_SIZE = int(os.getenv("ARTICLES_PAGE_SIZE", "50"))
+    ARTICLES_MAX_PAGE_SIZE = int(os.getenv("ARTICLES_MAX_PAGE_SIZE", "500"))
+
     SERPER_API_KEY = os.getenv("SERPER_API_KEY")
     COHERE_API_KEY = os.getenv("COHERE_API_KEY")
+
+    # Upstream endpoints; overridden to point at local stand-ins in benchmarks
+    BLOG_BASE_URL = os.getenv("BLOG_BASE_URL", "https://beyondchats.com/blogs/")
+    SERPER_URL = os.getenv("SERPER_URL", "https://google.serper.dev/search")
+    COHERE_BASE_URL = os.getenv("COHERE_BASE_URL", os.getenv("CO_API_URL"))  # None uses the SDK's default
+
+    # LLM model routing: models in preference order, plus health tracking
+    LLM_MODELS = [
+        m.strip()
+        for m in os.getenv("LLM_MODELS", "command-r7b-12-2024,command-r-plus,command-r,command-r7b").split(",")
+        if m.strip()
+    ]
+    LLM_UNAVAILABLE_TTL = int(os.getenv("LLM_UNAVAILABLE_TTL", "3600"))
+    LLM_MAX_ERROR_RATE = float(os.getenv("LLM_MAX_ERROR_RATE", "0.5"))
+    LLM_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+    LLM_CIRCUIT_RESET_SECONDS = int(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))
+    # Token budget shared by both reference articles in the prompt; 0 disables trimming
+    PROMPT_REFERENCE_TOKEN_BUDGET = int(os.getenv("PROMPT_REFERENCE_TOKEN_BUDGET", "3000"))
+
+    # HTML parser backend: auto (fastest installed), lxml, selectolax or bs4
+    HTML_PARSER = os.getenv("HTML_PARSER", "auto")
+
+    # Shared outbound HTTP client (scraping, reference fetching, search)
+    HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+    # Upper bound on a whole download, however slowly the body trickles in
+    HTTP_MAX_DURATION = float(os.getenv("HTTP_MAX_DURATION", "30"))
+    HTTP_MAX_RESPONSE_BYTES = int(os.getenv("HTTP_MAX_RESPONSE_BYTES", str(5 * 1024 * 1024)))
+    HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+    HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+    HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "8"))
+    HTTP_PER_HOST_CONCURRENCY = int(os.getenv("HTTP_PER_HOST_CONCURRENCY", os.getenv("SCRAPER_PER_HOST_LIMIT", "8")))
+    # Requests started per second against one host; 0 means unlimited
+    HTTP_PER_HOST_RATE = float(os.getenv("HTTP_PER_HOST_RATE", "0"))
+
+    # Scraper concurrency
+    SCRAPER_MAX_WORKERS = int(os.getenv("SCRAPER_MAX_WORKERS", "16"))
+    SCRAPER_PARSE_PROCESSES = int(os.getenv("SCRAPER_PARSE_PROCESSES", str(os.cpu_count() or 1)))
+    SCRAPER_TIMEOUT = float(os.getenv("SCRAPER_TIMEOUT", "10"))
+    SCRAPER_MAX_LIMIT = int(os.getenv("SCRAPER_MAX_LIMIT", "500"))
+
+    # Reference content fetching and caching
+    FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "10"))
+    CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", os.path.join(BASE_DIR, "cache.db"))
+    CONTENT_CACHE_TTL = int(os.getenv("CONTENT_CACHE_TTL", str(24 * 3600)))
+    CONTENT_CACHE_MAX_ENTRIES = int(os.getenv("CONTENT_CACHE_MAX_ENTRIES", "1000"))
+    SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", str(7 * 24 * 3600)))
+    SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000"))
+
+    # Response cache for GET /api/articles; RESPONSE_CACHE_URL (redis://...) shares it between processes
+    RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL")
+    RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "300"))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+    RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+
+    # Similarity index used to pick database fallback references
+    SIMILARITY_INDEX_DIR = os.getenv("SIMILARITY_INDEX_DIR", os.path.join(BASE_DIR, "similarity_index"))
+    SIMILARITY_DIM = int(os.getenv("SIMILARITY_DIM", "256"))
+    SIMILARITY_COMPACT_ROWS = int(os.getenv("SIMILARITY_COMPACT_ROWS", "1000"))
+    # Between full reconciles, indexes only read new and locally written rows
+    INDEX_RECONCILE_SECONDS = float(os.getenv("INDEX_RECONCILE_SECONDS", "300"))
+
+    # Near-duplicate detection (MinHash signatures banded into an LSH index).
+    # NEAR_DUPLICATE_ACTION decides what ingestion does with a new original
+    # that matches an existing one: "link" (store it with duplicate_of set),
+    # "skip" (do not store it) or "off".
+    NEAR_DUPLICATE_ACTION = os.getenv("NEAR_DUPLICATE_ACTION", "link").lower()
+    NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+    NEAR_DUPLICATE_INDEX_DIR = os.getenv("NEAR_DUPLICATE_INDEX_DIR", os.path.join(BASE_DIR, "near_duplicate_index"))
+    MINHASH_PERMUTATIONS = int(os.getenv("MINHASH_PERMUTATIONS", "128"))
+    LSH_BANDS = int(os.getenv("LSH_BANDS", "16"))
+
+    # Create/upgrade the schema when the app is created instead of as a separate step
+    AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "false").lower() == "true"
+
+    # Tracing: one JSON line per request/job with its spans; per-request sampling profiles
+    TRACE_LOG = os.getenv("TRACE_LOG", "false").lower() == "true"
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+    PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(BASE_DIR, "profiles"))
+
+    # Background rewrite jobs
+    REWRITE_WORKERS = int(os.getenv("REWRITE_WORKERS", "4"))
+    REWRITE_QUEUE_SIZE = int(os.getenv("REWRITE_QUEUE_SIZE", "100"))
+    REWRITE_RETRY_AFTER = int(os.getenv("REWRITE_RETRY_AFTER", "30"))
+    REWRITE_JOB_STALE_SECONDS = int(os.getenv("REWRITE_JOB_STALE_SECONDS", "600"))
+    REWRITE_EVENTS_POLL_INTERVAL = float(os.getenv("REWRITE_EVENTS_POLL_INTERVAL", "0.5"))
+
+    # Batch rewrite stage concurrency
+    BATCH_SEARCH_CONCURRENCY = int(os.getenv("BATCH_SEARCH_CONCURRENCY", "4"))
+    BATCH_FETCH_CONCURRENCY = int(os.getenv("BATCH_FETCH_CONCURRENCY", "8"))
+    BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "2"))
+    # Upper bound for the per-request *_concurrency overrides of a batch
+    BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))
+    BATCH_MAX_ARTICLES = int(os.getenv("BATCH_MAX_ARTICLES", "200"))
+    # Batches waiting for the background batch worker before submissions get a 503
+    BATCH_QUEUE_SIZE = int(os.getenv("BATCH_QUEUE_SIZE", "10"))
+
+    # NDJSON archive export/import: rows per cursor batch and records per transaction
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+    IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
@@ -1,39 +1,60 @@
 #!/usr/bin/env python3
 """
 Initialize a fresh database for new users.
-This script will delete the existing database and create a new empty one.
+This script will delete the configured database (DATABASE_URL, or
+backend/database.db by default) and create a new empty one.
 """
 
 import os
-from app import app, db
+
+from sqlalchemy import inspect, text
+
+from app import create_app
+from migrations import upgrade_schema
+from models import db
+
+
+def _drop_database(url):
+    """Delete a SQLite file (with its WAL files), or drop every table of another database."""
+    db.engine.dispose()
+    if url.get_backend_name() == "sqlite" and url.database and url.database != ":memory:":
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(url.database + suffix):
+                os.remove(url.database + suffix)
+        return
+    db.drop_all()
+    with db.engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS schema_version"))
+
 
 def init_database():
     """Initialize a fresh database"""
-    db_path = os.path.join(os.path.dirname(__file__), "database.db")
-    
-    # Check if database exists
-    if os.path.exists(db_path):
-        print(f"[INFO] Existing database found at: {db_path}")
-        response = input("Do you want to delete it and create a fresh database? (y/n): ")
-        if response.lower() != 'y':
-            print("[CANCELLED] Database initialization cancelled.")
-            return
-        
-        # Delete existing database
-        try:
-            os.remove(db_path)
-            print(f"[OK] Deleted existing database: {db_path}")
-        except Exception as e:
-            print(f"[ERROR] Failed to delete database: {e}")
-            return
-    
-    # Create new database
+    app = create_app()
     with app.app_context():
-        db.create_all()
+        url = db.engine.url
+        location = url.render_as_string(hide_password=True)
+
+        # Check if database exists
+        if inspect(db.engine).has_table("article"):
+            print(f"[INFO] Existing database found at: {location}")
+            response = input("Do you want to delete it and create a fresh database? (y/n): ")
+            if response.lower() != 'y':
+                print("[CANCELLED] Database initialization cancelled.")
+                return
+
+            # Delete existing database
+            try:
+                _drop_database(url)
+                print(f"[OK] Deleted existing database: {location}")
+            except Exception as e:
+                print(f"[ERROR] Failed to delete database: {e}")
+                return
+
+        # Create new database
+        upgrade_schema()
         print("[SUCCESS] Fresh database created successfully!")
         print("[INFO] Database is now empty and ready for new articles.")
         print("[INFO] Use the 'Scrape Articles' feature to populate it.")
 
 if __name__ == "__main__":
     init_database()
-
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Maintenance commands for the article database.
+
+Usage:
+    python manage.py import-articles dump.jsonl[.gz] [--chunk-size 1000] [--no-update]
+    python manage.py export-articles dump.jsonl[.gz] [--type original] [--batch-size 500]
+    python manage.py crawl [--max-pages 500] [--restart] [--no-update]
+    python manage.py dedupe-rewrites [--dry-run]
+    python manage.py cluster-duplicates [--threshold 0.8] [--dry-run]
+"""
+
+import argparse
+import sys
+
+from app import app
+from config import Config
+from services.archive import export_chunks, import_ndjson, open_archive
+from services.crawler import crawl_blog
+from services.near_duplicates import cluster_duplicates as link_near_duplicates
+from services.rewrite_cache import dedupe_updated_articles
+
+
+def import_articles(args):
+    """Load a JSONL dump of articles (gzipped if it ends in .gz), one transaction per chunk."""
+    with app.app_context(), open_archive(args.path, "rb") as f:
+        totals = import_ndjson(
+            f,
+            chunk_size=args.chunk_size,
+            update_changed=not args.no_update,
+            on_chunk=lambda number, counts: print(f"[INFO] Chunk {number}: {counts}"),
+        )
+    print(f"[SUCCESS] Import finished: {totals}")
+
+
+def export_articles(args):
+    """Stream the articles to a JSONL file (gzipped if it ends in .gz)."""
+    written = 0
+    with app.app_context(), open_archive(args.path, "wb") as f:
+        for chunk in export_chunks(article_type=args.type, batch_size=args.batch_size):
+            f.write(chunk)
+            written += chunk.count(b"\n")
+    print(f"[SUCCESS] Exported {written} article(s) to {args.path}")
+
+
+def crawl(args):
+    """Run (or resume) an incremental crawl of the blog archive."""
+    with app.app_context():
+        summary = crawl_blog(max_pages=args.max_pages, restart=args.restart, update_changed=not args.no_update)
+    print(f"[SUCCESS] Crawl {'paused' if summary['pending'] else 'finished'}: {summary}")
+
+
+def dedupe_rewrites(args):
+    """Remove duplicate updated articles and link the rest to their originals."""
+    with app.app_context():
+        counts = dedupe_updated_articles(dry_run=args.dry_run)
+    print(f"[SUCCESS] {'Would remove' if args.dry_run else 'Removed'} {counts['duplicates']} duplicate(s): {counts}")
+
+
+def cluster_duplicates(args):
+    """Link near-duplicate originals to the oldest article of their cluster."""
+    with app.app_context():
+        counts = link_near_duplicates(threshold=args.threshold, dry_run=args.dry_run, batch_size=args.batch_size)
+    print(f"[SUCCESS] {counts['duplicates']} near-duplicate(s) in {counts['clusters']} cluster(s)"
+          f"{' (dry run)' if args.dry_run else ''}: {counts}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Article database maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import-articles", help="Bulk upsert articles from a JSONL file")
+    importer.add_argument("path", help="JSONL file with one article object per line (.gz is decompressed)")
+    importer.add_argument("--chunk-size", type=int, default=Config.IMPORT_CHUNK_SIZE, help="Articles per transaction")
+    importer.add_argument("--no-update", action="store_true", help="Skip existing source_urls even if their content changed")
+    importer.set_defaults(func=import_articles)
+
+    exporter = commands.add_parser("export-articles", help="Stream all articles to a JSONL file")
+    exporter.add_argument("path", help="Output file; a .gz suffix writes it gzip-compressed")
+    exporter.add_argument("--type", help="Only export articles of this type (original or updated)")
+    exporter.add_argument("--batch-size", type=int, default=Config.EXPORT_BATCH_SIZE, help="Rows fetched per cursor batch")
+    exporter.set_defaults(func=export_articles)
+
+    crawler = commands.add_parser("crawl", help="Incrementally crawl the whole blog archive")
+    crawler.add_argument("--max-pages", type=int, help="Stop after this many pages; the next run resumes")
+    crawler.add_argument("--restart", action="store_true", help="Start a fresh pass even if a crawl is unfinished")
+    crawler.add_argument("--no-update", action="store_true", help="Do not update articles whose content changed")
+    crawler.set_defaults(func=crawl)
+
+    deduper = commands.add_parser("dedupe-rewrites", help="Collapse duplicate updated articles")
+    deduper.add_argument("--dry-run", action="store_true", help="Only report what would be removed")
+    deduper.set_defaults(func=dedupe_rewrites)
+
+    clusterer = commands.add_parser("cluster-duplicates", help="Find near-duplicate originals and link them")
+    clusterer.add_argument("--threshold", type=float, help="Estimated Jaccard similarity to count as a duplicate (default: NEAR_DUPLICATE_THRESHOLD)")
+    clusterer.add_argument("--batch-size", type=int, default=Config.EXPORT_BATCH_SIZE, help="Articles read and signed per batch")
+    clusterer.add_argument("--dry-run", action="store_true", help="Only report the clusters")
+    clusterer.set_defaults(func=cluster_duplicates)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+In-place schema upgrades for existing databases.
+
+db.create_all() creates missing tables but never changes existing ones, so
+databases created by older versions are brought up to date here. Each
+migration runs once, in order, and is recorded in the schema_version table.
+Migrations must also be safe on a fresh database that create_all() has
+already built with the current schema.
+
+Run directly to upgrade the configured database:
+    python migrations.py
+"""
+
+import json
+
+from sqlalchemy import inspect, text
+
+from models import db, Article, content_hash
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return register
+
+
+def _create_indexes(conn, table, names):
+    """Create the model's indexes with the given names unless they already exist."""
+    existing = {index["name"] for index in inspect(conn).get_indexes(table.name)}
+    for index in table.indexes:
+        if index.name in names and index.name not in existing:
+            index.create(conn)
+
+
+@migration(1, "Index article.type, unique article.source_url, JSON references")
+def _article_indexes_and_json_references(conn):
+    article = Article.__table__
+
+    # The unique index needs one row per source_url: the oldest keeps it and
+    # later rows lose only the URL, so no article (or rewrite of it) is lost
+    conflicts = conn.execute(text(
+        "SELECT id, source_url FROM article WHERE source_url IS NOT NULL AND id NOT IN ("
+        " SELECT MIN(id) FROM article WHERE source_url IS NOT NULL GROUP BY source_url)"
+        " ORDER BY id"
+    )).fetchall()
+    for article_id, url in conflicts:
+        conn.execute(text("UPDATE article SET source_url = NULL WHERE id = :id"), {"id": article_id})
+        print(f"[MIGRATE] Cleared duplicate source_url of article {article_id}: {url}")
+    if conflicts:
+        print(f"[MIGRATE] Cleared the source_url of {len(conflicts)} article(s) sharing it with an older one")
+
+    _create_indexes(conn, article, {"ix_article_type", "ix_article_source_url"})
+
+    # Legacy rows store references as "url1,url2"; rewrite them as JSON arrays
+    rows = conn.execute(text(
+        'SELECT id, "references" FROM article WHERE "references" IS NOT NULL'
+    )).fetchall()
+    converted = 0
+    for article_id, value in rows:
+        if isinstance(value, list):
+            continue
+        try:
+            if isinstance(json.loads(value), list):
+                continue
+        except (TypeError, ValueError):
+            pass
+        refs = [ref.strip() for ref in str(value).split(",") if ref.strip()]
+        conn.execute(
+            text('UPDATE article SET "references" = :refs WHERE id = :id'),
+            {"refs": json.dumps(refs), "id": article_id},
+        )
+        converted += 1
+    if converted:
+        print(f"[MIGRATE] Converted references of {converted} article(s) to JSON")
+
+
+@migration(2, "Add article.content_hash")
+def _article_content_hash(conn):
+    columns = {column["name"] for column in inspect(conn).get_columns("article")}
+    if "content_hash" not in columns:
+        conn.execute(text("ALTER TABLE article ADD COLUMN content_hash VARCHAR(64)"))
+    _create_indexes(conn, Article.__table__, {"ix_article_content_hash"})
+
+    rows = conn.execute(text("SELECT id, title, content FROM article WHERE content_hash IS NULL")).fetchall()
+    for article_id, title, content in rows:
+        conn.execute(
+            text("UPDATE article SET content_hash = :hash WHERE id = :id"),
+            {"hash": content_hash(title, content), "id": article_id},
+        )
+    if rows:
+        print(f"[MIGRATE] Computed content hashes for {len(rows)} article(s)")
+
+
+@migration(3, "Full-text search index on article title and content")
+def _article_fts(conn):
+    # FTS5 is SQLite-only; other databases fall back to LIKE queries
+    if conn.dialect.name != "sqlite":
+        return
+    statements = [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS article_fts USING fts5(
+               title, content, content='article', content_rowid='id', tokenize='porter unicode61'
+           )""",
+        # Triggers keep the index in sync for every write path, including bulk inserts
+        """CREATE TRIGGER IF NOT EXISTS article_fts_insert AFTER INSERT ON article BEGIN
+               INSERT INTO article_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS article_fts_delete AFTER DELETE ON article BEGIN
+               INSERT INTO article_fts (article_fts, rowid, title, content)
+               VALUES ('delete', old.id, old.title, old.content);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS article_fts_update AFTER UPDATE OF title, content ON article BEGIN
+               INSERT INTO article_fts (article_fts, rowid, title, content)
+               VALUES ('delete', old.id, old.title, old.content);
+               INSERT INTO article_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+           END""",
+        "INSERT INTO article_fts (article_fts) VALUES ('rebuild')",
+    ]
+    for statement in statements:
+        conn.execute(text(statement))
+
+
+@migration(4, "Add article.parent_id, article.rewrite_key and rewrite_job.force")
+def _rewrite_cache_columns(conn):
+    columns = {column["name"] for column in inspect(conn).get_columns("article")}
+    if "parent_id" not in columns:
+        conn.execute(text("ALTER TABLE article ADD COLUMN parent_id INTEGER"))
+    if "rewrite_key" not in columns:
+        conn.execute(text("ALTER TABLE article ADD COLUMN rewrite_key VARCHAR(64)"))
+    _create_indexes(conn, Article.__table__, {"ix_article_parent_id", "ix_article_rewrite_key"})
+
+    if "force" not in {column["name"] for column in inspect(conn).get_columns("rewrite_job")}:
+        conn.execute(text("ALTER TABLE rewrite_job ADD COLUMN force BOOLEAN DEFAULT FALSE"))
+
+
+@migration(5, "Add article.duplicate_of")
+def _article_duplicate_of(conn):
+    if "duplicate_of" not in {column["name"] for column in inspect(conn).get_columns("article")}:
+        conn.execute(text("ALTER TABLE article ADD COLUMN duplicate_of INTEGER"))
+    _create_indexes(conn, Article.__table__, {"ix_article_duplicate_of"})
+
+
+def upgrade_schema():
+    """Create missing tables and apply pending migrations. Needs an app context."""
+    db.create_all()
+    with db.engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER PRIMARY KEY)"))
+        applied = {row[0] for row in conn.execute(text("SELECT version FROM schema_version"))}
+
+    for version, description, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in applied:
+            continue
+        with db.engine.begin() as conn:
+            fn(conn)
+            conn.execute(text("INSERT INTO schema_version (version) VALUES (:v)"), {"v": version})
+        print(f"[MIGRATE] Applied migration {version}: {description}")
+
+
+if __name__ == "__main__":
+    from app import create_app
+
+    with create_app().app_context():
+        upgrade_schema()
+        print("[SUCCESS] Database schema is up to date.")
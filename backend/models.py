@@ -1,22 +1,150 @@
+import hashlib
+import sqlite3
+from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import validates
+from config import Config
 
 db = SQLAlchemy()
 
+@event.listens_for(Engine, "connect")
+def _configure_sqlite(dbapi_connection, connection_record):
+    """WAL lets readers proceed while a writer commits; the busy timeout makes
+    writers wait for the lock instead of failing with "database is locked"."""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={Config.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={Config.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={int(Config.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.close()
+
+def parse_references(value):
+    """Normalize references given as a list or a legacy comma-separated string."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [ref.strip() for ref in value.split(",") if ref.strip()]
+    return [str(ref) for ref in value]
+
+def content_hash(title, content):
+    return hashlib.sha256(f"{title}\n{content}".encode("utf-8")).hexdigest()
+
 class Article(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    source_url = db.Column(db.String(500))
-    type = db.Column(db.String(20), default="original")  # original | updated
-    references = db.Column(db.Text)  # comma-separated URLs
+    source_url = db.Column(db.String(500), unique=True, index=True)
+    type = db.Column(db.String(20), default="original", index=True)  # original | updated
+    references = db.Column(db.JSON)  # list of URLs
+    content_hash = db.Column(db.String(64), index=True)  # sha256 of title + content
+    parent_id = db.Column(db.Integer, index=True)  # original article an updated one was rewritten from
+    rewrite_key = db.Column(db.String(64), index=True)  # hash of the rewrite inputs, see services.rewrite_cache
+    duplicate_of = db.Column(db.Integer, index=True)  # original this one is a near-duplicate of, see services.near_duplicates
 
-    def to_dict(self):
+    FIELDS = ("id", "title", "content", "type", "source_url", "references", "parent_id", "duplicate_of")
+
+    def to_dict(self, fields=None):
+        # Only touch the requested attributes so deferred columns stay unloaded
+        if fields is not None:
+            return {field: self._field_value(field) for field in fields}
         return {
             "id": self.id,
             "title": self.title,
             "content": self.content,
             "type": self.type,
             "source_url": self.source_url,
-            "references": self.references.split(",") if self.references else []
+            "references": self.references or [],
+            "parent_id": self.parent_id,
+            "duplicate_of": self.duplicate_of,
     }
 
+    def _field_value(self, field):
+        if field == "references":
+            return self.references or []
+        return getattr(self, field)
+
+    @validates("references")
+    def _validate_references(self, key, value):
+        return parse_references(value)
+
+@event.listens_for(Article, "before_insert")
+@event.listens_for(Article, "before_update")
+def _set_content_hash(mapper, connection, target):
+    state = inspect(target)
+    if state.persistent and not (
+        state.attrs.title.history.has_changes() or state.attrs.content.history.has_changes()
+    ):
+        return
+    target.content_hash = content_hash(target.title, target.content)
+
+class RewriteJob(db.Model):
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    article_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), default="queued", index=True)  # queued | running | succeeded | failed
+    stage = db.Column(db.String(20))  # search | fetch | rewrite | store
+    error = db.Column(db.Text)
+    result_article_id = db.Column(db.Integer)
+    force = db.Column(db.Boolean, default=False)  # rewrite even if a cached result exists
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "article_id": self.article_id,
+            "status": self.status,
+            "stage": self.stage,
+            "error": self.error,
+            "result_article_id": self.result_article_id,
+            "force": bool(self.force),
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+class RewriteBatch(db.Model):
+    """A batch rewrite run in the background; results are filled in as articles finish."""
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    status = db.Column(db.String(20), default="queued", index=True)  # queued | running | succeeded | failed
+    article_ids = db.Column(db.JSON, nullable=False)  # selected articles, in order
+    missing_ids = db.Column(db.JSON)  # requested ids that were not found or filtered out
+    options = db.Column(db.JSON)  # concurrency limits and force
+    completed = db.Column(db.Integer, default=0)
+    results = db.Column(db.JSON)
+    summary = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "total": len(self.article_ids or []) + len(self.missing_ids or []),
+            "completed": self.completed or 0,
+            "results": self.results,
+            "summary": self.summary,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+class CrawlPage(db.Model):
+    """One URL in the blog crawl frontier with the validators from its last fetch."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    url = db.Column(db.String(500), unique=True, nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)  # index | article
+    status = db.Column(db.String(20), default="pending", index=True)  # pending | done | error
+    etag = db.Column(db.String(255))
+    last_modified = db.Column(db.String(64))
+    body_hash = db.Column(db.String(64))  # sha256 of the raw page body
+    article_id = db.Column(db.Integer)
+    attempts = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+    fetched_at = db.Column(db.DateTime)
+    changed_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
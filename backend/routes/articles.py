@@ -1,15 +1,119 @@
-from flask import Blueprint, request, jsonify
+import gzip
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only
 from models import db, Article
-from services.scraper import scrape_oldest_articles
+from config import Config
+from services.archive import NDJSON_MIMETYPE, export_chunks, gzip_chunks, import_ndjson
+from services.ingest import bulk_upsert_articles
+from services.response_cache import cached_json
+from services.search_index import search_articles
 
 articles_bp = Blueprint("articles", __name__)
 
 @articles_bp.route("/", methods=["GET"])
+@cached_json
 def get_articles():
-    articles = Article.query.all()
-    return jsonify([a.to_dict() for a in articles])
+    """List articles.
+
+    Optional query parameters:
+      type    - only articles of this type (original | updated)
+      fields  - comma-separated subset of Article.FIELDS; unrequested columns
+                are deferred and never loaded
+      limit   - page size; switches the response to {"items", "next_cursor"}
+      cursor  - next_cursor from the previous page (keyset on id)
+    Without limit/cursor the full list is returned as before.
+    """
+    query = Article.query
+
+    article_type = request.args.get("type")
+    if article_type:
+        query = query.filter(Article.type == article_type)
+
+    fields = None
+    if request.args.get("fields"):
+        fields = [f.strip() for f in request.args["fields"].split(",") if f.strip()]
+        unknown = [f for f in fields if f not in Article.FIELDS]
+        if unknown:
+            return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
+        if "id" not in fields:
+            fields.insert(0, "id")
+        query = query.options(load_only(*(getattr(Article, f) for f in fields)))
+
+    paginated = "limit" in request.args or "cursor" in request.args
+    if not paginated:
+        articles = query.order_by(Article.id).all()
+        return jsonify([a.to_dict(fields) for a in articles])
+
+    try:
+        limit = int(request.args.get("limit", Config.ARTICLES_PAGE_SIZE))
+        after_id = int(request.args["cursor"]) if request.args.get("cursor") else None
+    except ValueError:
+        return jsonify({"error": "limit and cursor must be integers"}), 400
+    limit = max(1, min(limit, Config.ARTICLES_MAX_PAGE_SIZE))
+
+    if after_id is not None:
+        query = query.filter(Article.id > after_id)
+    # Fetch one extra row to know whether another page exists
+    articles = query.order_by(Article.id).limit(limit + 1).all()
+    has_more = len(articles) > limit
+    articles = articles[:limit]
+
+    return jsonify({
+        "items": [a.to_dict(fields) for a in articles],
+        "next_cursor": str(articles[-1].id) if has_more else None,
+    })
+
+@articles_bp.route("/search", methods=["GET"])
+def search():
+    """Full-text search: ?q=<text>[&type=original|updated][&limit=20][&offset=0]"""
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Query parameter q is required"}), 400
+    try:
+        limit = max(1, min(int(request.args.get("limit", 20)), Config.ARTICLES_MAX_PAGE_SIZE))
+        offset = max(0, int(request.args.get("offset", 0)))
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+
+    results, has_more = search_articles(query, limit, offset, request.args.get("type"))
+    return jsonify({
+        "query": query,
+        "results": results,
+        "next_offset": offset + limit if has_more else None,
+    })
+
+@articles_bp.route("/export", methods=["GET"])
+def export_articles():
+    """Stream every article as NDJSON: ?type=original|updated, gzip when accepted."""
+    chunks = export_chunks(request.args.get("type"), Config.EXPORT_BATCH_SIZE)
+    headers = {"Vary": "Accept-Encoding", "Content-Disposition": "attachment; filename=articles.jsonl"}
+    if request.accept_encodings["gzip"]:
+        headers["Content-Encoding"] = "gzip"
+        chunks = gzip_chunks(chunks)
+    return Response(stream_with_context(chunks), mimetype=NDJSON_MIMETYPE, headers=headers)
+
+@articles_bp.route("/import", methods=["POST"])
+def import_articles():
+    """Upsert an NDJSON body (optionally Content-Encoding: gzip) in chunked transactions."""
+    encoding = (request.content_encoding or "").lower()
+    if encoding not in ("", "identity", "gzip"):
+        return jsonify({"error": f"Unsupported Content-Encoding: {encoding}"}), 415
+    stream = gzip.GzipFile(fileobj=request.stream) if encoding == "gzip" else request.stream
+    try:
+        totals = import_ndjson(
+            stream,
+            chunk_size=Config.IMPORT_CHUNK_SIZE,
+            update_changed=request.args.get("update", "1") != "0",
+        )
+    except (OSError, EOFError):
+        db.session.rollback()
+        return jsonify({"error": "Request body is not valid gzip"}), 400
+    return jsonify(totals)
 
 @articles_bp.route("/<int:article_id>", methods=["GET"])
+@cached_json
 def get_article(article_id):
     article = Article.query.get_or_404(article_id)
     return jsonify(article.to_dict())
@@ -19,7 +123,11 @@ def create_article():
     data = request.json
     article = Article(**data)
     db.session.add(article)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": "An article with this source_url already exists"}), 409
     return jsonify(article.to_dict()), 201
 
 @articles_bp.route("/<int:article_id>", methods=["PUT", "PATCH"])
@@ -36,9 +144,13 @@ def update_article(article_id):
     if "type" in data:
         article.type = data["type"]
     if "references" in data:
-        article.references = data["references"] if isinstance(data["references"], str) else ",".join(data["references"])
+        article.references = data["references"]
     
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": "An article with this source_url already exists"}), 409
     return jsonify(article.to_dict())
 
 @articles_bp.route("/<int:article_id>", methods=["DELETE"])
@@ -50,23 +162,41 @@ def delete_article(article_id):
 
 @articles_bp.route("/scrape", methods=["POST"])
 def scrape_articles():
-    scraped = scrape_oldest_articles()
-    added = 0
-    skipped = 0
-    
-    for art in scraped:
-        exists = Article.query.filter_by(source_url=art["source_url"]).first()
-        if not exists:
-            db.session.add(Article(**art))
-            added += 1
-        else:
-            skipped += 1
-    
-    db.session.commit()
-    
+    data = request.get_json(silent=True) or {}
+    if data.get("incremental"):
+        return _crawl(data)
+    try:
+        limit = int(data.get("limit", request.args.get("limit", 5)))
+    except (TypeError, ValueError):
+        return jsonify({"error": "limit must be an integer"}), 400
+    limit = max(1, min(limit, Config.SCRAPER_MAX_LIMIT))
+
+    # The scraper pulls in the HTTP client and HTML parsers; load them on first use
+    from services.scraper import scrape_oldest_articles
+    scraped = scrape_oldest_articles(limit=limit)
+    counts = bulk_upsert_articles(scraped, update_changed=data.get("update", True))
+
     return jsonify({
         "message": "Scraping completed",
         "scraped": len(scraped),
-        "added": added,
-        "skipped": skipped
+        "added": counts["added"],
+        "updated": counts["updated"],
+        "skipped": counts["skipped"],
+        "duplicates": counts["duplicates"]
     })
+
+def _crawl(data):
+    """Incremental crawl of the whole archive; repeat the call while "pending" > 0."""
+    max_pages = data.get("max_pages", Config.SCRAPER_MAX_LIMIT)
+    try:
+        max_pages = max(1, min(int(max_pages), Config.SCRAPER_MAX_LIMIT))
+    except (TypeError, ValueError):
+        return jsonify({"error": "max_pages must be an integer"}), 400
+
+    from services.crawler import crawl_blog
+    summary = crawl_blog(
+        max_pages=max_pages,
+        restart=bool(data.get("restart", False)),
+        update_changed=data.get("update", True),
+    )
+    return jsonify({"message": "Crawl completed" if not summary["pending"] else "Crawl paused", **summary})
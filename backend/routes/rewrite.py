@@ -1,156 +1,230 @@
-from flask import Blueprint, jsonify
-from models import db, Article
+import json
+import time
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context, url_for
+from models import db, Article, RewriteBatch, RewriteJob
 from config import Config
-from services.google_search import google_search
-from services.content_fetcher import fetch_article_content
-from services.llm_rewriter import rewrite_article
+from services.job_queue import batch_queue, rewrite_queue, QueueFull, TERMINAL_STATUSES
+from services.rewrite_pipeline import (
+    RewriteError,
+    search_stage,
+    fetch_stage,
+    budget_stage,
+    cache_stage,
+    duplicate_stage,
+    rewrite_stream_stage,
+    store_stage,
+)
+from services.model_router import get_router
+from services.prompt_budget import budget_totals
+from services.response_cache import get_response_cache
+from services.rewrite_cache import rewrite_cache_stats
+from services.search_cache import get_search_cache
 
 rewrite_bp = Blueprint("rewrite", __name__)
 
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _force_requested():
+    """True when the client asked to bypass the rewrite cache (``?force=1`` or ``{"force": true}``)."""
+    data = request.get_json(silent=True)
+    if isinstance(data, dict) and data.get("force"):
+        return True
+    return request.args.get("force", "").lower() in ("1", "true")
+
+def _event_stream(generator):
+    response = Response(stream_with_context(generator), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+@rewrite_bp.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    from services.near_duplicates import near_duplicate_stats
+    return jsonify({
+        "search": get_search_cache().stats(),
+        "prompt_budget": budget_totals(),
+        "responses": get_response_cache().stats(),
+        "rewrites": rewrite_cache_stats(),
+        "near_duplicates": near_duplicate_stats(),
+    })
+
+@rewrite_bp.route("/http/stats", methods=["GET"])
+def http_stats():
+    from services.http_client import get_http_client
+    return jsonify(get_http_client().metrics.snapshot())
+
+@rewrite_bp.route("/models", methods=["GET"])
+def model_health():
+    return jsonify(get_router().snapshot())
+
 @rewrite_bp.route("/<int:article_id>", methods=["POST"])
 def rewrite(article_id):
+    Article.query.get_or_404(article_id)
+
     try:
-        article = Article.query.get_or_404(article_id)
+        job = rewrite_queue.submit(article_id, force=_force_requested())
+    except QueueFull as e:
+        response = jsonify({"error": str(e), "pending": rewrite_queue.pending()})
+        response.headers["Retry-After"] = str(Config.REWRITE_RETRY_AFTER)
+        return response, 503
+
+    payload = job.to_dict()
+    payload["status_url"] = url_for("rewrite.job_status", job_id=job.id)
+    payload["events_url"] = url_for("rewrite.job_events", job_id=job.id)
+    response = jsonify(payload)
+    response.headers["Location"] = payload["status_url"]
+    return response, 202
 
-        ref1 = ""
-        ref2 = ""
-        links = []
-        search_links = None
+@rewrite_bp.route("/<int:article_id>/stream", methods=["POST"])
+def rewrite_stream(article_id):
+    article = Article.query.get_or_404(article_id)
+    force = _force_requested()
+    duplicate = duplicate_stage(article) if not force else None
+    if duplicate is not None:
+        done = duplicate.to_dict()
+        done["cached"] = True
+        done["near_duplicate"] = True
+        return _event_stream(iter([_sse("done", done)]))
+
+    # Search and fetch run before the response starts so their failures
+    # still get a proper HTTP status
+    try:
+        search_links = search_stage(article)
+        ref1, ref2, links = fetch_stage(article, search_links)
+    except RewriteError as e:
+        return jsonify(e.to_dict()), e.status
+    ref1, ref2, budget = budget_stage(article, ref1, ref2)
+    key, cached = cache_stage(article, ref1, ref2, links, force=force)
+    replace_id = cached.id if cached is not None else None
 
-        # PRIMARY METHOD: Use Google Search to find reference articles
-        # This searches for the article title and finds top-ranking articles from other websites
-        print(f"Searching Google for reference articles using title: {article.title}")
+    def generate():
+        if cached is not None and not force:
+            done = cached.to_dict()
+            done["cached"] = True
+            done["prompt_budget"] = budget
+            yield _sse("done", done)
+            return
+        chunks = []
         try:
-            search_links = google_search(article.title)
-            print(f"Google Search successful. Found {len(search_links)} links.")
-        except ValueError as e:
-            # Handle API key or configuration errors
-            # Fallback to database articles if Google Search fails
-            print(f"Google Search failed: {str(e)}. Falling back to database articles.")
-            search_links = None
-        except Exception as e:
-            # Other errors - try database fallback
-            print(f"Google Search error: {str(e)}. Falling back to database articles.")
-            search_links = None
-        
-        # If Google Search failed, try database fallback
-        if not search_links:
-            other_articles = Article.query.filter(
-                Article.id != article_id,
-                Article.type == "original"
-            ).limit(2).all()
-            
-            if len(other_articles) >= 2:
-                print(f"Using {len(other_articles)} articles from database as fallback")
-                ref1 = other_articles[0].content
-                ref2 = other_articles[1].content
-                links = [
-                    other_articles[0].source_url or f"Article: {other_articles[0].title}",
-                    other_articles[1].source_url or f"Article: {other_articles[1].title}"
-                ]
+            for text in rewrite_stream_stage(article, ref1, ref2, links):
+                chunks.append(text)
+                yield _sse("token", {"text": text})
+            updated = store_stage(article, "".join(chunks).strip(), links, key=key, replace_id=replace_id)
+        except RewriteError as e:
+            db.session.rollback()
+            yield _sse("error", e.to_dict())
+            return
+        done = updated.to_dict()
+        done["prompt_budget"] = budget
+        yield _sse("done", done)
+
+    return _event_stream(generate())
+
+@rewrite_bp.route("/batch", methods=["POST"])
+def rewrite_batch():
+    data = request.get_json(silent=True) or {}
+    ids = data.get("ids")
+    article_type = data.get("type")
+    if not ids and not article_type:
+        return jsonify({"error": "Provide a list of article ids or a type filter"}), 400
+
+    query = Article.query
+    if ids:
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            return jsonify({"error": "ids must be a list of integers"}), 400
+        query = query.filter(Article.id.in_(ids))
+    if article_type:
+        query = query.filter(Article.type == article_type)
+
+    try:
+        limit = int(data.get("limit", Config.BATCH_MAX_ARTICLES))
+    except (TypeError, ValueError):
+        return jsonify({"error": "limit must be an integer"}), 400
+    # SQLite reads a negative LIMIT as "no limit"
+    if limit < 1:
+        return jsonify({"error": "limit must be at least 1"}), 400
+    limit = min(limit, Config.BATCH_MAX_ARTICLES)
+    article_ids = [article_id for (article_id,) in query.with_entities(Article.id).order_by(Article.id).limit(limit)]
+    found = set(article_ids)
+    missing_ids = [i for i in dict.fromkeys(ids or []) if i not in found]
+
+    options = {"force": bool(data.get("force"))}
+    for key in ("search_concurrency", "fetch_concurrency", "llm_concurrency"):
+        value = data.get(key)
+        if value is None:
+            continue
+        # Each value sizes a thread pool, so it must be a positive int and is capped
+        if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+            return jsonify({"error": f"{key} must be a positive integer"}), 400
+        options[key] = min(value, Config.BATCH_MAX_CONCURRENCY)
+    try:
+        batch = batch_queue.submit(article_ids, missing_ids, options)
+    except QueueFull as e:
+        response = jsonify({"error": str(e), "pending": batch_queue.pending()})
+        response.headers["Retry-After"] = str(Config.REWRITE_RETRY_AFTER)
+        return response, 503
+
+    payload = batch.to_dict()
+    payload["status_url"] = url_for("rewrite.batch_status", batch_id=batch.id)
+    payload["events_url"] = url_for("rewrite.batch_events", batch_id=batch.id)
+    response = jsonify(payload)
+    response.headers["Location"] = payload["status_url"]
+    return response, 202
+
+@rewrite_bp.route("/batch/<batch_id>", methods=["GET"])
+def batch_status(batch_id):
+    batch = RewriteBatch.query.get_or_404(batch_id)
+    return jsonify(batch.to_dict())
+
+@rewrite_bp.route("/batch/<batch_id>/events", methods=["GET"])
+def batch_events(batch_id):
+    RewriteBatch.query.get_or_404(batch_id)
+
+    def generate():
+        last = None
+        while True:
+            batch = db.session.get(RewriteBatch, batch_id, populate_existing=True)
+            db.session.rollback()
+            data = batch.to_dict()
+            if (data["status"], data["completed"]) != last:
+                last = (data["status"], data["completed"])
+                if data["status"] in TERMINAL_STATUSES:
+                    yield _sse("done", data)
+                    return
+                # Per-article results only come with the final event
+                yield _sse("progress", {key: data[key] for key in ("id", "status", "total", "completed")})
             else:
-                error_msg = "Google Search is required but failed. "
-                if not Config.SERPER_API_KEY:
-                    error_msg += "SERPER_API_KEY is not set. Please set it in environment variables."
-                else:
-                    error_msg += "Please check your Google Search API configuration or ensure you have at least 2 articles in the database."
-                return jsonify({
-                    "error": error_msg
-                }), 400
-        
-        # If we got links from Google Search, fetch their content
-        if search_links and not ref1 and not ref2:
-            # Validate we have at least 2 links
-            if len(search_links) < 2:
-                # Fallback to database if not enough search results
-                print(f"Only {len(search_links)} links found from Google Search. Falling back to database.")
-                other_articles = Article.query.filter(
-                    Article.id != article_id,
-                    Article.type == "original"
-                ).limit(2).all()
-                
-                if len(other_articles) >= 2:
-                    print(f"Using {len(other_articles)} articles from database as fallback")
-                    ref1 = other_articles[0].content
-                    ref2 = other_articles[1].content
-                    links = [
-                        other_articles[0].source_url or f"Article: {other_articles[0].title}",
-                        other_articles[1].source_url or f"Article: {other_articles[1].title}"
-                    ]
-                else:
-                    return jsonify({
-                        "error": f"Insufficient reference articles found from Google Search. Found {len(search_links)} links, need at least 2. Please check your Google Search API configuration.",
-                        "links_found": len(search_links)
-                    }), 400
+                yield ": keep-alive\n\n"
+            time.sleep(Config.REWRITE_EVENTS_POLL_INTERVAL)
+
+    return _event_stream(generate())
+
+@rewrite_bp.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = RewriteJob.query.get_or_404(job_id)
+    return jsonify(job.to_dict())
+
+@rewrite_bp.route("/jobs/<job_id>/events", methods=["GET"])
+def job_events(job_id):
+    RewriteJob.query.get_or_404(job_id)
+
+    def generate():
+        last = None
+        while True:
+            job = db.session.get(RewriteJob, job_id, populate_existing=True)
+            db.session.rollback()
+            data = job.to_dict()
+            if (data["status"], data["stage"]) != last:
+                last = (data["status"], data["stage"])
+                event = "done" if data["status"] in TERMINAL_STATUSES else "progress"
+                yield _sse(event, data)
+                if event == "done":
+                    return
             else:
-                # Fetch content from external reference articles found via Google Search
-                print(f"Fetching content from {len(search_links)} reference articles found via Google Search")
-                try:
-                    ref1 = fetch_article_content(search_links[0])
-                    print(f"Successfully fetched content from: {search_links[0]}")
-                except Exception as e:
-                    print(f"Error fetching content from {search_links[0]}: {str(e)}")
-                    return jsonify({
-                        "error": f"Failed to fetch content from reference article 1: {str(e)}"
-                    }), 500
-                
-                try:
-                    ref2 = fetch_article_content(search_links[1])
-                    print(f"Successfully fetched content from: {search_links[1]}")
-                except Exception as e:
-                    print(f"Error fetching content from {search_links[1]}: {str(e)}")
-                    return jsonify({
-                        "error": f"Failed to fetch content from reference article 2: {str(e)}"
-                    }), 500
-
-                links = search_links
-
-        # Validate we got content from references
-        if not ref1 or len(ref1.strip()) < 50:
-            return jsonify({
-                "error": "Reference article 1 did not provide sufficient content"
-            }), 500
-        
-        if not ref2 or len(ref2.strip()) < 50:
-            return jsonify({
-                "error": "Reference article 2 did not provide sufficient content"
-            }), 500
-
-        # Rewrite the article using AI
-        try:
-            rewritten_content = rewrite_article(
-                article.content,
-                ref1,
-                ref2,
-                links
-            )
-        except Exception as e:
-            return jsonify({
-                "error": f"Failed to rewrite article: {str(e)}"
-            }), 500
-
-        # Create updated article
-        # Ensure references is a comma-separated string
-        if isinstance(links, list):
-            references_str = ",".join(links)
-        else:
-            references_str = str(links) if links else ""
-        
-        updated = Article(
-            title=article.title + " (Updated)",
-            content=rewritten_content,
-            type="updated",
-            references=references_str
-        )
-
-        db.session.add(updated)
-        db.session.commit()
-
-        return jsonify(updated.to_dict())
-
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({
-            "error": f"Failed to rewrite article: {str(e)}"
-        }), 500
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+            time.sleep(Config.REWRITE_EVENTS_POLL_INTERVAL)
+
+    return _event_stream(generate())
@@ -0,0 +1,156 @@
+"""Streaming NDJSON export and import of the article table.
+
+Both directions work in fixed-size batches, so memory stays flat however
+large the archive is: the export reads rows through a server-side cursor
+(``yield_per``) and yields one encoded batch of lines at a time, and the
+import reads lines lazily and upserts them in chunked bulk statements.
+"""
+
+import gzip
+import json
+import zlib
+
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from models import db, Article
+from services.ingest import LOOKUP_CHUNK, bulk_upsert_articles
+
+EXPORT_FIELDS = Article.FIELDS + ("rewrite_key",)
+# Ids only mean something in the exporting database, so links are also
+# written as the linked article's source_url and resolved again on import
+LINK_URLS = {"parent_id": "parent_url", "duplicate_of": "duplicate_of_url"}
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def export_chunks(article_type=None, batch_size=500):
+    """Yield the articles as UTF-8 NDJSON, one bytes chunk per ``batch_size`` rows.
+
+    Plain columns are selected instead of ORM objects so nothing collects
+    in the session's identity map while the export runs. Needs an app
+    context for the whole iteration.
+    """
+    parent = aliased(Article)
+    canonical = aliased(Article)
+    columns = [getattr(Article, field) for field in EXPORT_FIELDS]
+    query = (
+        select(*columns, parent.source_url, canonical.source_url)
+        .outerjoin(parent, parent.id == Article.parent_id)
+        .outerjoin(canonical, canonical.id == Article.duplicate_of)
+        .order_by(Article.id)
+        .execution_options(yield_per=batch_size)
+    )
+    if article_type:
+        query = query.where(Article.type == article_type)
+
+    result = db.session.execute(query)
+    try:
+        for rows in result.partitions():
+            lines = []
+            for row in rows:
+                record = dict(zip(EXPORT_FIELDS + tuple(LINK_URLS.values()), row))
+                record["references"] = record["references"] or []
+                lines.append(json.dumps(record, ensure_ascii=False))
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+    finally:
+        result.close()
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip-compress a stream of bytes chunks without buffering the whole body."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def open_archive(path, mode="rb"):
+    """Open an NDJSON file, transparently (de)compressing ``.gz`` paths."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def read_ndjson(lines, counts=None):
+    """Yield one dict per non-blank line; malformed lines are skipped and counted as invalid."""
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            print(f"[WARN] Skipping line {line_number}: {e}")
+            record = None
+        if isinstance(record, dict):
+            yield record
+        elif counts is not None:
+            counts["invalid"] += 1
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _resolve_links(records):
+    """Replace parent_url / duplicate_of_url with the ids of the local articles at those URLs."""
+    urls = list({record[field] for record in records for field in LINK_URLS.values() if record.get(field)})
+    ids = {}
+    for start in range(0, len(urls), LOOKUP_CHUNK):
+        ids.update((url, article_id) for article_id, url in db.session.execute(
+            select(Article.id, Article.source_url).where(Article.source_url.in_(urls[start:start + LOOKUP_CHUNK]))
+        ))
+    for record in records:
+        for field, url_field in LINK_URLS.items():
+            url = record.pop(url_field, None)
+            if url in ids:
+                record[field] = ids[url]
+
+
+def _import_chunk(records, update_changed):
+    # Articles that link to others go after the ones they may link to:
+    # plain rows, then near-duplicates, then rewrites
+    phases = ([], [], [])
+    for record in records:
+        record = {key: value for key, value in record.items() if key not in ("id", *LINK_URLS)}
+        phases[2 if record.get("parent_url") else 1 if record.get("duplicate_of_url") else 0].append(record)
+
+    counts = {"added": 0, "updated": 0, "skipped": 0, "invalid": 0, "duplicates": 0}
+    for phase in phases:
+        if not phase:
+            continue
+        _resolve_links(phase)
+        for key, value in bulk_upsert_articles(phase, update_changed=update_changed, commit=False).items():
+            counts[key] += value
+    db.session.commit()
+    return counts
+
+
+def import_ndjson(lines, chunk_size=1000, update_changed=True, on_chunk=None):
+    """Upsert NDJSON article lines, one transaction per ``chunk_size`` records.
+
+    Records go through bulk_upsert_articles, so they are matched on
+    source_url, and rewrites on rewrite_key. Ids in the file are ignored;
+    parent and duplicate links are restored from parent_url and
+    duplicate_of_url when an article with that URL exists here, so
+    importing the same file twice adds nothing the second time.
+    ``on_chunk(number, counts)`` is called after each committed chunk.
+    Needs an app context; returns the totals.
+    """
+    totals = {"added": 0, "updated": 0, "skipped": 0, "invalid": 0, "duplicates": 0}
+    for number, chunk in enumerate(chunked(read_ndjson(lines, totals), chunk_size), start=1):
+        counts = _import_chunk(chunk, update_changed)
+        for key, value in counts.items():
+            totals[key] += value
+        if on_chunk:
+            on_chunk(number, counts)
+    return totals
@@ -0,0 +1,87 @@
+"""Committed writes to the article table, for caches and indexes to follow.
+
+One set of session listeners notices every write to the article table:
+ORM unit-of-work changes and bulk insert/update/delete statements alike.
+What a transaction wrote is collected on the session and handed to each
+``on_article_commit`` subscriber once it commits; a rollback drops it.
+"""
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import Article
+
+_CHANGES_KEY = "article_changes"
+_subscribers = []
+
+
+class ArticleChanges:
+    """What one committed transaction wrote to the article table.
+
+    ``ids`` holds the ids of rows known to be inserted, updated or deleted.
+    ``untracked`` is set when an UPDATE or DELETE touched rows whose ids are
+    unknown (e.g. a filtered bulk update), so followers must re-check
+    everything. Bulk inserts only set ``inserted``; new rows can be found
+    by id.
+    """
+
+    def __init__(self):
+        self.ids = set()
+        self.untracked = False
+        self.inserted = False
+
+
+def on_article_commit(fn):
+    """Call ``fn(changes)`` after every commit that wrote to the article table."""
+    _subscribers.append(fn)
+    return fn
+
+
+def _changes(session):
+    changes = session.info.get(_CHANGES_KEY)
+    if changes is None:
+        changes = session.info[_CHANGES_KEY] = ArticleChanges()
+    return changes
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_article_statement(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if getattr(table, "name", None) != Article.__tablename__:
+        return
+    changes = _changes(orm_execute_state.session)
+    if orm_execute_state.is_insert:
+        changes.inserted = True
+        return
+    params = orm_execute_state.parameters
+    # Bulk updates by primary key name their rows; anything else does not
+    if isinstance(params, list) and params and all("id" in p for p in params):
+        changes.ids.update(p["id"] for p in params)
+    else:
+        changes.untracked = True
+
+
+@event.listens_for(Session, "after_flush")
+def _note_article_flush(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Article):
+            _changes(session).ids.add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session):
+    changes = session.info.pop(_CHANGES_KEY, None)
+    if changes is None:
+        return
+    for fn in list(_subscribers):
+        try:
+            fn(changes)
+        except Exception as e:
+            print(f"Error in article change subscriber {fn.__name__}: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(_CHANGES_KEY, None)
@@ -0,0 +1,121 @@
+"""Incremental syncing shared by the in-memory article indexes.
+
+An index reconciles against the whole article table only once every
+INDEX_RECONCILE_SECONDS. In between, a sync reads just the rows that may
+have changed: ids above the highest one seen so far, which covers bulk
+inserts from any process, and ids that writes in this process touched,
+which services.article_changes hands to every loaded index at commit.
+Updates and deletes made by other processes are picked up by the next
+full reconcile.
+"""
+
+import time
+import weakref
+
+from sqlalchemy import select
+
+from models import db, Article
+from config import Config
+from services.article_changes import on_article_commit
+
+HASH_LENGTH = 16
+# Rows read per IN query
+READ_CHUNK = 500
+
+_live_indexes = weakref.WeakSet()
+
+
+class ArticleIndex:
+    """Base class for indexes over canonical original articles.
+
+    Covers originals that are not linked to another one through
+    ``duplicate_of``. Subclasses create ``self._lock`` and ``self._hashes``
+    (id -> content hash prefix) before calling ``_init_sync``, and
+    implement ``_index_rows`` (rows of id, content_hash, content),
+    ``remove`` and optionally ``_synced``.
+    """
+
+    def _init_sync(self):
+        self._reconciled_at = None
+        self._max_id = 0
+        self._refresh = set()
+        _live_indexes.add(self)
+
+    def request_refresh(self, ids=None):
+        """Re-read ``ids`` on the next sync, or reconcile everything when ``ids`` is None."""
+        with self._lock:
+            if ids is None:
+                self._reconciled_at = None
+            else:
+                self._refresh.update(ids)
+
+    def sync(self):
+        """Bring the index up to date with the article table. Needs an app context.
+
+        Returns the number of (re-)indexed and removed articles.
+        """
+        with self._lock:
+            full = self._reconciled_at is None or time.monotonic() - self._reconciled_at >= Config.INDEX_RECONCILE_SECONDS
+            refresh, self._refresh = self._refresh, set()
+            max_id = self._max_id
+        try:
+            rows = self._read_state(None if full else max_id, refresh)
+        except Exception:
+            self.request_refresh(refresh)
+            raise
+
+        current = {
+            row.id: (row.content_hash or "")[:HASH_LENGTH]
+            for row in rows
+            if row.type == "original" and row.duplicate_of is None
+        }
+        with self._lock:
+            known = self._hashes if full else [i for i in refresh if i in self._hashes]
+            stale = [i for i in known if i not in current]
+            changed = [i for i, h in current.items() if self._hashes.get(i) != h]
+            if full:
+                # Reset rather than raise it: SQLite reuses the ids of deleted last rows
+                self._max_id = max((row.id for row in rows), default=0)
+                self._reconciled_at = time.monotonic()
+            else:
+                if rows:
+                    self._max_id = max(self._max_id, max(row.id for row in rows))
+                found = {row.id for row in rows}
+                deleted = [i for i in refresh if i not in found]
+                if deleted:
+                    self._max_id = min(self._max_id, min(deleted) - 1)
+
+        for article_id in stale:
+            self.remove(article_id)
+        for start in range(0, len(changed), READ_CHUNK):
+            self._index_rows(db.session.execute(
+                select(Article.id, Article.content_hash, Article.content)
+                .where(Article.id.in_(changed[start:start + READ_CHUNK]))
+            ).all())
+        if changed or stale:
+            self._synced()
+        return len(changed), len(stale)
+
+    @staticmethod
+    def _read_state(after_id, ids):
+        """(id, content_hash, type, duplicate_of) of every article, or of those above ``after_id`` plus ``ids``."""
+        columns = select(Article.id, Article.content_hash, Article.type, Article.duplicate_of)
+        if after_id is None:
+            return db.session.execute(columns).all()
+        rows = db.session.execute(columns.where(Article.id > after_id)).all()
+        ids = list(ids)
+        for start in range(0, len(ids), READ_CHUNK):
+            rows += db.session.execute(columns.where(Article.id.in_(ids[start:start + READ_CHUNK]))).all()
+        return rows
+
+    def _synced(self):
+        """Called after a sync changed the index, e.g. to save it."""
+
+
+@on_article_commit
+def _refresh_after_commit(changes):
+    # Bulk inserts are found through the id watermark
+    if not changes.ids and not changes.untracked:
+        return
+    for index in list(_live_indexes):
+        index.request_refresh(None if changes.untracked else changes.ids)
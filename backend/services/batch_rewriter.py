@@ -0,0 +1,174 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from config import Config
+from services.rewrite_pipeline import (
+    RewriteError,
+    search_stage,
+    fetch_stage,
+    budget_stage,
+    cache_stage,
+    duplicate_stage,
+    rewrite_stage,
+    store_stage,
+)
+from services.tracing import copy_context_run
+
+
+class BatchRewrite:
+    """Rewrite many articles with the pipeline stages overlapping.
+
+    Each stage (search, fetch, rewrite, store) has its own thread pool sized
+    by its concurrency limit. When an article finishes one stage it is handed
+    to the next stage's pool, so searches, page fetches and LLM calls for
+    different articles run at the same time. Stores go through a single
+    thread to keep database writes serialized. Articles whose inputs match
+    an earlier rewrite finish after the fetch stage, and near-duplicates of
+    an already rewritten article before the search stage, unless ``force``
+    is set.
+    """
+
+    def __init__(self, app, search_concurrency=None, fetch_concurrency=None, llm_concurrency=None, force=False):
+        self.app = app
+        self.force = force
+        self.pools = {
+            "search": ThreadPoolExecutor(search_concurrency or Config.BATCH_SEARCH_CONCURRENCY, thread_name_prefix="batch-search"),
+            "fetch": ThreadPoolExecutor(fetch_concurrency or Config.BATCH_FETCH_CONCURRENCY, thread_name_prefix="batch-fetch"),
+            "rewrite": ThreadPoolExecutor(llm_concurrency or Config.BATCH_LLM_CONCURRENCY, thread_name_prefix="batch-llm"),
+            "store": ThreadPoolExecutor(1, thread_name_prefix="batch-store"),
+        }
+        self._remaining = 0
+        self._progress = None
+        self._results = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def run(self, articles, progress=None):
+        """Rewrite ``articles`` (Article rows) and return (results, summary).
+
+        ``progress(completed, results)`` is called from the stage threads,
+        one call at a time, whenever an article finishes.
+        """
+        # Plain snapshots: ORM rows must not be shared across worker sessions
+        items = [
+            SimpleNamespace(id=a.id, title=a.title, content=a.content, type=a.type, duplicate_of=a.duplicate_of)
+            for a in articles
+        ]
+        results = [
+            {"article_id": item.id, "status": "pending", "timings": {}}
+            for item in items
+        ]
+        if not items:
+            return results, self._summary(results, 0.0)
+
+        self._remaining = len(items)
+        self._progress = progress
+        self._results = results
+        self._done.clear()
+        started = time.perf_counter()
+        for item, result in zip(items, results):
+            self._submit("search", self._search, item, result)
+        self._done.wait()
+        elapsed = time.perf_counter() - started
+
+        for pool in self.pools.values():
+            pool.shutdown(wait=True)
+        return results, self._summary(results, elapsed)
+
+    def _submit(self, stage, fn, item, result, *args):
+        def task():
+            stage_started = time.perf_counter()
+            try:
+                with self.app.app_context():
+                    next_step = fn(item, result, *args)
+            except RewriteError as e:
+                next_step = None
+                self._fail(result, stage, e.message)
+            except Exception as e:
+                next_step = None
+                self._fail(result, stage, f"Failed to rewrite article: {str(e)}")
+            finally:
+                result["timings"][stage] = round(time.perf_counter() - stage_started, 3)
+
+            if next_step is None:
+                self._finish()
+            else:
+                next_stage, next_fn, next_args = next_step
+                self._submit(next_stage, next_fn, item, result, *next_args)
+
+        # Stage spans from every pool join the trace of the request that started the batch
+        self.pools[stage].submit(copy_context_run(task))
+
+    def _search(self, item, result):
+        duplicate = duplicate_stage(item) if not self.force else None
+        if duplicate is not None:
+            result["status"] = "succeeded"
+            result["updated_article_id"] = duplicate.id
+            result["cached"] = True
+            result["near_duplicate"] = True
+            return None
+        return "fetch", self._fetch, (search_stage(item),)
+
+    def _fetch(self, item, result, search_links):
+        ref1, ref2, links = fetch_stage(item, search_links)
+        ref1, ref2, budget = budget_stage(item, ref1, ref2)
+        if budget:
+            result["prompt_tokens_saved"] = budget["tokens_saved"]
+        key, cached = cache_stage(item, ref1, ref2, links, force=self.force)
+        if cached is not None and not self.force:
+            result["status"] = "succeeded"
+            result["updated_article_id"] = cached.id
+            result["cached"] = True
+            return None
+        replace_id = cached.id if cached is not None else None
+        return "rewrite", self._rewrite, ((ref1, ref2, links), key, replace_id)
+
+    def _rewrite(self, item, result, references, key, replace_id):
+        ref1, ref2, links = references
+        return "store", self._store, (rewrite_stage(item, ref1, ref2, links), links, key, replace_id)
+
+    def _store(self, item, result, rewritten_content, links, key, replace_id):
+        updated = store_stage(item, rewritten_content, links, key=key, replace_id=replace_id)
+        result["status"] = "succeeded"
+        result["updated_article_id"] = updated.id
+        return None
+
+    def _fail(self, result, stage, message):
+        print(f"Batch rewrite of article {result['article_id']} failed at {stage}: {message}")
+        result["status"] = "failed"
+        result["failed_stage"] = stage
+        result["error"] = message
+
+    def _finish(self):
+        with self._lock:
+            self._remaining -= 1
+            if self._progress is not None:
+                try:
+                    self._progress(len(self._results) - self._remaining, self._results)
+                except Exception as e:
+                    print(f"Batch progress callback failed: {str(e)}")
+            if self._remaining == 0:
+                self._done.set()
+
+    @staticmethod
+    def _summary(results, elapsed):
+        succeeded = sum(1 for r in results if r["status"] == "succeeded")
+        cached = sum(1 for r in results if r.get("cached"))
+        tokens_saved = sum(r.get("prompt_tokens_saved", 0) for r in results)
+        stage_seconds = {}
+        for r in results:
+            for stage, seconds in r["timings"].items():
+                stage_seconds[stage] = round(stage_seconds.get(stage, 0.0) + seconds, 3)
+        return {
+            "total": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "cached": cached,
+            "elapsed_seconds": round(elapsed, 3),
+            "articles_per_minute": round(len(results) / elapsed * 60, 2) if elapsed else 0.0,
+            "prompt_tokens_saved": tokens_saved,
+            # Sum of per-article stage time; above elapsed_seconds means stages overlapped
+            "stage_seconds": stage_seconds,
+        }
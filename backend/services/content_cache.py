@@ -0,0 +1,108 @@
+import sqlite3
+import threading
+import time
+from config import Config
+
+
+class ContentCache:
+    """Persistent URL -> extracted text cache stored in SQLite.
+
+    Entries older than ``ttl`` seconds are stale but are kept together with
+    their ETag / Last-Modified validators so they can be revalidated with a
+    conditional request. Once more than ``max_entries`` rows exist the least
+    recently used ones are evicted.
+    """
+
+    def __init__(self, path, ttl, max_entries):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._init_schema()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS content_cache (
+                    url TEXT PRIMARY KEY,
+                    content TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_content_cache_accessed_at ON content_cache (accessed_at)"
+            )
+
+    def get(self, url):
+        """Return the cached entry for ``url`` (fresh or stale) as a dict, or None."""
+        conn = self._connect()
+        row = conn.execute("SELECT * FROM content_cache WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute("UPDATE content_cache SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        entry = dict(row)
+        entry["fresh"] = time.time() - entry["fetched_at"] < self.ttl
+        return entry
+
+    def put(self, url, content, etag=None, last_modified=None):
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                """INSERT INTO content_cache (url, content, etag, last_modified, fetched_at, accessed_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(url) DO UPDATE SET
+                       content = excluded.content,
+                       etag = excluded.etag,
+                       last_modified = excluded.last_modified,
+                       fetched_at = excluded.fetched_at,
+                       accessed_at = excluded.accessed_at""",
+                (url, content, etag, last_modified, now, now),
+            )
+            conn.execute(
+                """DELETE FROM content_cache WHERE url IN (
+                       SELECT url FROM content_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                   )""",
+                (self.max_entries,),
+            )
+
+    def touch(self, url):
+        """Mark a stale entry as fresh again after a 304 Not Modified."""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "UPDATE content_cache SET fetched_at = ?, accessed_at = ? WHERE url = ?",
+                (now, now, url),
+            )
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_content_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ContentCache(
+                    Config.CACHE_DB_PATH,
+                    ttl=Config.CONTENT_CACHE_TTL,
+                    max_entries=Config.CONTENT_CACHE_MAX_ENTRIES,
+                )
+    return _cache
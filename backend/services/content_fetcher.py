@@ -1,13 +1,73 @@
-import requests
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+from services.content_cache import get_content_cache
+from services.html_extract import extract_paragraphs
+from services.http_client import HTML_TYPES, get_http_client
+from services.tracing import copy_context_run, span
+
 
 def fetch_article_content(url):
-    response = requests.get(url, verify=False)
-    soup = BeautifulSoup(response.text, "html.parser")
-
-    paragraphs = soup.find_all("p")
-    return "\n\n".join(
-        p.get_text().strip()
-        for p in paragraphs
-        if len(p.get_text().strip()) > 50
+    with span("fetch_url", url=url) as attrs:
+        return _fetch_article_content(url, attrs)
+
+
+def _fetch_article_content(url, attrs):
+    cache = get_content_cache()
+    entry = cache.get(url)
+    if entry and entry["fresh"]:
+        attrs["cache"] = "hit"
+        return entry["content"]
+
+    # Revalidate stale entries instead of downloading the page again
+    headers = {}
+    if entry:
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = get_http_client().get(
+        url,
+        label="fetch",
+        headers=headers,
+        allowed_types=HTML_TYPES,
+        timeout=Config.FETCH_TIMEOUT,
+        verify=False,
     )
+    if response.status_code == 304 and entry:
+        attrs["cache"] = "revalidated"
+        cache.touch(url)
+        return entry["content"]
+    response.raise_for_status()
+
+    attrs["cache"] = "miss"
+    with span("parse"):
+        content = extract_paragraphs(response.text)
+    cache.put(
+        url,
+        content,
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+    )
+    return content
+
+
+def fetch_articles_content(urls):
+    """Fetch several URLs concurrently.
+
+    Returns a list aligned with ``urls`` holding either the extracted text or
+    the exception raised while fetching that URL.
+    """
+    def fetch(url):
+        try:
+            return fetch_article_content(url)
+        except Exception as e:
+            return e
+
+    if not urls:
+        return []
+    with ThreadPoolExecutor(max_workers=len(urls)) as pool:
+        # Each task gets a copy of the caller's context so its spans join the request trace
+        futures = [pool.submit(copy_context_run(fetch), url) for url in urls]
+        return [future.result() for future in futures]
@@ -0,0 +1,183 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from sqlalchemy import func, insert, select, update
+
+from models import db, Article, CrawlPage
+from config import Config
+from services.http_client import HTML_TYPES, get_http_client
+from services.ingest import LOOKUP_CHUNK, bulk_upsert_articles
+from services.scraper import BASE_URL, _get_parse_pool, _submit_parse, extract_index_links, parse_article_page
+from services.tracing import span
+
+SUMMARY_KEYS = (
+    "fetched", "not_modified", "unchanged", "changed", "discovered", "errors",
+    "added", "updated", "skipped", "duplicates",
+)
+
+
+def _pending_count():
+    return db.session.scalar(select(func.count()).select_from(CrawlPage).where(CrawlPage.status == "pending"))
+
+
+def _start_crawl(base_url):
+    """Queue every known URL for revalidation and make sure the index is in the frontier."""
+    db.session.execute(update(CrawlPage).values(status="pending"))
+    if db.session.scalar(select(CrawlPage.id).where(CrawlPage.url == base_url)) is None:
+        db.session.add(CrawlPage(url=base_url, kind="index", status="pending"))
+    db.session.commit()
+
+
+def _fetch(page):
+    """Conditional GET for a frontier page; returns the response (304 or 2xx)."""
+    headers = {}
+    if page["etag"]:
+        headers["If-None-Match"] = page["etag"]
+    if page["last_modified"]:
+        headers["If-Modified-Since"] = page["last_modified"]
+    response = get_http_client().get(
+        page["url"],
+        label="crawl",
+        headers=headers,
+        allowed_types=HTML_TYPES,
+        timeout=Config.SCRAPER_TIMEOUT,
+        verify=False,
+    )
+    if response.status_code != 304:
+        response.raise_for_status()
+    return response
+
+
+def _add_to_frontier(urls, kind):
+    """Insert URLs the frontier has not seen yet; returns how many were new."""
+    urls = list(dict.fromkeys(urls))
+    known = set()
+    for start in range(0, len(urls), LOOKUP_CHUNK):
+        chunk = urls[start:start + LOOKUP_CHUNK]
+        known.update(db.session.scalars(select(CrawlPage.url).where(CrawlPage.url.in_(chunk))))
+    new = [{"url": url, "kind": kind, "status": "pending", "attempts": 0} for url in urls if url not in known]
+    if new:
+        db.session.execute(insert(CrawlPage), new)
+    return len(new)
+
+
+def _crawl_batch(pages, base_url, parse_pool, summary, update_changed):
+    now = datetime.utcnow()
+    page_updates = []
+    parsed = {}
+    discovered = {"article": [], "index": []}
+
+    workers = max(1, min(Config.SCRAPER_MAX_WORKERS, len(pages)))
+    with ThreadPoolExecutor(max_workers=workers) as fetch_pool:
+        fetches = {fetch_pool.submit(_fetch, page): page for page in pages}
+        for future in as_completed(fetches):
+            page = fetches[future]
+            row = {"id": page["id"], "status": "done", "fetched_at": now, "error": None}
+            page_updates.append(row)
+            try:
+                response = future.result()
+            except Exception as e:
+                print(f"Error crawling {page['url']}: {e}")
+                summary["errors"] += 1
+                row.update(status="error", error=str(e)[:1000], attempts=page["attempts"] + 1)
+                continue
+
+            summary["fetched"] += 1
+            if response.status_code == 304:
+                summary["not_modified"] += 1
+                continue
+
+            row["etag"] = response.headers.get("ETag")
+            row["last_modified"] = response.headers.get("Last-Modified")
+            body_hash = hashlib.sha256(response.content).hexdigest()
+            if body_hash == page["body_hash"]:
+                # The server ignored the validators but the page is byte-identical
+                summary["unchanged"] += 1
+                continue
+
+            summary["changed"] += 1
+            row["body_hash"] = body_hash
+            row["changed_at"] = now
+            html = response.text
+            if page["kind"] == "index":
+                article_links, page_links = extract_index_links(html, base_url)
+                discovered["article"].extend(article_links)
+                discovered["index"].extend(page_links)
+            elif parse_pool is not None:
+                parsed[page["url"]] = _submit_parse(parse_pool, page["url"], html)
+            else:
+                with span("parse"):
+                    parsed[page["url"]] = parse_article_page(page["url"], html)
+
+    records = []
+    for url, result in parsed.items():
+        try:
+            article = result.result() if parse_pool is not None else result
+        except Exception as e:
+            print(f"Error parsing {url}: {e}")
+            continue
+        if article:
+            records.append(article)
+
+    if records:
+        counts = bulk_upsert_articles(records, update_changed=update_changed, commit=False)
+        for key in ("added", "updated", "skipped", "duplicates"):
+            summary[key] += counts[key]
+        article_ids = dict(db.session.execute(
+            select(Article.source_url, Article.id).where(Article.source_url.in_([r["source_url"] for r in records]))
+        ).all())
+        url_by_page = {page["id"]: page["url"] for page in pages}
+        for row in page_updates:
+            article_id = article_ids.get(url_by_page[row["id"]])
+            if article_id is not None:
+                row["article_id"] = article_id
+
+    for kind, urls in discovered.items():
+        summary["discovered"] += _add_to_frontier(urls, kind)
+
+    # executemany needs every row to carry the same keys
+    for keys in {tuple(sorted(row)) for row in page_updates}:
+        db.session.execute(update(CrawlPage), [row for row in page_updates if tuple(sorted(row)) == keys])
+    # Progress is committed per batch so an interrupted crawl resumes from here
+    db.session.commit()
+
+
+def crawl_blog(base_url=BASE_URL, max_pages=None, restart=False, update_changed=True):
+    """Incrementally crawl the whole blog archive, following index pagination.
+
+    The frontier lives in the crawl_page table. A new crawl re-queues every
+    known URL; each one is fetched with its stored ETag/Last-Modified, and
+    only pages that come back changed (new body hash) are parsed. Index
+    pages add newly linked articles and further index pages to the
+    frontier, and changed articles are upserted. Progress is committed per
+    batch, so a crawl stopped by ``max_pages`` or a crash resumes where it
+    left off on the next call (``restart`` forces a fresh pass). Needs an
+    app context.
+    """
+    if restart or not _pending_count():
+        _start_crawl(base_url)
+
+    summary = dict.fromkeys(SUMMARY_KEYS, 0)
+    parse_pool = _get_parse_pool()
+    batch_size = Config.SCRAPER_MAX_WORKERS * 2
+    visited = 0
+    while max_pages is None or visited < max_pages:
+        limit = batch_size if max_pages is None else min(batch_size, max_pages - visited)
+        pages = db.session.execute(
+            select(
+                CrawlPage.id, CrawlPage.url, CrawlPage.kind, CrawlPage.etag,
+                CrawlPage.last_modified, CrawlPage.body_hash, CrawlPage.attempts,
+            )
+            .where(CrawlPage.status == "pending")
+            # "index" sorts after "article": index pages first, so discovery runs ahead
+            .order_by(CrawlPage.kind.desc(), CrawlPage.id)
+            .limit(limit)
+        ).mappings().all()
+        if not pages:
+            break
+        visited += len(pages)
+        _crawl_batch(pages, base_url, parse_pool, summary, update_changed)
+
+    summary["pending"] = _pending_count()
+    return summary
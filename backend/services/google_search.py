@@ -1,18 +1,77 @@
+import threading
+from concurrent.futures import Future
+
 import requests
 from config import Config
+from services.http_client import JSON_TYPES, get_http_client
+from services.search_cache import get_search_cache, normalize_query
+
+# Normalized query -> Future for searches currently in flight
+_inflight = {}
+_inflight_lock = threading.Lock()
+
 
 def google_search(query):
+    """Return the top 2 external links for ``query``, served from cache when possible.
+
+    Concurrent calls for the same normalized query share one upstream request.
+    """
+    cache = get_search_cache()
+    key = normalize_query(query)
+
+    links = cache.get(key)
+    if links is not None:
+        cache.record("hits")
+        return links
+
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _inflight[key] = future
+
+    if not leader:
+        cache.record("coalesced")
+        return future.result()
+
+    try:
+        # A leader that finished between our cache miss and taking the lock
+        # has already stored its result and left _inflight
+        links = cache.get(key)
+        if links is not None:
+            cache.record("hits")
+            future.set_result(links)
+            return links
+        cache.record("misses")
+        links = _search_serper(query)
+    except Exception as e:
+        cache.record("errors")
+        future.set_exception(e)
+        raise
+    else:
+        cache.put(key, links)
+        future.set_result(links)
+        return links
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def _search_serper(query):
     if not Config.SERPER_API_KEY:
         raise ValueError("SERPER_API_KEY is not set. Please set it in environment variables.")
     
-    url = "https://google.serper.dev/search"
+    url = Config.SERPER_URL
     headers = {
         "X-API-KEY": Config.SERPER_API_KEY,
         "Content-Type": "application/json"
     }
  
     try:
-        response = requests.post(url, headers=headers, json={"q": query}, timeout=10)
+        response = get_http_client().post(
+            url, label="serper", headers=headers, json={"q": query}, allowed_types=JSON_TYPES, timeout=10
+        )
         
         # Check for 403 Forbidden - usually means invalid API key or quota exceeded
         if response.status_code == 403:
@@ -0,0 +1,269 @@
+"""HTML extraction shared by the scraper and the reference content fetcher.
+
+Pages are parsed once with the fastest available backend (lxml, then
+selectolax, then BeautifulSoup's html.parser) and reduced to the handful of things
+the services need: the title, link targets and the main article text.
+"""
+
+import re
+from collections import defaultdict
+
+from bs4 import BeautifulSoup
+from config import Config
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # pragma: no cover - optional dependency
+    LexborHTMLParser = None
+
+try:
+    import lxml.html
+    from lxml.etree import ParserError
+except ImportError:  # pragma: no cover - optional dependency
+    lxml = None
+
+MIN_PARAGRAPH_LENGTH = 50
+MIN_CONTENT_LENGTH = 100
+# Shorter paragraphs do not count towards a container's score
+MIN_SCORED_LENGTH = 25
+
+POSITIVE_RE = re.compile(r"article|content|post|entry|main|body|text|blog|story", re.I)
+NEGATIVE_RE = re.compile(
+    r"comment|footer|sidebar|aside|nav|menu|related|share|social|widget|promo|banner|"
+    r"header|subscribe|newsletter|cookie|popup|breadcrumb",
+    re.I,
+)
+FALLBACK_DIV_RE = re.compile(r"article|content|post", re.I)
+
+
+class _Bs4Backend:
+    name = "bs4"
+
+    def parse(self, html):
+        return BeautifulSoup(html, "html.parser")
+
+    def first(self, doc, tag):
+        return doc.find(tag)
+
+    def find_all(self, doc, tag):
+        return doc.find_all(tag)
+
+    def text(self, node):
+        return node.get_text()
+
+    def attr(self, node, name):
+        value = node.get(name)
+        return " ".join(value) if isinstance(value, list) else (value or "")
+
+    def ancestors(self, node):
+        return (parent for parent in node.parents if parent.name != "[document]")
+
+    def key(self, node):
+        # Tags compare by content, so key them by identity; the tree keeps them alive
+        return id(node)
+
+
+class _LxmlBackend:
+    name = "lxml"
+
+    def parse(self, html):
+        if not html or not html.strip():
+            return None
+        try:
+            return lxml.html.document_fromstring(html)
+        except ValueError:
+            # Unicode input with an XML encoding declaration must be parsed as bytes
+            return lxml.html.document_fromstring(html.encode("utf-8"))
+        except ParserError:
+            return None
+
+    def first(self, doc, tag):
+        return next(doc.iter(tag), None) if doc is not None else None
+
+    def find_all(self, doc, tag):
+        return list(doc.iter(tag)) if doc is not None else []
+
+    def text(self, node):
+        return node.text_content()
+
+    def attr(self, node, name):
+        return node.get(name) or ""
+
+    def ancestors(self, node):
+        return node.iterancestors()
+
+    def key(self, node):
+        return node
+
+
+class _SelectolaxBackend:
+    name = "selectolax"
+
+    def parse(self, html):
+        return LexborHTMLParser(html or "")
+
+    def first(self, doc, tag):
+        return doc.css_first(tag)
+
+    def find_all(self, doc, tag):
+        return doc.css(tag)
+
+    def text(self, node):
+        return node.text(deep=True)
+
+    def attr(self, node, name):
+        return node.attributes.get(name) or ""
+
+    def ancestors(self, node):
+        parent = node.parent
+        while parent is not None and parent.tag not in ("-undef", "#document"):
+            yield parent
+            parent = parent.parent
+
+    def key(self, node):
+        return node
+
+
+# In preference order; see benchmarks/bench_html_extract.py
+BACKENDS = {
+    "lxml": _LxmlBackend if lxml is not None else None,
+    "selectolax": _SelectolaxBackend if LexborHTMLParser is not None else None,
+    "bs4": _Bs4Backend,
+}
+
+
+def available_backends():
+    return [name for name, backend in BACKENDS.items() if backend is not None]
+
+
+def get_backend(name=None):
+    """Return the parser backend ``name``, or the fastest installed one for "auto"."""
+    name = (name or Config.HTML_PARSER).lower()
+    if name == "auto":
+        name = available_backends()[0]
+    backend = BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"HTML parser backend {name!r} is not available; installed: {available_backends()}")
+    return backend()
+
+
+def _class_weight(label):
+    weight = 0
+    if POSITIVE_RE.search(label):
+        weight += 25
+    if NEGATIVE_RE.search(label):
+        weight -= 25
+    return weight
+
+
+def _main_content(backend, doc):
+    """Readability-style main content: the paragraphs of the best-scoring container.
+
+    Every paragraph adds to the score of its parent and, at half weight, its
+    grandparent; class and id names such as "article" or "comment" push a
+    container up or down. Paragraphs in the winning container (and in
+    similarly scored siblings) are kept, except those nested in a
+    negatively named block such as a comment list inside the article.
+    """
+    paragraphs = []
+    labels = {}
+    parents = {}
+    scores = defaultdict(float)
+
+    for p in backend.find_all(doc, "p"):
+        # Text is extracted once per paragraph
+        text = backend.text(p).strip()
+        chain = []
+        for ancestor in backend.ancestors(p):
+            key = backend.key(ancestor)
+            if key not in labels:
+                labels[key] = f"{backend.attr(ancestor, 'class')} {backend.attr(ancestor, 'id')}"
+            if chain:
+                parents.setdefault(chain[-1], key)
+            chain.append(key)
+        paragraphs.append((text, chain))
+
+        if len(text) >= MIN_SCORED_LENGTH and chain:
+            score = 1 + text.count(",") + min(len(text) // 100, 3)
+            scores[chain[0]] += score
+            if len(chain) > 1:
+                scores[chain[1]] += score / 2
+
+    if not scores:
+        return paragraphs, None
+
+    final = {key: score + _class_weight(labels[key]) for key, score in scores.items()}
+    top = max(final, key=final.get)
+    threshold = max(10, final[top] * 0.2)
+    selected = {top}
+    top_parent = parents.get(top)
+    if top_parent is not None:
+        selected.update(
+            key for key, score in final.items()
+            if score >= threshold and parents.get(key) == top_parent
+        )
+
+    kept = []
+    for text, chain in paragraphs:
+        if len(text) <= MIN_PARAGRAPH_LENGTH:
+            continue
+        for key in chain:
+            if key in selected:
+                kept.append(text)
+                break
+            if NEGATIVE_RE.search(labels[key]):
+                break
+    return paragraphs, "\n\n".join(kept)
+
+
+def _content(backend, doc):
+    paragraphs, content = _main_content(backend, doc)
+    if content and len(content) >= MIN_CONTENT_LENGTH:
+        return content
+
+    # No clear main container: every substantial paragraph, as before
+    content = "\n\n".join(text for text, _ in paragraphs if len(text) > MIN_PARAGRAPH_LENGTH)
+    if content and len(content) >= MIN_CONTENT_LENGTH:
+        return content
+
+    # Pages without <p> markup: the first sizeable article/content/post div
+    for div in backend.find_all(doc, "div"):
+        if FALLBACK_DIV_RE.search(backend.attr(div, "class")):
+            text = backend.text(div).strip()
+            if len(text) > MIN_CONTENT_LENGTH:
+                return text
+    return content
+
+
+def extract_article(html, backend=None):
+    """Return ``{"title", "content"}`` for an article page from a single parse."""
+    backend = backend or get_backend()
+    doc = backend.parse(html)
+    if doc is None:
+        return {"title": None, "content": ""}
+    title = backend.first(doc, "h1")
+    if title is None:
+        title = backend.first(doc, "title")
+    return {
+        "title": backend.text(title).strip() if title is not None else None,
+        "content": _content(backend, doc),
+    }
+
+
+def extract_paragraphs(html, backend=None):
+    """Main text of a page as paragraphs separated by blank lines."""
+    backend = backend or get_backend()
+    doc = backend.parse(html)
+    if doc is None:
+        return ""
+    return _content(backend, doc)
+
+
+def extract_links(html, backend=None):
+    """The stripped, non-empty href of every <a> in document order."""
+    backend = backend or get_backend()
+    doc = backend.parse(html)
+    if doc is None:
+        return []
+    hrefs = (backend.attr(a, "href").strip() for a in backend.find_all(doc, "a"))
+    return [href for href in hrefs if href]
@@ -0,0 +1,388 @@
+"""Shared outbound HTTP client for scraping, reference fetching and search.
+
+One pooled ``requests.Session`` serves every caller. Bodies are streamed and
+decompressed incrementally under a byte cap and an overall deadline, so a
+huge or trickling page is abandoned early instead of pinning a worker.
+Transient failures are retried with jittered exponential backoff, each host
+gets a concurrency limit and an optional request rate, and per-caller
+metrics (requests, errors, retries, bytes, latency) are kept in-process.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import get_encoding_from_headers
+from config import Config
+from services.tracing import observe_dependency, register_collector
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+JSON_TYPES = ("application/json",)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CHUNK_SIZE = 64 * 1024
+META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.I)
+
+
+class ResponseTooLarge(requests.exceptions.RequestException):
+    pass
+
+
+class UnexpectedContentType(requests.exceptions.RequestException):
+    pass
+
+
+class DeadlineExceeded(requests.exceptions.ReadTimeout):
+    """The body was still arriving when the overall download deadline passed."""
+
+
+class HttpResponse:
+    """A fully read, size-capped response with the parts of the requests API callers use."""
+
+    def __init__(self, url, status_code, headers, content, reason=""):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.reason = reason
+
+    @property
+    def encoding(self):
+        encoding = get_encoding_from_headers(self.headers)
+        if encoding and "charset" in self.headers.get("Content-Type", "").lower():
+            return encoding
+        match = META_CHARSET_RE.search(self.content[:2048])
+        if match:
+            return match.group(1).decode("ascii")
+        return encoding if encoding and encoding.lower() != "iso-8859-1" else "utf-8"
+
+    @property
+    def text(self):
+        try:
+            return self.content.decode(self.encoding, errors="replace")
+        except LookupError:
+            return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.text)
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            kind = "Client" if self.status_code < 500 else "Server"
+            raise requests.exceptions.HTTPError(
+                f"{self.status_code} {kind} Error: {self.reason} for url: {self.url}", response=self
+            )
+
+
+class _HostLimiter:
+    """Concurrency limit plus an optional minimum interval between request starts."""
+
+    def __init__(self, concurrency, rate):
+        self.semaphore = threading.BoundedSemaphore(concurrency)
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def wait_turn(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class _Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_label = {}
+
+    def _entry(self, label):
+        entry = self._by_label.get(label)
+        if entry is None:
+            entry = {
+                "requests": 0,
+                "errors": {},
+                "retries": 0,
+                "bytes_received": 0,
+                "bytes_decoded": 0,
+                "latency_sum": 0.0,
+                "latency_max": 0.0,
+                "latency_buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+            }
+            self._by_label[label] = entry
+        return entry
+
+    def observe(self, label, seconds, wire_bytes=0, decoded_bytes=0, error=None):
+        observe_dependency(label, seconds, "error" if error else "ok")
+        with self._lock:
+            entry = self._entry(label)
+            entry["requests"] += 1
+            entry["bytes_received"] += wire_bytes
+            entry["bytes_decoded"] += decoded_bytes
+            entry["latency_sum"] += seconds
+            entry["latency_max"] = max(entry["latency_max"], seconds)
+            bucket = next((i for i, le in enumerate(LATENCY_BUCKETS) if seconds <= le), len(LATENCY_BUCKETS))
+            entry["latency_buckets"][bucket] += 1
+            if error:
+                entry["errors"][error] = entry["errors"].get(error, 0) + 1
+
+    def retry(self, label):
+        with self._lock:
+            self._entry(label)["retries"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for label, entry in self._by_label.items():
+                requests_made = entry["requests"]
+                result[label] = {
+                    "requests": requests_made,
+                    "errors": dict(entry["errors"]),
+                    "error_count": sum(entry["errors"].values()),
+                    "retries": entry["retries"],
+                    "bytes_received": entry["bytes_received"],
+                    "bytes_decoded": entry["bytes_decoded"],
+                    "latency_avg_ms": round(entry["latency_sum"] / requests_made * 1000, 1) if requests_made else None,
+                    "latency_max_ms": round(entry["latency_max"] * 1000, 1),
+                    "latency_buckets": dict(zip([*map(str, LATENCY_BUCKETS), "+Inf"], entry["latency_buckets"])),
+                }
+            return result
+
+    def prometheus(self):
+        """Counters in the Prometheus text format (latency is in dependency_duration_seconds)."""
+        snapshot = self.snapshot()
+        lines = []
+        for metric, key in (
+            ("outbound_http_requests_total", "requests"),
+            ("outbound_http_retries_total", "retries"),
+            ("outbound_http_bytes_received_total", "bytes_received"),
+            ("outbound_http_bytes_decoded_total", "bytes_decoded"),
+        ):
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(f'{metric}{{dependency="{label}"}} {entry[key]}' for label, entry in sorted(snapshot.items()))
+        lines.append("# TYPE outbound_http_errors_total counter")
+        for label, entry in sorted(snapshot.items()):
+            lines.extend(
+                f'outbound_http_errors_total{{dependency="{label}",kind="{kind}"}} {count}'
+                for kind, count in sorted(entry["errors"].items())
+            )
+        return lines
+
+
+def _error_kind(error):
+    if isinstance(error, ResponseTooLarge):
+        return "too_large"
+    if isinstance(error, UnexpectedContentType):
+        return "content_type"
+    if isinstance(error, DeadlineExceeded):
+        return "deadline"
+    if isinstance(error, requests.exceptions.ContentDecodingError):
+        return "decoding"
+    if isinstance(error, requests.exceptions.Timeout):
+        return "timeout"
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return "connection"
+    return "other"
+
+
+def _decoder(content_encoding):
+    """Incremental decompressor for a Content-Encoding, or None for identity."""
+    encoding = (content_encoding or "").strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return zlib.decompressobj()
+    return None
+
+
+class HttpClient:
+    def __init__(self, pool_size, max_bytes, timeout, max_duration, retries,
+                 backoff_base, backoff_max, per_host_concurrency, per_host_rate):
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.max_duration = max_duration
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.per_host_concurrency = per_host_concurrency
+        self.per_host_rate = per_host_rate
+        self.metrics = _Metrics()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Only encodings that can be decompressed incrementally under the cap
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+
+        self._hosts = {}
+        self._hosts_lock = threading.Lock()
+
+    def _limiter(self, url):
+        host = urlparse(url).netloc
+        with self._hosts_lock:
+            limiter = self._hosts.get(host)
+            if limiter is None:
+                limiter = _HostLimiter(self.per_host_concurrency, self.per_host_rate)
+                self._hosts[host] = limiter
+        return limiter
+
+    def _backoff(self, attempt, retry_after=None):
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        time.sleep(delay)
+
+    def _chunks(self, response, decode_content):
+        # read1 returns whatever has arrived, so slow bodies still hit the deadline check
+        read1 = getattr(response.raw, "read1", None)
+        if read1 is None:
+            yield from response.raw.stream(CHUNK_SIZE, decode_content=decode_content)
+            return
+        while True:
+            chunk = read1(CHUNK_SIZE, decode_content=decode_content)
+            if not chunk:
+                return
+            yield chunk
+
+    def _read_body(self, response, max_bytes, deadline, progress):
+        """Read and decompress the body chunk by chunk, stopping at the cap or deadline."""
+        content_encoding = response.headers.get("Content-Encoding")
+        length = response.headers.get("Content-Length")
+        if length and length.isdigit() and content_encoding is None and int(length) > max_bytes:
+            raise ResponseTooLarge(f"{response.url} is {length} bytes (limit {max_bytes})")
+
+        decoder = _decoder(content_encoding)
+        # Anything other than gzip/deflate/identity is left to urllib3 to decode
+        decode_in_urllib3 = decoder is None and content_encoding not in (None, "identity")
+        body = bytearray()
+        # A corrupt body surfaces as the RequestException callers already handle
+        try:
+            for chunk in self._chunks(response, decode_in_urllib3):
+                progress["wire_bytes"] += len(chunk)
+                if decoder is not None:
+                    # Bounded output per step guards against decompression bombs
+                    body += decoder.decompress(chunk, max_bytes - len(body) + 1)
+                    while decoder.unconsumed_tail and len(body) <= max_bytes:
+                        body += decoder.decompress(decoder.unconsumed_tail, max_bytes - len(body) + 1)
+                else:
+                    body += chunk
+                if len(body) > max_bytes:
+                    raise ResponseTooLarge(f"{response.url} exceeded {max_bytes} bytes")
+                if time.monotonic() > deadline:
+                    raise DeadlineExceeded(f"{response.url} took longer than {self.max_duration}s")
+            if decoder is not None:
+                body += decoder.flush()
+        except zlib.error as e:
+            raise requests.exceptions.ContentDecodingError(
+                f"{response.url} has a malformed {content_encoding} body: {e}"
+            ) from e
+        if len(body) > max_bytes:
+            raise ResponseTooLarge(f"{response.url} exceeded {max_bytes} bytes")
+        return bytes(body)
+
+    def _attempt(self, method, url, label, max_bytes, allowed_types, kwargs):
+        limiter = self._limiter(url)
+        progress = {"wire_bytes": 0}
+        body = b""
+        with limiter.semaphore:
+            limiter.wait_turn()
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, stream=True, **kwargs)
+                try:
+                    content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+                    if (
+                        allowed_types and content_type and response.status_code < 300
+                        and content_type not in allowed_types
+                    ):
+                        raise UnexpectedContentType(f"{url} returned {content_type}")
+                    if method != "HEAD":
+                        body = self._read_body(response, max_bytes, started + self.max_duration, progress)
+                finally:
+                    response.close()
+            except requests.exceptions.RequestException as e:
+                self.metrics.observe(label, time.monotonic() - started, progress["wire_bytes"], error=_error_kind(e))
+                raise
+
+        error = f"http_{response.status_code}" if response.status_code >= 400 else None
+        self.metrics.observe(label, time.monotonic() - started, progress["wire_bytes"], len(body), error=error)
+        return HttpResponse(response.url, response.status_code, response.headers, body, response.reason)
+
+    def request(self, method, url, label="default", max_bytes=None, allowed_types=None, retries=None, **kwargs):
+        """Send a request and return an ``HttpResponse`` with the whole (capped) body.
+
+        Connection errors, timeouts and 429/5xx responses are retried up to
+        ``retries`` times; oversized, wrongly typed or overly slow downloads
+        are not.
+        ``label`` groups the metrics, e.g. "scrape" or "search".
+        """
+        max_bytes = max_bytes or self.max_bytes
+        retries = self.retries if retries is None else retries
+        kwargs.setdefault("timeout", self.timeout)
+
+        for attempt in range(retries + 1):
+            last_attempt = attempt == retries
+            try:
+                response = self._attempt(method, url, label, max_bytes, allowed_types, kwargs)
+            except (ResponseTooLarge, UnexpectedContentType, DeadlineExceeded):
+                raise
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if last_attempt:
+                    raise
+                self.metrics.retry(label)
+                self._backoff(attempt)
+                continue
+
+            if response.status_code in RETRY_STATUSES and not last_attempt:
+                retry_after = response.headers.get("Retry-After", "")
+                self.metrics.retry(label)
+                self._backoff(attempt, float(retry_after) if retry_after.isdigit() else None)
+                continue
+            return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Return the process-wide HTTP client."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient(
+                    pool_size=Config.HTTP_POOL_SIZE,
+                    max_bytes=Config.HTTP_MAX_RESPONSE_BYTES,
+                    timeout=Config.HTTP_TIMEOUT,
+                    max_duration=Config.HTTP_MAX_DURATION,
+                    retries=Config.HTTP_RETRIES,
+                    backoff_base=Config.HTTP_BACKOFF_BASE,
+                    backoff_max=Config.HTTP_BACKOFF_MAX,
+                    per_host_concurrency=Config.HTTP_PER_HOST_CONCURRENCY,
+                    per_host_rate=Config.HTTP_PER_HOST_RATE,
+                )
+    return _client
+
+
+register_collector(lambda: _client.metrics.prometheus() if _client is not None else [])
@@ -0,0 +1,80 @@
+"""On-disk snapshots of the numpy arrays behind the article indexes.
+
+Every save writes all of an index's arrays into a new snapshot directory
+and then swaps the CURRENT pointer file to it with a single os.replace.
+Readers follow the pointer, so they see every array of one save and never
+a mix of files from workers that saved at the same time. Each array stays
+a plain .npy file, so it can still be memory-mapped.
+"""
+
+import os
+import shutil
+import time
+import uuid
+
+import numpy as np
+
+CURRENT_FILE = "CURRENT"
+# Older snapshots are removed once they are this old, which leaves a
+# concurrent save time to finish writing before its directory could go
+SNAPSHOT_GRACE_SECONDS = 300
+
+
+def has_snapshot(path):
+    return os.path.exists(os.path.join(path, CURRENT_FILE))
+
+
+def save_arrays(path, arrays):
+    """Write ``arrays`` (name -> ndarray) as the new current snapshot under ``path``."""
+    os.makedirs(path, exist_ok=True)
+    snapshot = f"snapshot-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    directory = os.path.join(path, snapshot)
+    os.makedirs(directory)
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f"{name}.npy"), array)
+
+    pointer = os.path.join(path, f"{CURRENT_FILE}.{snapshot}.tmp")
+    with open(pointer, "w") as f:
+        f.write(snapshot)
+    os.replace(pointer, os.path.join(path, CURRENT_FILE))
+    _remove_old_snapshots(path)
+
+
+def load_arrays(path, names, mmap_names=()):
+    """The arrays of the current snapshot under ``path``, or None when there is none.
+
+    Arrays named in ``mmap_names`` are opened memory-mapped (read-only).
+    """
+    # A concurrent save may remove the snapshot between reading the pointer
+    # and opening its files; the pointer has moved on by then, so read it again
+    for _ in range(3):
+        try:
+            with open(os.path.join(path, CURRENT_FILE)) as f:
+                directory = os.path.join(path, f.read().strip())
+            return {
+                name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if name in mmap_names else None)
+                for name in names
+            }
+        except FileNotFoundError:
+            if not has_snapshot(path):
+                return None
+    return None
+
+
+def _remove_old_snapshots(path):
+    try:
+        with open(os.path.join(path, CURRENT_FILE)) as f:
+            current = f.read().strip()
+    except FileNotFoundError:
+        return
+    cutoff = time.time() - SNAPSHOT_GRACE_SECONDS
+    for entry in os.scandir(path):
+        if not entry.name.startswith("snapshot-") or entry.name == current:
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                # Memory-mapped readers keep their pages; on Windows the
+                # directory is retried after the next save
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            pass
@@ -0,0 +1,240 @@
+from sqlalchemy import insert, select, update
+
+from models import db, Article, content_hash, parse_references
+from config import Config
+
+# SQLite limits bound parameters per statement; keep IN lists well below it
+LOOKUP_CHUNK = 500
+
+FIELDS = ("title", "content", "source_url", "type", "references")
+# Only written when a record carries them, so a re-scrape keeps existing links
+LINK_FIELDS = ("parent_id", "duplicate_of", "rewrite_key")
+
+
+def _normalize(record):
+    if not record.get("title") or not record.get("content"):
+        return None
+    row = {field: record.get(field) for field in FIELDS}
+    row["type"] = row["type"] or "original"
+    row["references"] = parse_references(row["references"])
+    row["content_hash"] = content_hash(row["title"], row["content"])
+    for field in LINK_FIELDS:
+        if record.get(field) is not None:
+            row[field] = record[field]
+    return row
+
+
+def _existing_without_url(rows):
+    """Existing articles matching rows that have no source_url.
+
+    Returns ({rewrite_key: (id, content_hash)}, {(content_hash, type): id}).
+    """
+    by_key = {}
+    keys = list({row["rewrite_key"] for row in rows if row.get("rewrite_key")})
+    for start in range(0, len(keys), LOOKUP_CHUNK):
+        for article_id, key, stored_hash in db.session.execute(
+            select(Article.id, Article.rewrite_key, Article.content_hash)
+            .where(Article.type == "updated", Article.rewrite_key.in_(keys[start:start + LOOKUP_CHUNK]))
+            .order_by(Article.id)
+        ):
+            by_key.setdefault(key, (article_id, stored_hash))
+
+    by_content = {}
+    hashes = list({row["content_hash"] for row in rows})
+    for start in range(0, len(hashes), LOOKUP_CHUNK):
+        for article_id, stored_hash, article_type in db.session.execute(
+            select(Article.id, Article.content_hash, Article.type)
+            .where(Article.source_url.is_(None), Article.content_hash.in_(hashes[start:start + LOOKUP_CHUNK]))
+            .order_by(Article.id)
+        ):
+            by_content.setdefault((stored_hash, article_type), article_id)
+    return by_key, by_content
+
+
+def bulk_upsert_articles(records, update_changed=True, commit=True, near_duplicates=None):
+    """Insert or update many articles with a constant number of queries.
+
+    Existing rows are matched on source_url with one IN query per chunk.
+    Unknown URLs are inserted in a single executemany; known URLs are
+    updated only when ``update_changed`` is set and their content hash
+    differs, otherwise they are skipped. Records without a source_url
+    (rewrites) are matched on rewrite_key, or else on an identical title,
+    content and type, so loading the same rows twice does not copy them.
+    parent_id, duplicate_of and rewrite_key are stored when a record has
+    them. A URL that another writer inserts between the lookup and the
+    insert is not an error: ON CONFLICT leaves the row out, and it is then
+    handled like a URL that was found.
+
+    New originals that nearly duplicate an existing original (or an
+    earlier record of the batch) are linked to it through duplicate_of or
+    skipped, as ``near_duplicates`` ("link", "skip" or "off", default
+    Config.NEAR_DUPLICATE_ACTION) says. Returns counts of added, updated,
+    skipped, invalid and near-duplicate records.
+    """
+    counts = {"added": 0, "updated": 0, "skipped": 0, "invalid": 0, "duplicates": 0}
+    near_duplicates = near_duplicates or Config.NEAR_DUPLICATE_ACTION
+
+    rows_by_url = {}
+    rows_without_url = []
+    for record in records:
+        row = _normalize(record)
+        if row is None:
+            counts["invalid"] += 1
+        elif row["source_url"]:
+            if row["source_url"] in rows_by_url:
+                counts["skipped"] += 1
+            # Later duplicates in the same batch win
+            rows_by_url[row["source_url"]] = row
+        else:
+            rows_without_url.append(row)
+
+    existing = _existing_by_url(list(rows_by_url))
+
+    inserts = []
+    updates = []
+    by_key, by_content = _existing_without_url(rows_without_url)
+    seen = set()
+    for row in rows_without_url:
+        key = row.get("rewrite_key")
+        content_key = (row["content_hash"], row["type"])
+        if (key and key in seen) or content_key in seen:
+            counts["skipped"] += 1
+            continue
+        seen.add(content_key)
+        if key:
+            seen.add(key)
+        if key in by_key:
+            article_id, stored_hash = by_key[key]
+            if update_changed and stored_hash != row["content_hash"]:
+                updates.append({"id": article_id, **row})
+            else:
+                counts["skipped"] += 1
+        elif content_key in by_content:
+            counts["skipped"] += 1
+        else:
+            inserts.append(row)
+
+    for url, row in rows_by_url.items():
+        if url not in existing:
+            inserts.append(row)
+            continue
+        article_id, stored_hash = existing[url]
+        if update_changed and stored_hash != row["content_hash"]:
+            updates.append({"id": article_id, **row})
+        else:
+            counts["skipped"] += 1
+
+    taken = []
+    if inserts and near_duplicates in ("link", "skip"):
+        inserts, taken = _insert_checking_duplicates(inserts, near_duplicates, counts)
+    elif inserts:
+        _, taken = _insert_new(inserts)
+        inserts = _without_taken(inserts, taken)
+    for row, article_id, stored_hash in taken:
+        if update_changed and stored_hash != row["content_hash"]:
+            updates.append({"id": article_id, **row})
+        else:
+            counts["skipped"] += 1
+    if updates:
+        db.session.execute(update(Article), updates)
+    if commit:
+        db.session.commit()
+
+    counts["added"] = len(inserts)
+    counts["updated"] = len(updates)
+    return counts
+
+
+def _existing_by_url(urls):
+    """{source_url: (id, content_hash)} of the articles at ``urls``."""
+    existing = {}
+    for start in range(0, len(urls), LOOKUP_CHUNK):
+        for article_id, url, stored_hash in db.session.execute(
+            select(Article.id, Article.source_url, Article.content_hash)
+            .where(Article.source_url.in_(urls[start:start + LOOKUP_CHUNK]))
+        ):
+            existing[url] = (article_id, stored_hash)
+    return existing
+
+
+def _insert_skipping_url_conflicts():
+    """INSERT that leaves out rows whose source_url already exists, where the database supports it."""
+    dialect = db.engine.dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return insert(Article)
+    return dialect_insert(Article).on_conflict_do_nothing(index_elements=["source_url"])
+
+
+def _insert_new(rows):
+    """Insert ``rows`` and return (ids, taken).
+
+    ``ids`` is aligned with ``rows``. A row whose source_url another writer
+    inserted since it was looked up is skipped instead of failing the whole
+    statement on the unique index; its entry in ``ids`` is that article's
+    id, and ``taken`` lists it as (row, id, stored content_hash).
+    """
+    ids = [None] * len(rows)
+    plain = [i for i, row in enumerate(rows) if not row["source_url"]]
+    with_url = [i for i, row in enumerate(rows) if row["source_url"]]
+    if plain:
+        new_ids = db.session.scalars(
+            insert(Article).returning(Article.id, sort_by_parameter_order=True), [rows[i] for i in plain]
+        ).all()
+        for i, article_id in zip(plain, new_ids):
+            ids[i] = article_id
+
+    taken = []
+    if with_url:
+        inserted = {
+            url: article_id for article_id, url in db.session.execute(
+                _insert_skipping_url_conflicts().returning(Article.id, Article.source_url),
+                [rows[i] for i in with_url],
+            )
+        }
+        existing = _existing_by_url([rows[i]["source_url"] for i in with_url if rows[i]["source_url"] not in inserted])
+        for i in with_url:
+            url = rows[i]["source_url"]
+            if url in inserted:
+                ids[i] = inserted[url]
+            else:
+                ids[i], stored_hash = existing[url]
+                taken.append((rows[i], ids[i], stored_hash))
+    return ids, taken
+
+
+def _without_taken(rows, taken):
+    taken_rows = {id(row) for row, _, _ in taken}
+    return [row for row in rows if id(row) not in taken_rows]
+
+
+def _insert_checking_duplicates(rows, action, counts):
+    """Insert ``rows`` minus their near-duplicates, then link or drop those.
+
+    Returns (inserted rows, taken) like _insert_new.
+    """
+    # numpy is only loaded once something is ingested
+    from services.near_duplicates import partition_near_duplicates, remember_signatures
+
+    unique, signatures, duplicates = partition_near_duplicates(rows)
+    counts["duplicates"] = len(duplicates)
+    ids, taken = [], []
+    if unique:
+        ids, taken = _insert_new(unique)
+        taken_rows = {id(row) for row, _, _ in taken}
+        kept = [i for i, row in enumerate(unique) if id(row) not in taken_rows]
+        remember_signatures(db.session, [ids[i] for i in kept], [unique[i] for i in kept], [signatures[i] for i in kept])
+    inserted = _without_taken(unique, taken)
+    if action == "skip" or not duplicates:
+        return inserted, taken
+
+    # A batch row that lost its URL to another writer links to that writer's article
+    linked = [
+        dict(row, duplicate_of=article_id if article_id is not None else ids[position])
+        for row, article_id, position in duplicates
+    ]
+    _, linked_taken = _insert_new(linked)
+    return inserted + _without_taken(linked, linked_taken), taken + linked_taken
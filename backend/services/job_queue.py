@@ -0,0 +1,283 @@
+import queue
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from models import db, Article, RewriteBatch, RewriteJob
+from config import Config
+from services.batch_rewriter import BatchRewrite
+from services.rewrite_pipeline import run_rewrite, RewriteError
+from services.tracing import trace
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+
+class QueueFull(Exception):
+    """Raised when the rewrite queue is at capacity."""
+
+
+class RewriteJobQueue:
+    """Bounded pool of background workers running the rewrite pipeline.
+
+    Jobs are persisted as RewriteJob rows before they are queued, so work
+    that was queued (or orphaned while running) when the process stopped is
+    picked up again when the queue starts. Workers claim a job with a
+    conditional UPDATE, which keeps several processes sharing one database
+    from running the same job twice.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        # Workers start with the first request rather than at import time, so
+        # the reloader's watcher process and CLI scripts never run jobs.
+        app.before_request(self.start)
+
+    def start(self):
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            for index in range(Config.REWRITE_WORKERS):
+                threading.Thread(
+                    target=self._worker, name=f"rewrite-worker-{index}", daemon=True
+                ).start()
+            self._started = True
+        threading.Thread(target=self._resume, name="rewrite-resume", daemon=True).start()
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def submit(self, article_id, force=False):
+        """Persist and enqueue a job; raises QueueFull when the backlog is at capacity.
+
+        ``force`` rewrites again even if a cached rewrite of the same inputs exists.
+        """
+        self.start()
+        with self._lock:
+            if self._queue.qsize() >= Config.REWRITE_QUEUE_SIZE:
+                raise QueueFull(
+                    f"Rewrite queue is full ({Config.REWRITE_QUEUE_SIZE} jobs pending). Please retry later."
+                )
+            job = RewriteJob(id=uuid.uuid4().hex, article_id=article_id, status="queued", force=force)
+            db.session.add(job)
+            db.session.commit()
+            self._queue.put(job.id)
+        return job
+
+    def _resume(self):
+        with self.app.app_context():
+            stale_before = datetime.utcnow() - timedelta(seconds=Config.REWRITE_JOB_STALE_SECONDS)
+            RewriteJob.query.filter(
+                RewriteJob.status == "running",
+                RewriteJob.updated_at < stale_before,
+            ).update({"status": "queued", "stage": None}, synchronize_session=False)
+            db.session.commit()
+
+            job_ids = [
+                job_id for (job_id,) in db.session.query(RewriteJob.id)
+                .filter(RewriteJob.status == "queued")
+                .order_by(RewriteJob.created_at)
+            ]
+
+        if job_ids:
+            print(f"Resuming {len(job_ids)} queued rewrite job(s)")
+        for job_id in job_ids:
+            self._queue.put(job_id)
+
+    def _worker(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                with self.app.app_context():
+                    self._run(job_id)
+            except Exception as e:
+                print(f"Rewrite job {job_id} crashed: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job_id):
+        # The job id doubles as the request id of the job's trace
+        with trace(job_id, "rewrite_job"):
+            self._run_job(job_id)
+
+    def _run_job(self, job_id):
+        claimed = RewriteJob.query.filter_by(id=job_id, status="queued").update(
+            {"status": "running", "updated_at": datetime.utcnow()}, synchronize_session=False
+        )
+        db.session.commit()
+        if not claimed:
+            return
+
+        job = db.session.get(RewriteJob, job_id)
+
+        def progress(stage):
+            job.stage = stage
+            db.session.commit()
+
+        try:
+            updated = run_rewrite(job.article_id, progress=progress, force=bool(job.force))
+            job.status = "succeeded"
+            job.result_article_id = updated.id
+        except RewriteError as e:
+            db.session.rollback()
+            job.status = "failed"
+            job.error = e.message
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            db.session.rollback()
+            job.status = "failed"
+            job.error = f"Failed to rewrite article: {str(e)}"
+        db.session.commit()
+
+
+class RewriteBatchQueue:
+    """Runs batch rewrites one after another on a background thread.
+
+    Batches are persisted as RewriteBatch rows like single jobs, and each
+    one already fans out over BatchRewrite's stage pools, so a single
+    worker is enough. Progress and per-article results are written to the
+    row as articles finish.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.before_request(self.start)
+
+    def start(self):
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            threading.Thread(target=self._worker, name="rewrite-batch-worker", daemon=True).start()
+            self._started = True
+        threading.Thread(target=self._resume, name="rewrite-batch-resume", daemon=True).start()
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def submit(self, article_ids, missing_ids=(), options=None):
+        """Persist and enqueue a batch; raises QueueFull when the backlog is at capacity."""
+        self.start()
+        with self._lock:
+            if self._queue.qsize() >= Config.BATCH_QUEUE_SIZE:
+                raise QueueFull(
+                    f"Batch queue is full ({Config.BATCH_QUEUE_SIZE} batches pending). Please retry later."
+                )
+            batch = RewriteBatch(
+                id=uuid.uuid4().hex,
+                status="queued",
+                article_ids=list(article_ids),
+                missing_ids=list(missing_ids),
+                options=options or {},
+            )
+            db.session.add(batch)
+            db.session.commit()
+            self._queue.put(batch.id)
+        return batch
+
+    def _resume(self):
+        with self.app.app_context():
+            stale_before = datetime.utcnow() - timedelta(seconds=Config.REWRITE_JOB_STALE_SECONDS)
+            RewriteBatch.query.filter(
+                RewriteBatch.status == "running",
+                RewriteBatch.updated_at < stale_before,
+            ).update({"status": "queued", "completed": 0}, synchronize_session=False)
+            db.session.commit()
+
+            batch_ids = [
+                batch_id for (batch_id,) in db.session.query(RewriteBatch.id)
+                .filter(RewriteBatch.status == "queued")
+                .order_by(RewriteBatch.created_at)
+            ]
+
+        if batch_ids:
+            print(f"Resuming {len(batch_ids)} queued rewrite batch(es)")
+        for batch_id in batch_ids:
+            self._queue.put(batch_id)
+
+    def _worker(self):
+        while True:
+            batch_id = self._queue.get()
+            try:
+                with self.app.app_context():
+                    self._run(batch_id)
+            except Exception as e:
+                print(f"Rewrite batch {batch_id} crashed: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _run(self, batch_id):
+        with trace(batch_id, "rewrite_batch"):
+            self._run_batch(batch_id)
+
+    def _run_batch(self, batch_id):
+        claimed = RewriteBatch.query.filter_by(id=batch_id, status="queued").update(
+            {"status": "running", "updated_at": datetime.utcnow()}, synchronize_session=False
+        )
+        db.session.commit()
+        if not claimed:
+            return
+
+        batch = db.session.get(RewriteBatch, batch_id)
+        options = batch.options or {}
+        # Articles deleted since the batch was queued are simply not rewritten
+        articles = Article.query.filter(Article.id.in_(batch.article_ids)).order_by(Article.id).all()
+        missing = [
+            {"article_id": article_id, "status": "failed", "error": "Article not found or not selected by the filter", "timings": {}}
+            for article_id in batch.missing_ids or []
+        ]
+        db.session.commit()
+
+        def progress(completed, results):
+            # Runs on a stage thread, so it writes through its own session
+            with self.app.app_context():
+                RewriteBatch.query.filter_by(id=batch_id).update(
+                    {"completed": completed, "results": [dict(r) for r in results], "updated_at": datetime.utcnow()},
+                    synchronize_session=False,
+                )
+                db.session.commit()
+
+        try:
+            results, summary = BatchRewrite(
+                self.app,
+                search_concurrency=options.get("search_concurrency"),
+                fetch_concurrency=options.get("fetch_concurrency"),
+                llm_concurrency=options.get("llm_concurrency"),
+                force=bool(options.get("force")),
+            ).run(articles, progress=progress)
+            batch = db.session.get(RewriteBatch, batch_id, populate_existing=True)
+            batch.status = "succeeded"
+            batch.results = results + missing
+            batch.completed = len(batch.results)
+            batch.summary = summary
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            db.session.rollback()
+            batch = db.session.get(RewriteBatch, batch_id, populate_existing=True)
+            batch.status = "failed"
+            batch.error = f"Batch rewrite failed: {str(e)}"
+        db.session.commit()
+
+
+rewrite_queue = RewriteJobQueue()
+batch_queue = RewriteBatchQueue()
@@ -1,12 +1,32 @@
-import cohere
+import threading
+import time
+
 from config import Config
+from services.model_router import get_router
+from services.tracing import span
 
-def rewrite_article(original, ref1, ref2, reference_links):
+# Sampling temperature for every rewrite (part of the rewrite cache key)
+TEMPERATURE = 0.6
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide Cohere client, creating it on first use."""
+    global _client
     if not Config.COHERE_API_KEY:
         raise RuntimeError("COHERE_API_KEY is not set")
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # The SDK (and its httpx/pydantic stack) is only loaded once a rewrite needs it
+                import cohere
+                _client = cohere.ClientV2(api_key=Config.COHERE_API_KEY, base_url=Config.COHERE_BASE_URL)
+    return _client
 
-    co = cohere.ClientV2(api_key=Config.COHERE_API_KEY)
 
+def build_messages(original, ref1, ref2, reference_links):
     system_message = (
         "You are an expert SEO content editor. "
         "Rewrite articles to be well-structured, clear, professional, "
@@ -29,36 +49,102 @@ REFERENCE ARTICLE 2:
 At the end, add a section titled "References" and list:
 {reference_links}
 """
+    return [
+        {"role": "system", "content": system_message},
+        {"role": "user", "content": user_message},
+    ]
+
+
+def _model_unavailable(error):
+    error_str = str(error).lower()
+    return "not found" in error_str or "removed" in error_str or "404" in error_str
 
-    # Try different models - command-r-plus is the latest, command-r is a fallback
-    models_to_try = ["command-r7b-12-2024","command-r-plus", "command-r", "command-r7b"]
+
+def _all_models_failed(tried, last_error):
+    return RuntimeError(
+        f"Failed to rewrite article. Tried models: {', '.join(tried) or 'none available'}. "
+        f"Last error: {str(last_error) if last_error else 'Unknown error'}. "
+        "Please check: https://docs.cohere.com/docs/models for available models."
+    )
+
+
+def rewrite_article(original, ref1, ref2, reference_links):
+    co = get_client()
+    router = get_router()
+    messages = build_messages(original, ref1, ref2, reference_links)
+    tried = []
     last_error = None
-    
-    for model_name in models_to_try:
-        try:
-            response = co.chat(
-                model=model_name,
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": user_message},
-                ],
-                temperature=0.6,
-            )
+
+    with router.guard():
+        # Models remembered as unavailable are skipped; healthy, fast ones go first
+        for model_name in router.candidates():
+            tried.append(model_name)
+            started = time.perf_counter()
+            try:
+                with span("llm", dependency="cohere", model=model_name):
+                    response = co.chat(
+                        model=model_name,
+                        messages=messages,
+                        temperature=TEMPERATURE,
+                    )
+            except Exception as e:
+                last_error = e
+                # If model not found, try next model
+                if _model_unavailable(e):
+                    print(f"Model {model_name} not available, trying next model...")
+                    router.record_unavailable(model_name)
+                    continue
+                # For other errors, raise immediately
+                router.record_failure(model_name, time.perf_counter() - started)
+                raise RuntimeError(f"Cohere API error with model {model_name}: {str(e)}")
+
+            router.record_success(model_name, time.perf_counter() - started)
             # Success! Extract and return the content
             return response.message.content[0].text.strip()
-        except Exception as e:
-            last_error = e
-            error_str = str(e).lower()
-            # If model not found, try next model
-            if "not found" in error_str or "removed" in error_str or "404" in error_str:
-                print(f"Model {model_name} not available, trying next model...")
-                continue
-            # For other errors, raise immediately
-            raise RuntimeError(f"Cohere API error with model {model_name}: {str(e)}")
-    
+
     # If all models failed
-    raise RuntimeError(
-        f"Failed to rewrite article. Tried models: {', '.join(models_to_try)}. "
-        f"Last error: {str(last_error) if last_error else 'Unknown error'}. "
-        "Please check: https://docs.cohere.com/docs/models for available models."
-    )
+    raise _all_models_failed(tried, last_error)
+
+
+def rewrite_article_stream(original, ref1, ref2, reference_links):
+    """Generator yielding the rewritten article as text chunks while Cohere generates it.
+
+    Falls back to the next model only while nothing has been yielded yet;
+    an error after the first chunk is raised to the caller.
+    """
+    co = get_client()
+    router = get_router()
+    messages = build_messages(original, ref1, ref2, reference_links)
+    tried = []
+    last_error = None
+
+    with router.guard():
+        for model_name in router.candidates():
+            tried.append(model_name)
+            started = time.perf_counter()
+            streamed = False
+            try:
+                with span("llm", dependency="cohere", model=model_name, stream=True):
+                    for event in co.chat_stream(
+                        model=model_name,
+                        messages=messages,
+                        temperature=TEMPERATURE,
+                    ):
+                        if event.type == "content-delta":
+                            text = event.delta.message.content.text
+                            if text:
+                                streamed = True
+                                yield text
+            except Exception as e:
+                last_error = e
+                if not streamed and _model_unavailable(e):
+                    print(f"Model {model_name} not available, trying next model...")
+                    router.record_unavailable(model_name)
+                    continue
+                router.record_failure(model_name, time.perf_counter() - started)
+                raise RuntimeError(f"Cohere API error with model {model_name}: {str(e)}")
+
+            router.record_success(model_name, time.perf_counter() - started)
+            return
+
+    raise _all_models_failed(tried, last_error)
@@ -0,0 +1,156 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from config import Config
+
+
+class CircuitOpen(RuntimeError):
+    """Raised when the LLM upstream has been failing and calls are short-circuited."""
+
+
+class ModelRouter:
+    """Picks which LLM model to try first and guards the upstream with a circuit breaker.
+
+    * Models reported as unavailable (404 / removed) are skipped until
+      ``unavailable_ttl`` seconds have passed, then retried.
+    * Latency and error rate are tracked per model as exponentially weighted
+      moving averages; healthy models are tried fastest first, models with
+      no measurements yet keep their configured order after measured ones.
+    * ``failure_threshold`` consecutive upstream errors open the circuit for
+      ``reset_timeout`` seconds. After that a single probe call is let
+      through (half-open); its success closes the circuit again.
+    """
+
+    def __init__(self, models, unavailable_ttl, failure_threshold, reset_timeout,
+                 max_error_rate=0.5, alpha=0.2):
+        self.models = list(models)
+        self.unavailable_ttl = unavailable_ttl
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_error_rate = max_error_rate
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._health = {
+            model: {"unavailable_until": 0.0, "latency": None, "error_rate": 0.0, "calls": 0, "errors": 0}
+            for model in self.models
+        }
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    def _state(self, now):
+        if self._opened_at is None:
+            return "closed"
+        if now - self._opened_at < self.reset_timeout:
+            return "open"
+        return "half-open"
+
+    @contextmanager
+    def guard(self):
+        """Wrap one logical LLM request; raises CircuitOpen instead of calling a failing upstream."""
+        probe = False
+        with self._lock:
+            state = self._state(time.time())
+            if state == "open" or (state == "half-open" and self._probe_in_flight):
+                retry_in = self.reset_timeout - (time.time() - self._opened_at)
+                raise CircuitOpen(
+                    f"LLM upstream is failing; not calling it for another {max(retry_in, 0):.0f}s"
+                )
+            if state == "half-open":
+                self._probe_in_flight = probe = True
+        try:
+            yield
+        finally:
+            if probe:
+                with self._lock:
+                    self._probe_in_flight = False
+
+    def candidates(self):
+        """Models to try, in order, excluding ones currently marked unavailable."""
+        now = time.time()
+        with self._lock:
+            available = [
+                (index, model) for index, model in enumerate(self.models)
+                if self._health[model]["unavailable_until"] <= now
+            ]
+
+            def key(item):
+                index, model = item
+                health = self._health[model]
+                latency = health["latency"]
+                return (
+                    health["error_rate"] > self.max_error_rate,
+                    latency is None,
+                    latency or 0.0,
+                    index,
+                )
+
+            return [model for _, model in sorted(available, key=key)]
+
+    def _observe(self, model, latency, error):
+        health = self._health[model]
+        health["calls"] += 1
+        health["errors"] += int(error)
+        health["error_rate"] += self.alpha * (float(error) - health["error_rate"])
+        if latency is not None and not error:
+            if health["latency"] is None:
+                health["latency"] = latency
+            else:
+                health["latency"] += self.alpha * (latency - health["latency"])
+
+    def record_success(self, model, latency):
+        with self._lock:
+            self._observe(model, latency, error=False)
+            self._consecutive_failures = 0
+            self._opened_at = None
+
+    def record_failure(self, model, latency=None):
+        with self._lock:
+            self._observe(model, latency, error=True)
+            self._consecutive_failures += 1
+            state = self._state(time.time())
+            if state == "half-open" or self._consecutive_failures >= self.failure_threshold:
+                self._opened_at = time.time()
+                print(f"LLM circuit opened after {self._consecutive_failures} consecutive failures")
+
+    def record_unavailable(self, model):
+        with self._lock:
+            self._health[model]["unavailable_until"] = time.time() + self.unavailable_ttl
+
+    def snapshot(self):
+        now = time.time()
+        with self._lock:
+            models = {}
+            for model, health in self._health.items():
+                models[model] = {
+                    "available": health["unavailable_until"] <= now,
+                    "latency_seconds": round(health["latency"], 3) if health["latency"] is not None else None,
+                    "error_rate": round(health["error_rate"], 3),
+                    "calls": health["calls"],
+                    "errors": health["errors"],
+                }
+            return {
+                "circuit": self._state(now),
+                "consecutive_failures": self._consecutive_failures,
+                "models": models,
+            }
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ModelRouter(
+                    Config.LLM_MODELS,
+                    unavailable_ttl=Config.LLM_UNAVAILABLE_TTL,
+                    failure_threshold=Config.LLM_CIRCUIT_FAILURE_THRESHOLD,
+                    reset_timeout=Config.LLM_CIRCUIT_RESET_SECONDS,
+                    max_error_rate=Config.LLM_MAX_ERROR_RATE,
+                )
+    return _router
@@ -0,0 +1,448 @@
+"""Near-duplicate detection with MinHash signatures and an LSH index.
+
+An article is reduced to the set of its hashed word shingles (runs of
+SHINGLE_WORDS words). Its MinHash signature holds, for each of
+MINHASH_PERMUTATIONS hash functions, the smallest hash over that set; the
+share of positions where two signatures agree estimates the Jaccard
+similarity of the two sets. The LSH index cuts every signature into
+LSH_BANDS bands and buckets articles by band, so a lookup only compares
+against articles that share at least one band with the query instead of
+scanning the table.
+"""
+
+import re
+import threading
+import zlib
+from functools import lru_cache
+
+import numpy as np
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from models import db, Article
+from config import Config
+from services.article_index import HASH_LENGTH, ArticleIndex
+from services.index_files import has_snapshot, load_arrays, save_arrays
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+SHINGLE_WORDS = 5
+SHINGLE_BASE = np.uint64(1099511628211)
+SEED = 20240601
+# Signature value of a text without words; such signatures are never indexed
+EMPTY = np.uint32(0xFFFFFFFF)
+# Shingles hashed per numpy broadcast when many texts are signed at once
+SIGN_CHUNK = 20000
+# Changed rows after which the index files are rewritten
+SAVE_ROWS = 1000
+
+_stats = {"checked": 0, "duplicates": 0, "rewrites_reused": 0}
+_stats_lock = threading.Lock()
+
+
+def _record(counter, amount=1):
+    with _stats_lock:
+        _stats[counter] += amount
+
+
+def near_duplicate_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def shingles(text, size=SHINGLE_WORDS):
+    """Unique 64-bit hashes of the ``size``-word shingles of ``text``."""
+    words = WORD_RE.findall((text or "").lower())
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    word_hashes = np.array([zlib.crc32(w.encode("utf-8")) for w in words], dtype=np.uint64)
+    size = min(size, len(word_hashes))
+    count = len(word_hashes) - size + 1
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(size):
+        # Polynomial hash of each window; uint64 arithmetic wraps around
+        hashes = hashes * SHINGLE_BASE + word_hashes[offset:offset + count]
+    return np.unique(hashes)
+
+
+@lru_cache(maxsize=4)
+def _hash_functions(permutations):
+    """Odd multipliers and offsets for multiply-shift hashing, fixed by SEED."""
+    rng = np.random.default_rng(SEED)
+    multipliers = rng.integers(0, np.iinfo(np.uint64).max, size=permutations, dtype=np.uint64) | np.uint64(1)
+    offsets = rng.integers(0, np.iinfo(np.uint64).max, size=permutations, dtype=np.uint64)
+    return multipliers, offsets
+
+
+def minhash_signatures(texts, permutations=None):
+    """MinHash signatures of ``texts`` as a (len(texts), permutations) uint32 matrix.
+
+    The shingles of a group of texts are hashed by every permutation in one
+    broadcast and reduced per text with ``np.minimum.reduceat``. The hash
+    matrix is laid out permutation-major and updated in place, so each
+    reduction runs over contiguous memory.
+    """
+    permutations = permutations or Config.MINHASH_PERMUTATIONS
+    multipliers, offsets = _hash_functions(permutations)
+    multipliers, offsets = multipliers[:, None], offsets[:, None]
+    sets = [shingles(text) for text in texts]
+    signatures = np.full((len(sets), permutations), EMPTY, dtype=np.uint32)
+
+    start = 0
+    while start < len(sets):
+        end, total = start, 0
+        while end < len(sets) and (total == 0 or total + len(sets[end]) <= SIGN_CHUNK):
+            total += len(sets[end])
+            end += 1
+        rows = [i for i in range(start, end) if len(sets[i])]
+        if rows:
+            values = np.concatenate([sets[i] for i in rows])
+            hashed = np.multiply(multipliers, values)
+            hashed += offsets
+            hashed >>= np.uint64(32)
+            starts = np.cumsum([0] + [len(sets[i]) for i in rows[:-1]])
+            signatures[rows] = np.minimum.reduceat(hashed, starts, axis=1).T
+        start = end
+    return signatures
+
+
+def _is_empty(signature):
+    return bool((signature == EMPTY).all())
+
+
+class NearDuplicateIndex(ArticleIndex):
+    """LSH index over the MinHash signatures of canonical original articles.
+
+    Originals linked to another one through ``duplicate_of`` are left out,
+    so every match is a canonical article. Signatures are kept in memory
+    and saved as a snapshot under ``path`` (see services.index_files; none
+    when ``path`` is None), so
+    start-up does not re-sign the archive.
+
+    Before each lookup the index syncs with the article table (see
+    services.article_index), reading only new rows and rows written since
+    the last sync; only rows whose hash changed are signed again. Bulk
+    ingestion registers the signatures it already computed at commit.
+    """
+
+    def __init__(self, path, permutations, bands, threshold):
+        if permutations % bands:
+            raise ValueError(f"MINHASH_PERMUTATIONS ({permutations}) must be a multiple of LSH_BANDS ({bands})")
+        self.path = path
+        self.permutations = permutations
+        self.bands = bands
+        self.rows_per_band = permutations // bands
+        self.threshold = threshold
+        self._lock = threading.RLock()
+        self._load()
+        self._init_sync()
+
+    def _load(self):
+        self._signatures = {}  # id -> signature
+        self._hashes = {}  # id -> content hash prefix, also for articles without words
+        self._buckets = [{} for _ in range(self.bands)]  # band bytes -> ids
+        self._changed = 0
+        if self.path is None:
+            return
+        arrays = load_arrays(self.path, ("signatures", "ids", "hashes"))
+        # Ignore a snapshot from a different signature size
+        if arrays is not None and arrays["signatures"].ndim == 2 and arrays["signatures"].shape[1] == self.permutations:
+            for article_id, content_hash, signature in zip(arrays["ids"], arrays["hashes"], arrays["signatures"]):
+                self._add(int(article_id), content_hash.decode(), signature)
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def _band_keys(self, signature):
+        r = self.rows_per_band
+        return [signature[band * r:(band + 1) * r].tobytes() for band in range(self.bands)]
+
+    def _add(self, article_id, content_hash, signature):
+        self._discard(article_id)
+        self._hashes[article_id] = content_hash
+        if _is_empty(signature):
+            return
+        self._signatures[article_id] = signature
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(key, set()).add(article_id)
+
+    def _discard(self, article_id):
+        self._hashes.pop(article_id, None)
+        signature = self._signatures.pop(article_id, None)
+        if signature is None:
+            return
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            members = bucket.get(key)
+            if members is not None:
+                members.discard(article_id)
+                if not members:
+                    del bucket[key]
+
+    def upsert(self, article_id, content_hash, content=None, signature=None):
+        if signature is None:
+            signature = minhash_signatures([content], self.permutations)[0]
+        with self._lock:
+            self._add(article_id, (content_hash or "")[:HASH_LENGTH], signature)
+            self._changed += 1
+
+    def remove(self, article_id):
+        with self._lock:
+            if article_id in self._hashes:
+                self._discard(article_id)
+                self._changed += 1
+
+    def query(self, signature, exclude_id=None):
+        """(article id, estimated similarity) pairs at or above the threshold, most similar first."""
+        if _is_empty(signature):
+            return []
+        with self._lock:
+            candidates = set()
+            for bucket, key in zip(self._buckets, self._band_keys(signature)):
+                candidates.update(bucket.get(key, ()))
+            candidates.discard(exclude_id)
+            if not candidates:
+                return []
+            ids = sorted(candidates)
+            matrix = np.stack([self._signatures[i] for i in ids])
+
+        scores = (matrix == signature).mean(axis=1)
+        keep = np.flatnonzero(scores >= self.threshold)
+        # Stable sort: among equal scores the oldest article comes first
+        keep = keep[np.argsort(-scores[keep], kind="stable")]
+        return [(ids[i], float(scores[i])) for i in keep]
+
+    def _index_rows(self, rows):
+        signatures = minhash_signatures([content for _, _, content in rows], self.permutations)
+        for (article_id, content_hash, _), signature in zip(rows, signatures):
+            self.upsert(article_id, content_hash, signature=signature)
+
+    def _synced(self):
+        if self.path is not None and (not has_snapshot(self.path) or self._changed >= SAVE_ROWS):
+            self.save()
+
+    def save(self):
+        """Write the signatures as a new on-disk snapshot."""
+        with self._lock:
+            ids = np.array(list(self._hashes), dtype=np.int64)
+            hashes = np.array([self._hashes[i] for i in self._hashes], dtype=f"S{HASH_LENGTH}")
+            empty = np.full(self.permutations, EMPTY, dtype=np.uint32)
+            signatures = np.stack([self._signatures.get(i, empty) for i in self._hashes]) if len(ids) else (
+                np.zeros((0, self.permutations), dtype=np.uint32)
+            )
+            self._changed = 0
+
+        save_arrays(self.path, {"signatures": signatures, "ids": ids, "hashes": hashes})
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_near_duplicate_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = NearDuplicateIndex(
+                    Config.NEAR_DUPLICATE_INDEX_DIR,
+                    permutations=Config.MINHASH_PERMUTATIONS,
+                    bands=Config.LSH_BANDS,
+                    threshold=Config.NEAR_DUPLICATE_THRESHOLD,
+                )
+    return _index
+
+
+def find_near_duplicates(text, exclude_id=None):
+    """(article id, similarity) of the canonical originals ``text`` nearly duplicates, best first."""
+    index = get_near_duplicate_index()
+    index.sync()
+    return index.query(minhash_signatures([text], index.permutations)[0], exclude_id=exclude_id)
+
+
+def partition_near_duplicates(rows):
+    """Split article rows about to be inserted into unique rows and near-duplicates.
+
+    Originals are checked against the index and against the unique rows
+    before them in the same batch. Returns (unique, signatures,
+    duplicates): ``signatures[i]`` belongs to ``unique[i]`` (None for rows
+    that are not originals) and each duplicate is a (row, article_id,
+    position) tuple naming either the existing article it matches or the
+    position in ``unique`` of the batch row it matches. Needs an app context.
+    """
+    index = get_near_duplicate_index()
+    index.sync()
+    batch = NearDuplicateIndex(None, index.permutations, index.bands, index.threshold)
+    # Rows that already name their canonical article (e.g. from an export) are taken as they are
+    originals = [
+        i for i, row in enumerate(rows)
+        if (row.get("type") or "original") == "original" and row.get("duplicate_of") is None
+    ]
+    signature_of = dict(zip(originals, minhash_signatures([rows[i]["content"] for i in originals], index.permutations)))
+
+    unique, signatures, duplicates = [], [], []
+    for position, row in enumerate(rows):
+        signature = signature_of.get(position)
+        if signature is not None:
+            matches = index.query(signature)
+            if matches:
+                duplicates.append((row, matches[0][0], None))
+                continue
+            matches = batch.query(signature)
+            if matches:
+                duplicates.append((row, None, matches[0][0]))
+                continue
+            batch.upsert(len(unique), "", signature=signature)
+        unique.append(row)
+        signatures.append(signature)
+
+    _record("checked", len(originals))
+    _record("duplicates", len(duplicates))
+    return unique, signatures, duplicates
+
+
+def remember_signatures(session, ids, rows, signatures):
+    """Add freshly inserted originals to the index once ``session`` commits."""
+    if _index is None:
+        return
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    for article_id, row, signature in zip(ids, rows, signatures):
+        if signature is not None:
+            pending[article_id] = (row["content_hash"], signature)
+
+
+def rewrite_of_near_duplicate(article):
+    """The updated article rewritten from a near-duplicate of ``article``, or None.
+
+    Candidates are the article's canonical original when it is linked, the
+    canonical originals the index matches, and the originals linked to
+    ``article`` itself. Needs an app context.
+    """
+    if article.duplicate_of is not None:
+        candidates = [article.duplicate_of]
+    else:
+        candidates = [article_id for article_id, _ in find_near_duplicates(article.content, exclude_id=article.id)]
+    candidates += db.session.scalars(
+        select(Article.id).where(Article.duplicate_of == article.id).order_by(Article.id)
+    ).all()
+    _record("checked")
+    if not candidates:
+        return None
+    _record("duplicates")
+
+    rank = {}
+    for n, article_id in enumerate(candidates):
+        rank.setdefault(article_id, n)
+    rewrites = db.session.scalars(
+        select(Article).where(Article.type == "updated", Article.parent_id.in_(candidates)).order_by(Article.id)
+    ).all()
+    best = min(rewrites, key=lambda a: rank[a.parent_id], default=None)
+    if best is not None:
+        _record("rewrites_reused")
+    return best
+
+
+def _band_hashes(signatures, rows_per_band, band):
+    """One uint64 per row identifying its values in ``band``."""
+    columns = signatures[:, band * rows_per_band:(band + 1) * rows_per_band].astype(np.uint64)
+    keys = np.zeros(len(signatures), dtype=np.uint64)
+    for column in columns.T:
+        keys = keys * SHINGLE_BASE + column
+    return keys
+
+
+def cluster_duplicates(threshold=None, dry_run=False, batch_size=500):
+    """Recompute ``duplicate_of`` for every original article in one pass.
+
+    Signatures for the whole table are computed in batches into a single
+    matrix. Each band is then bucketed at once with ``np.unique``, every
+    article is paired with the oldest member of its bucket, the candidate
+    pairs are verified against the threshold in one comparison and
+    connected pairs are merged into clusters by label propagation. The
+    oldest article of a cluster stays canonical and the others are linked
+    to it; links that no longer hold are cleared. Needs an app context;
+    returns counts.
+    """
+    threshold = Config.NEAR_DUPLICATE_THRESHOLD if threshold is None else threshold
+    permutations, bands = Config.MINHASH_PERMUTATIONS, Config.LSH_BANDS
+    if permutations % bands:
+        raise ValueError(f"MINHASH_PERMUTATIONS ({permutations}) must be a multiple of LSH_BANDS ({bands})")
+    rows_per_band = permutations // bands
+
+    ids, chunks = [], []
+    result = db.session.execute(
+        select(Article.id, Article.content)
+        .where(Article.type == "original")
+        .order_by(Article.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for rows in result.partitions():
+        ids.extend(article_id for article_id, _ in rows)
+        chunks.append(minhash_signatures([content for _, content in rows], permutations))
+    ids = np.array(ids, dtype=np.int64)
+    signatures = np.concatenate(chunks) if chunks else np.zeros((0, permutations), dtype=np.uint32)
+
+    # Rows are ordered by id, so the first position of a bucket is its oldest article
+    positions = np.flatnonzero(~(signatures == EMPTY).all(axis=1))
+    pairs = [np.zeros((0, 2), dtype=np.int64)]
+    for band in range(bands):
+        _, first, inverse = np.unique(
+            _band_hashes(signatures[positions], rows_per_band, band), return_index=True, return_inverse=True
+        )
+        heads = positions[first[inverse.ravel()]]
+        mask = heads != positions
+        pairs.append(np.stack([heads[mask], positions[mask]], axis=1))
+    pairs = np.unique(np.concatenate(pairs), axis=0)
+    scores = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+    pairs = pairs[scores >= threshold]
+
+    # Connected components: every position ends up labelled with the smallest one in its cluster
+    labels = np.arange(len(ids))
+    while len(pairs):
+        low = np.minimum(labels[pairs[:, 0]], labels[pairs[:, 1]])
+        merged = labels.copy()
+        np.minimum.at(merged, pairs[:, 0], low)
+        np.minimum.at(merged, pairs[:, 1], low)
+        merged = merged[merged]
+        if np.array_equal(merged, labels):
+            break
+        labels = merged
+
+    linked = labels != np.arange(len(ids))
+    wanted = dict(zip(ids[linked].tolist(), ids[labels[linked]].tolist()))
+    current = dict(db.session.execute(
+        select(Article.id, Article.duplicate_of).where(Article.type == "original", Article.duplicate_of.is_not(None))
+    ).all())
+    changes = [
+        {"id": article_id, "duplicate_of": canonical}
+        for article_id, canonical in wanted.items() if current.get(article_id) != canonical
+    ]
+    changes += [{"id": article_id, "duplicate_of": None} for article_id in current if article_id not in wanted]
+    if changes and not dry_run:
+        db.session.execute(update(Article), changes)
+        db.session.commit()
+
+    return {
+        "originals": len(ids),
+        "candidate_pairs": int(len(scores)),
+        "clusters": len(set(wanted.values())),
+        "duplicates": len(wanted),
+        "changed": len(changes),
+    }
+
+
+# Signatures computed during bulk ingestion, added to the index once the
+# transaction commits so a rollback leaves no phantom rows behind
+_PENDING_KEY = "near_duplicate_index_pending"
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_signatures(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending or _index is None:
+        return
+    for article_id, (content_hash, signature) in pending.items():
+        _index.upsert(article_id, content_hash, signature=signature)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_signatures(session):
+    session.info.pop(_PENDING_KEY, None)
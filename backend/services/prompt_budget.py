@@ -0,0 +1,151 @@
+import math
+import re
+import threading
+from collections import Counter
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+_totals = {"requests": 0, "tokens_before": 0, "tokens_after": 0}
+_totals_lock = threading.Lock()
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return math.ceil(len(text) / 4) if text else 0
+
+
+def truncate_to_tokens(text, tokens):
+    """Cut ``text`` to at most ``tokens`` estimated tokens, at a word boundary when one is near."""
+    limit = tokens * 4
+    if len(text) <= limit:
+        return text
+    if limit < 2:
+        return ""
+    cut = text[:limit - 1]  # room for the ellipsis
+    space = cut.rfind(" ")
+    if space > limit // 2:
+        cut = cut[:space]
+    return cut.rstrip() + "…"
+
+
+def split_paragraphs(text):
+    return [p.strip() for p in re.split(r"\n\s*\n", text or "") if p.strip()]
+
+
+def _normalize(paragraph):
+    return " ".join(WORD_RE.findall(paragraph.lower()))
+
+
+def _tfidf(tokens, idf):
+    counts = Counter(tokens)
+    vector = {term: count * idf.get(term, 0.0) for term, count in counts.items()}
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    return vector, norm
+
+
+def _cosine(a, a_norm, b, b_norm):
+    if not a_norm or not b_norm:
+        return 0.0
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(term, 0.0) for term, weight in a.items()) / (a_norm * b_norm)
+
+
+def budget_references(original, references, budget_tokens):
+    """Trim reference texts to the paragraphs most relevant to ``original``.
+
+    Paragraphs repeated within a page or shared between pages (navigation,
+    cookie banners, newsletter blurbs) are dropped first. The rest are
+    scored by TF-IDF cosine similarity to the original article and the best
+    ones are kept, in page order, until each reference's share of
+    ``budget_tokens`` is used. A best paragraph that alone exceeds the share
+    is truncated to it.
+
+    Returns (trimmed_references, stats).
+    """
+    pages = [split_paragraphs(ref) for ref in references]
+
+    seen_in = Counter()
+    for paragraphs in pages:
+        for key in {_normalize(p) for p in paragraphs}:
+            seen_in[key] += 1
+
+    kept_pages = []
+    boilerplate = 0
+    for paragraphs in pages:
+        kept = []
+        page_keys = set()
+        for paragraph in paragraphs:
+            key = _normalize(paragraph)
+            if not key or key in page_keys or (len(pages) > 1 and seen_in[key] > 1):
+                boilerplate += 1
+                continue
+            page_keys.add(key)
+            kept.append(paragraph)
+        if not kept:
+            # Nothing unique on the page; fall back to its deduplicated paragraphs
+            kept = list(dict.fromkeys(paragraphs))
+        kept_pages.append(kept)
+
+    # IDF over every candidate paragraph plus the original article
+    documents = [WORD_RE.findall(p.lower()) for page in kept_pages for p in page]
+    original_tokens = WORD_RE.findall((original or "").lower())
+    documents.append(original_tokens)
+    document_frequency = Counter()
+    for tokens in documents:
+        document_frequency.update(set(tokens))
+    idf = {
+        term: math.log((1 + len(documents)) / (1 + df)) + 1
+        for term, df in document_frequency.items()
+    }
+    query, query_norm = _tfidf(original_tokens, idf)
+
+    share = budget_tokens // max(len(kept_pages), 1)
+    trimmed = []
+    paragraphs_kept = 0
+    for page in kept_pages:
+        scored = []
+        for index, paragraph in enumerate(page):
+            vector, norm = _tfidf(WORD_RE.findall(paragraph.lower()), idf)
+            scored.append((_cosine(query, query_norm, vector, norm), index))
+
+        selected = {}
+        used = 0
+        for score, index in sorted(scored, reverse=True):
+            paragraph = page[index]
+            cost = estimate_tokens(paragraph)
+            if used + cost > share:
+                if selected:
+                    continue
+                # The best paragraph alone is over the share: keep its start
+                paragraph = truncate_to_tokens(paragraph, share)
+                if not paragraph:
+                    break
+                cost = estimate_tokens(paragraph)
+            selected[index] = paragraph
+            used += cost
+        paragraphs_kept += len(selected)
+        trimmed.append("\n\n".join(selected[i] for i in sorted(selected)))
+
+    tokens_before = sum(estimate_tokens(ref) for ref in references)
+    tokens_after = sum(estimate_tokens(ref) for ref in trimmed)
+    stats = {
+        "reference_tokens_before": tokens_before,
+        "reference_tokens_after": tokens_after,
+        "tokens_saved": tokens_before - tokens_after,
+        "boilerplate_paragraphs_removed": boilerplate,
+        "paragraphs_total": sum(len(p) for p in pages),
+        "paragraphs_kept": paragraphs_kept,
+    }
+    with _totals_lock:
+        _totals["requests"] += 1
+        _totals["tokens_before"] += tokens_before
+        _totals["tokens_after"] += tokens_after
+    return trimmed, stats
+
+
+def budget_totals():
+    with _totals_lock:
+        totals = dict(_totals)
+    totals["tokens_saved"] = totals["tokens_before"] - totals["tokens_after"]
+    return totals
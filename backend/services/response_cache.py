@@ -0,0 +1,242 @@
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, current_app, request
+
+from config import Config
+from services.article_changes import on_article_commit
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+
+class MemoryBackend:
+    """In-process LRU store bounded by entry count and total body bytes."""
+
+    def __init__(self, max_entries, max_bytes, ttl):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _size(entry):
+        return sum(len(entry[k]) for k in ("body", "gzip", "br") if entry.get(k))
+
+    def generation(self):
+        return self._generation
+
+    def bump_generation(self):
+        with self._lock:
+            self._generation += 1
+            # Entries of older generations can never be read again
+            self._entries.clear()
+            self._bytes = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, entry = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self._bytes -= self._size(entry)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        size = self._size(entry)
+        # One response may not crowd out the rest of the cache
+        if size > self.max_bytes // 4:
+            return
+        with self._lock:
+            if not key.startswith(f"{self._generation}:"):
+                return  # computed before an invalidation
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= self._size(old[1])
+            self._entries[key] = (time.monotonic() + self.ttl, entry)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= self._size(evicted)
+
+    def size(self):
+        return {"entries": len(self._entries), "bytes": self._bytes}
+
+
+class RedisBackend:
+    """Shared store so every worker process sees the same entries and invalidations."""
+
+    GENERATION_KEY = "response_cache:generation"
+
+    def __init__(self, url, ttl):
+        if redis is None:
+            raise RuntimeError("RESPONSE_CACHE_URL needs the redis package: pip install redis")
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def generation(self):
+        return int(self.client.get(self.GENERATION_KEY) or 0)
+
+    def bump_generation(self):
+        # Old entries are orphaned by the new generation and expire on their own
+        self.client.incr(self.GENERATION_KEY)
+
+    def get(self, key):
+        fields = self.client.hgetall(f"response_cache:{key}")
+        if not fields:
+            return None
+        return {k.decode(): (v.decode() if k == b"etag" else v) for k, v in fields.items() if v}
+
+    def set(self, key, entry):
+        name = f"response_cache:{key}"
+        pipe = self.client.pipeline()
+        pipe.hset(name, mapping={k: v for k, v in entry.items() if v})
+        pipe.expire(name, self.ttl)
+        pipe.execute()
+
+    def size(self):
+        return {}
+
+
+class ResponseCache:
+    """Cache of serialized JSON responses, invalidated wholesale on article writes.
+
+    Keys carry the backend's generation number; any committed write to the
+    article table bumps it, so entries cached before the write are never
+    served again. Bodies above ``compress_min_bytes`` are stored gzip- (and
+    brotli-, when installed) compressed alongside the plain body.
+    """
+
+    def __init__(self, backend, compress_min_bytes):
+        self.backend = backend
+        self.compress_min_bytes = compress_min_bytes
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "not_modified": 0, "invalidations": 0}
+
+    def record(self, counter):
+        with self._stats_lock:
+            self._stats[counter] += 1
+
+    def key(self, path, args):
+        query = "&".join(f"{k}={v}" for k, v in sorted(args.items(multi=True)))
+        return f"{self.backend.generation()}:{path}?{query}"
+
+    def build_entry(self, body):
+        entry = {"etag": hashlib.sha1(body).hexdigest(), "body": body, "gzip": None, "br": None}
+        if len(body) >= self.compress_min_bytes:
+            entry["gzip"] = gzip.compress(body, compresslevel=6)
+            if brotli is not None:
+                entry["br"] = brotli.compress(body, quality=5)
+        return entry
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, entry):
+        self.backend.set(key, entry)
+
+    def invalidate(self):
+        self.backend.bump_generation()
+        self.record("invalidations")
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else None
+        stats.update(self.backend.size())
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if Config.RESPONSE_CACHE_URL:
+                    backend = RedisBackend(Config.RESPONSE_CACHE_URL, Config.RESPONSE_CACHE_TTL)
+                else:
+                    backend = MemoryBackend(
+                        Config.RESPONSE_CACHE_MAX_ENTRIES,
+                        Config.RESPONSE_CACHE_MAX_BYTES,
+                        Config.RESPONSE_CACHE_TTL,
+                    )
+                _cache = ResponseCache(backend, Config.RESPONSE_COMPRESS_MIN_BYTES)
+    return _cache
+
+
+def _respond(entry, cache):
+    etag = entry["etag"]
+    headers = {
+        "ETag": f'W/"{etag}"',
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if request.if_none_match.contains_weak(etag):
+        cache.record("not_modified")
+        return Response(status=304, headers=headers)
+
+    for encoding in ("br", "gzip"):
+        if entry.get(encoding) and request.accept_encodings[encoding]:
+            headers["Content-Encoding"] = encoding
+            return Response(entry[encoding], mimetype="application/json", headers=headers)
+    return Response(entry["body"], mimetype="application/json", headers=headers)
+
+
+def cached_json(view):
+    """Serve a JSON GET view from the response cache, with ETag/304 and compression.
+
+    Only 200 responses are cached; anything else passes through untouched.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not Config.RESPONSE_CACHE_ENABLED:
+            return view(*args, **kwargs)
+        cache = get_response_cache()
+        # The key embeds the generation read before the view runs, so a write
+        # that commits meanwhile leaves this entry unreachable
+        key = cache.key(request.path, request.args)
+        entry = cache.get(key)
+        if entry is not None:
+            cache.record("hits")
+        else:
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            cache.record("misses")
+            entry = cache.build_entry(response.get_data())
+            cache.set(key, entry)
+        return _respond(entry, cache)
+
+    return wrapper
+
+
+# Invalidate after any committed write to the article table
+@on_article_commit
+def _invalidate_after_commit(changes):
+    # A shared backend is invalidated even from processes that never served
+    # a cached response, e.g. manage.py imports
+    if _cache is not None or Config.RESPONSE_CACHE_URL:
+        get_response_cache().invalidate()
@@ -0,0 +1,129 @@
+"""Reuse rewrites whose inputs have not changed.
+
+A rewrite is determined by the original article text, the (budgeted)
+reference texts and links, the configured models and the prompt. Their
+hash is stored on the updated article as ``rewrite_key``; a rewrite with
+the same key returns that article instead of calling the LLM again.
+"""
+
+import hashlib
+import json
+import threading
+
+from sqlalchemy import bindparam, delete, select, update
+
+from models import db, Article, RewriteJob
+from config import Config
+from services.llm_rewriter import TEMPERATURE, build_messages
+
+DELETE_CHUNK = 500
+UPDATED_SUFFIX = " (Updated)"
+
+_stats = {"hits": 0, "misses": 0, "refreshed": 0}
+_stats_lock = threading.Lock()
+
+
+def _record(counter):
+    with _stats_lock:
+        _stats[counter] += 1
+
+
+def rewrite_cache_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else None
+    return stats
+
+
+def prompt_fingerprint():
+    """Hash of the prompt template, so editing the prompt invalidates old rewrites."""
+    template = build_messages("{original}", "{ref1}", "{ref2}", "{links}")
+    return hashlib.sha256(json.dumps(template, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def rewrite_key(original, ref1, ref2, links):
+    digest = hashlib.sha256()
+    parts = [original, ref1, ref2, json.dumps(list(links)), ",".join(Config.LLM_MODELS), str(TEMPERATURE), prompt_fingerprint()]
+    for part in parts:
+        data = part.encode("utf-8")
+        # Length prefixes keep ("ab", "c") and ("a", "bc") apart
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def find_rewrite(key, force=False):
+    """Return the updated article produced from ``key``'s inputs, or None.
+
+    With ``force`` the lookup counts as a refresh and the caller rewrites
+    again (store_stage then replaces the cached article's content).
+    """
+    cached = db.session.scalars(
+        select(Article).where(Article.type == "updated", Article.rewrite_key == key).order_by(Article.id).limit(1)
+    ).first()
+    if force:
+        _record("refreshed")
+    elif cached is not None:
+        _record("hits")
+    else:
+        _record("misses")
+    return cached
+
+
+def dedupe_updated_articles(dry_run=False):
+    """Collapse duplicate updated articles, keeping the oldest of each group.
+
+    Updated rows without a parent are first linked to the original whose
+    title they carry. Rows are then duplicates when they share a
+    rewrite_key, or have the same parent and identical content. Rewrite
+    jobs pointing at a removed row are pointed at the kept one. Needs an
+    app context; returns counts.
+    """
+    originals = {}
+    for article_id, title in db.session.execute(
+        select(Article.id, Article.title).where(Article.type == "original").order_by(Article.id)
+    ):
+        originals.setdefault(title, article_id)
+
+    rows = db.session.execute(
+        select(Article.id, Article.parent_id, Article.title, Article.content_hash, Article.rewrite_key)
+        .where(Article.type == "updated")
+        .order_by(Article.id)
+    ).all()
+    links = []
+    kept_by_group = {}
+    keep_for = {}  # removed id -> kept id
+    for article_id, parent_id, title, body_hash, key in rows:
+        if parent_id is None and title.endswith(UPDATED_SUFFIX):
+            parent_id = originals.get(title[:-len(UPDATED_SUFFIX)])
+            if parent_id is not None:
+                links.append({"id": article_id, "parent_id": parent_id})
+        groups = [("content", parent_id if parent_id is not None else title, body_hash)]
+        if key:
+            groups.append(("key", key))
+        kept = next((kept_by_group[group] for group in groups if group in kept_by_group), None)
+        if kept is None:
+            kept = article_id
+        else:
+            keep_for[article_id] = kept
+        for group in groups:
+            kept_by_group.setdefault(group, kept)
+
+    removed = list(keep_for)
+    links = [link for link in links if link["id"] not in keep_for]
+    if not dry_run:
+        if links:
+            db.session.execute(update(Article), links)
+        if keep_for:
+            jobs = RewriteJob.__table__
+            db.session.execute(
+                jobs.update()
+                .where(jobs.c.result_article_id == bindparam("removed_id"))
+                .values(result_article_id=bindparam("kept_id")),
+                [{"removed_id": removed_id, "kept_id": kept} for removed_id, kept in keep_for.items()],
+            )
+        for start in range(0, len(removed), DELETE_CHUNK):
+            db.session.execute(delete(Article).where(Article.id.in_(removed[start:start + DELETE_CHUNK])))
+        db.session.commit()
+    return {"updated_articles": len(rows), "linked": len(links), "duplicates": len(removed), "kept": len(rows) - len(removed)}
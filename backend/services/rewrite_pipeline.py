@@ -0,0 +1,249 @@
+from models import db, Article
+from config import Config
+from services.llm_rewriter import rewrite_article, rewrite_article_stream
+from services.model_router import CircuitOpen
+from services.prompt_budget import budget_references
+from services.rewrite_cache import find_rewrite, rewrite_key
+from services.tracing import span, traced
+
+# Progress stages reported by run_rewrite, in order
+STAGES = ["search", "fetch", "rewrite", "store"]
+
+
+class RewriteError(Exception):
+    """A pipeline failure that maps to an HTTP error response."""
+
+    def __init__(self, message, status=500, **extra):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.extra = extra
+
+    def to_dict(self):
+        return {"error": self.message, **self.extra}
+
+
+def _database_references(article):
+    """Use the two most similar other original articles as references, or None if there are not enough."""
+    # numpy is only loaded once a rewrite falls back to the database
+    from services.similarity_index import similar_original_articles
+
+    other_articles = similar_original_articles(article, k=2)
+
+    if len(other_articles) < 2:
+        return None
+
+    print(f"Using {len(other_articles)} articles from database as fallback")
+    links = [
+        other_articles[0].source_url or f"Article: {other_articles[0].title}",
+        other_articles[1].source_url or f"Article: {other_articles[1].title}"
+    ]
+    return other_articles[0].content, other_articles[1].content, links
+
+
+@traced("near_duplicate")
+def duplicate_stage(article):
+    """Return the updated article of a near-duplicate of ``article``, or None.
+
+    A syndicated or lightly edited copy of an original that was already
+    rewritten reuses that rewrite instead of searching and calling the LLM
+    again.
+    """
+    if Config.NEAR_DUPLICATE_ACTION == "off" or (getattr(article, "type", None) or "original") != "original":
+        return None
+    # numpy is only loaded once a rewrite checks for duplicates
+    from services.near_duplicates import rewrite_of_near_duplicate
+
+    return rewrite_of_near_duplicate(article)
+
+
+@traced("search")
+def search_stage(article):
+    """Find reference links for the article title, or None if search failed."""
+    # The HTTP stack is imported on first use to keep app start-up fast
+    from services.google_search import google_search
+
+    # PRIMARY METHOD: Use Google Search to find reference articles
+    # This searches for the article title and finds top-ranking articles from other websites
+    print(f"Searching Google for reference articles using title: {article.title}")
+    try:
+        search_links = google_search(article.title)
+        print(f"Google Search successful. Found {len(search_links)} links.")
+        return search_links
+    except ValueError as e:
+        # Handle API key or configuration errors
+        print(f"Google Search failed: {str(e)}. Falling back to database articles.")
+    except Exception as e:
+        print(f"Google Search error: {str(e)}. Falling back to database articles.")
+    return None
+
+
+@traced("fetch")
+def fetch_stage(article, search_links):
+    """Resolve the two reference texts and their links.
+
+    Fetches the search results when there are enough of them, otherwise falls
+    back to other articles from the database.
+    """
+    # If Google Search failed, try database fallback
+    if not search_links:
+        references = _database_references(article)
+        if references is None:
+            error_msg = "Google Search is required but failed. "
+            if not Config.SERPER_API_KEY:
+                error_msg += "SERPER_API_KEY is not set. Please set it in environment variables."
+            else:
+                error_msg += "Please check your Google Search API configuration or ensure you have at least 2 articles in the database."
+            raise RewriteError(error_msg, 400)
+        ref1, ref2, links = references
+
+    elif len(search_links) < 2:
+        # Fallback to database if not enough search results
+        print(f"Only {len(search_links)} links found from Google Search. Falling back to database.")
+        references = _database_references(article)
+        if references is None:
+            raise RewriteError(
+                f"Insufficient reference articles found from Google Search. Found {len(search_links)} links, need at least 2. Please check your Google Search API configuration.",
+                400,
+                links_found=len(search_links),
+            )
+        ref1, ref2, links = references
+
+    else:
+        # Fetch content from external reference articles found via Google Search
+        print(f"Fetching content from {len(search_links)} reference articles found via Google Search")
+        from services.content_fetcher import fetch_articles_content
+        results = fetch_articles_content(search_links[:2])
+        for index, (link, result) in enumerate(zip(search_links, results), start=1):
+            if isinstance(result, Exception):
+                print(f"Error fetching content from {link}: {str(result)}")
+                raise RewriteError(f"Failed to fetch content from reference article {index}: {str(result)}")
+            print(f"Successfully fetched content from: {link}")
+        ref1, ref2 = results
+        links = search_links
+
+    # Validate we got content from references
+    if not ref1 or len(ref1.strip()) < 50:
+        raise RewriteError("Reference article 1 did not provide sufficient content")
+    if not ref2 or len(ref2.strip()) < 50:
+        raise RewriteError("Reference article 2 did not provide sufficient content")
+
+    return ref1, ref2, links
+
+
+@traced("budget")
+def budget_stage(article, ref1, ref2):
+    """Trim the references to the configured token budget before the LLM call.
+
+    Returns (ref1, ref2, stats); stats is None when budgeting is disabled.
+    """
+    if Config.PROMPT_REFERENCE_TOKEN_BUDGET <= 0:
+        return ref1, ref2, None
+    (ref1, ref2), stats = budget_references(
+        article.content, [ref1, ref2], Config.PROMPT_REFERENCE_TOKEN_BUDGET
+    )
+    print(
+        f"Prompt budget: references {stats['reference_tokens_before']} -> "
+        f"{stats['reference_tokens_after']} tokens (saved {stats['tokens_saved']})"
+    )
+    return ref1, ref2, stats
+
+
+@traced("rewrite_cache")
+def cache_stage(article, ref1, ref2, links, force=False):
+    """Key the rewrite inputs; returns (key, updated article from the same inputs or None).
+
+    With ``force`` the cached article is still returned so store_stage can
+    overwrite it with the fresh rewrite.
+    """
+    key = rewrite_key(article.content, ref1, ref2, links)
+    return key, find_rewrite(key, force=force)
+
+
+@traced("rewrite")
+def rewrite_stage(article, ref1, ref2, links):
+    """Rewrite the article using AI."""
+    try:
+        return rewrite_article(article.content, ref1, ref2, links)
+    except CircuitOpen as e:
+        raise RewriteError(f"Failed to rewrite article: {str(e)}", 503)
+    except Exception as e:
+        raise RewriteError(f"Failed to rewrite article: {str(e)}")
+
+
+def rewrite_stream_stage(article, ref1, ref2, links):
+    """Rewrite the article using AI, yielding text chunks as they are generated."""
+    try:
+        with span("rewrite"):
+            yield from rewrite_article_stream(article.content, ref1, ref2, links)
+    except CircuitOpen as e:
+        raise RewriteError(f"Failed to rewrite article: {str(e)}", 503)
+    except Exception as e:
+        raise RewriteError(f"Failed to rewrite article: {str(e)}")
+
+
+@traced("store")
+def store_stage(article, rewritten_content, links, key=None, replace_id=None):
+    """Persist the rewritten text as a new updated article.
+
+    A forced refresh passes the cached article's id as ``replace_id``; that
+    article is overwritten instead of adding another row with the same key.
+    """
+    values = {
+        "title": article.title + " (Updated)",
+        "content": rewritten_content,
+        "references": links,
+        "parent_id": article.id,
+        "rewrite_key": key,
+    }
+    updated = db.session.get(Article, replace_id) if replace_id is not None else None
+    if updated is None:
+        updated = Article(type="updated", **values)
+        db.session.add(updated)
+    else:
+        for name, value in values.items():
+            setattr(updated, name, value)
+
+    db.session.commit()
+    return updated
+
+
+def run_rewrite(article_id, progress=None, force=False):
+    """Run search -> fetch -> rewrite -> store for one article.
+
+    ``progress`` is called with each stage name as it starts. When a
+    near-duplicate of the article was already rewritten, or an earlier
+    rewrite had exactly the same inputs, that updated article is returned
+    without calling the LLM unless ``force`` is set. Raises RewriteError
+    for failures that should be reported to the client.
+    """
+    def report(stage):
+        if progress:
+            progress(stage)
+
+    article = db.session.get(Article, article_id)
+    if article is None:
+        raise RewriteError(f"Article {article_id} not found", 404)
+
+    if not force:
+        duplicate = duplicate_stage(article)
+        if duplicate is not None:
+            print(f"Reusing updated article {duplicate.id} rewritten from a near-duplicate")
+            return duplicate
+
+    report("search")
+    search_links = search_stage(article)
+
+    report("fetch")
+    ref1, ref2, links = fetch_stage(article, search_links)
+    ref1, ref2, _ = budget_stage(article, ref1, ref2)
+    key, cached = cache_stage(article, ref1, ref2, links, force=force)
+    if cached is not None and not force:
+        print(f"Reusing updated article {cached.id} rewritten from the same inputs")
+        return cached
+
+    report("rewrite")
+    rewritten_content = rewrite_stage(article, ref1, ref2, links)
+
+    report("store")
+    return store_stage(article, rewritten_content, links, key=key, replace_id=cached.id if cached else None)
@@ -1,92 +1,169 @@
-import requests
-from bs4 import BeautifulSoup
+import multiprocessing
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from urllib.parse import urljoin, urlparse
 
-BASE_URL = "https://beyondchats.com/blogs/"
+from config import Config
+from services.html_extract import extract_article, extract_links
+from services.http_client import HTML_TYPES, get_http_client
+from services.tracing import copy_context_run, record_span, span
+
+BASE_URL = Config.BLOG_BASE_URL
+PAGINATION_RE = re.compile(r"/page/\d+/?$|[?&](page|paged)=\d+")
+
+# The parse pool is created lazily and reused across scrape calls
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+
+def _get_parse_pool():
+    """Return the process pool for HTML parsing, or None to parse in-thread."""
+    global _parse_pool
+    if Config.SCRAPER_PARSE_PROCESSES <= 0:
+        return None
+    if _parse_pool is None:
+        with _parse_pool_lock:
+            if _parse_pool is None:
+                # "spawn" avoids forking a process that has live request threads
+                _parse_pool = ProcessPoolExecutor(
+                    max_workers=Config.SCRAPER_PARSE_PROCESSES,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _parse_pool
+
+
+def _fetch_page(url):
+    page = get_http_client().get(
+        url, label="scrape", allowed_types=HTML_TYPES, timeout=Config.SCRAPER_TIMEOUT, verify=False
+    )
+    page.raise_for_status()
+    return page.text
 
-def scrape_oldest_articles(limit=5):
-    try:
-        response = requests.get(BASE_URL, verify=False, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-    except Exception as e:
-        print(f"Error fetching base URL: {e}")
-        return []
+
+def extract_index_links(html, base_url=BASE_URL):
+    """Return (article_links, page_links) from a blog index page.
+
+    Page links are the index's own pagination (``/page/2/``, ``?page=2``),
+    kept apart so they are not mistaken for articles.
+    """
+    base_path = urlparse(base_url).path.rstrip("/")
 
     links = []
+    pages = []
     # Find all links that point to blog articles
-    for a in soup.find_all("a", href=True):
-        href = a.get("href", "").strip()
-        if not href:
-            continue
-        
+    for href in extract_links(html):
         # Convert relative URLs to absolute URLs
-        if href.startswith("/"):
-            href = urljoin(BASE_URL, href)
+        if href.startswith("/") or href.startswith("?"):
+            href = urljoin(base_url, href)
         elif not href.startswith("http"):
             continue
-        
+
         # Check if it's a blog article URL
-        if "/blogs/" in href and href not in links:
-            # Make sure it's not the base blogs page itself
+        if "/blogs/" in href:
             parsed = urlparse(href)
-            if parsed.path != "/blogs/" and parsed.path != "/blogs":
+            if PAGINATION_RE.search(href):
+                pages.append(href)
+            # Make sure it's not the base blogs page itself
+            elif parsed.path.rstrip("/") != base_path:
                 links.append(href)
 
-    # Remove duplicates and get the last N articles (oldest)
-    unique_links = list(dict.fromkeys(links))
-    
+    # Remove duplicates
+    return list(dict.fromkeys(links)), list(dict.fromkeys(pages))
+
+
+def extract_blog_links(html, base_url=BASE_URL):
+    return extract_index_links(html, base_url)[0]
+
+
+def parse_article_page(url, html):
+    """Extract an article dict from a blog page, or None if it has no usable content.
+
+    Runs inside the parse process pool, so it must stay a picklable top-level
+    function. Spans recorded there would never reach this process's metrics
+    or trace, so callers time it (see ``_submit_parse``).
+    """
+    extracted = extract_article(html)
+    title = extracted["title"]
+    content = extracted["content"]
+
+    if title and content and len(content) > 100:
+        return {
+            "title": title,
+            "content": content,
+            "source_url": url,
+            "type": "original"
+        }
+
+    print(f"Skipped {url}: title={bool(title)}, content_length={len(content) if content else 0}")
+    return None
+
+
+def _submit_parse(parse_pool, url, html):
+    """Parse on the pool, recording a "parse" span in this process once the result is in."""
+    started = time.perf_counter()
+    future = parse_pool.submit(parse_article_page, url, html)
+
+    def finished(future):
+        outcome = "error" if future.cancelled() or future.exception() is not None else "ok"
+        record_span("parse", started, outcome)
+
+    # The callback runs on the pool's management thread; keep the caller's trace
+    future.add_done_callback(copy_context_run(finished))
+    return future
+
+
+def scrape_oldest_articles(limit=5, base_url=BASE_URL):
+    try:
+        index_html = _fetch_page(base_url)
+    except Exception as e:
+        print(f"Error fetching base URL: {e}")
+        return []
+
+    unique_links = extract_blog_links(index_html, base_url)
+
     # If we have fewer links than requested, use what we have
-    # Otherwise, take the last 'limit' articles
+    # Otherwise, take the last 'limit' articles (oldest)
     if len(unique_links) < limit:
         selected_links = unique_links
     else:
         selected_links = unique_links[-limit:]
-    
+
     print(f"Found {len(unique_links)} total blog links, selecting {len(selected_links)} articles")
 
+    # Pages are downloaded on a bounded thread pool and each one is handed to
+    # the parse pool as soon as it arrives, so network and parsing overlap.
+    parse_pool = _get_parse_pool()
+    parsed = {}
+    workers = max(1, min(Config.SCRAPER_MAX_WORKERS, len(selected_links)))
+    with ThreadPoolExecutor(max_workers=workers) as fetch_pool:
+        fetches = {fetch_pool.submit(_fetch_page, url): url for url in selected_links}
+        for future in as_completed(fetches):
+            url = fetches[future]
+            try:
+                html = future.result()
+            except Exception as e:
+                print(f"Error scraping {url}: {e}")
+                continue
+            if parse_pool is not None:
+                parsed[url] = _submit_parse(parse_pool, url, html)
+            else:
+                with span("parse"):
+                    parsed[url] = parse_article_page(url, html)
+
     articles = []
     for url in selected_links:
+        if url not in parsed:
+            continue
         try:
-            page = requests.get(url, verify=False, timeout=10)
-            page.raise_for_status()
-            psoup = BeautifulSoup(page.text, "html.parser")
-
-            # Try to find title - check multiple possible selectors
-            title = psoup.find("h1")
-            if not title:
-                title = psoup.find("title")
-            
-            # Get all paragraphs with substantial content
-            paragraphs = psoup.find_all("p")
-            content = "\n\n".join(
-                p.get_text().strip()
-                for p in paragraphs
-                if len(p.get_text().strip()) > 50
-            )
-            
-            # If no paragraphs found, try divs with article content
-            if not content or len(content) < 100:
-                article_divs = psoup.find_all("div", class_=lambda x: x and ("article" in x.lower() or "content" in x.lower() or "post" in x.lower()))
-                for div in article_divs:
-                    div_text = div.get_text().strip()
-                    if len(div_text) > 100:
-                        content = div_text
-                        break
-
-            if title and content and len(content) > 100:
-                articles.append({
-                    "title": title.get_text().strip(),
-                    "content": content,
-                    "source_url": url,
-                    "type": "original"
-                })
-                print(f"Successfully scraped: {title.get_text().strip()[:50]}...")
-            else:
-                print(f"Skipped {url}: title={bool(title)}, content_length={len(content) if content else 0}")
+            result = parsed[url].result() if parse_pool is not None else parsed[url]
         except Exception as e:
-            print(f"Error scraping {url}: {e}")
+            print(f"Error parsing {url}: {e}")
             continue
+        if result:
+            articles.append(result)
+            print(f"Successfully scraped: {result['title'][:50]}...")
 
     print(f"Successfully scraped {len(articles)} articles")
     return articles
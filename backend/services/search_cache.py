@@ -0,0 +1,113 @@
+import json
+import sqlite3
+import threading
+import time
+from config import Config
+
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+class SearchCache:
+    """Persistent normalized-query -> result links cache stored in SQLite.
+
+    Entries expire after ``ttl`` seconds and the least recently used ones are
+    evicted once more than ``max_entries`` rows exist. Hit/miss counters are
+    kept in-process so the saved API quota can be reported.
+    """
+
+    def __init__(self, path, ttl, max_entries):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+        self._init_schema()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS search_cache (
+                    query TEXT PRIMARY KEY,
+                    links TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_search_cache_accessed_at ON search_cache (accessed_at)"
+            )
+
+    def record(self, counter):
+        with self._stats_lock:
+            self._stats[counter] += 1
+
+    def get(self, query):
+        """Return cached links for a normalized query, or None if missing or expired."""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT links, created_at FROM search_cache WHERE query = ?", (query,)
+        ).fetchone()
+        if row is None or time.time() - row[1] >= self.ttl:
+            return None
+        with conn:
+            conn.execute("UPDATE search_cache SET accessed_at = ? WHERE query = ?", (time.time(), query))
+        return json.loads(row[0])
+
+    def put(self, query, links):
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                """INSERT INTO search_cache (query, links, created_at, accessed_at)
+                   VALUES (?, ?, ?, ?)
+                   ON CONFLICT(query) DO UPDATE SET
+                       links = excluded.links,
+                       created_at = excluded.created_at,
+                       accessed_at = excluded.accessed_at""",
+                (query, json.dumps(links), now, now),
+            )
+            conn.execute("DELETE FROM search_cache WHERE created_at < ?", (now - self.ttl,))
+            conn.execute(
+                """DELETE FROM search_cache WHERE query IN (
+                       SELECT query FROM search_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                   )""",
+                (self.max_entries,),
+            )
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["upstream_calls_saved"] = stats["hits"] + stats["coalesced"]
+        stats["hit_rate"] = round(stats["upstream_calls_saved"] / lookups, 3) if lookups else 0.0
+        stats["entries"] = self._connect().execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SearchCache(
+                    Config.CACHE_DB_PATH,
+                    ttl=Config.SEARCH_CACHE_TTL,
+                    max_entries=Config.SEARCH_CACHE_MAX_ENTRIES,
+                )
+    return _cache
@@ -0,0 +1,107 @@
+import html
+import re
+
+from sqlalchemy import or_, text
+from sqlalchemy.orm import load_only
+
+from models import db, Article
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+# FTS5 marks matches with these private-use characters; the text is then
+# HTML-escaped and only the sentinels become tags, so article markup can
+# never reach the client unescaped
+_MATCH_START = "\ue000"
+_MATCH_END = "\ue001"
+
+
+def _highlighted(value):
+    if value is None:
+        return None
+    return (
+        html.escape(value)
+        .replace(_MATCH_START, HIGHLIGHT_START)
+        .replace(_MATCH_END, HIGHLIGHT_END)
+    )
+
+
+def fts_query(query):
+    """Turn free text into a safe FTS5 expression: every word must match, the last as a prefix."""
+    tokens = TOKEN_RE.findall(query)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_articles(query, limit=20, offset=0, article_type=None):
+    """Return (results, has_more) for a full-text search over title and content.
+
+    Results are ranked with BM25 (title matches weigh more than content) and
+    carry a highlighted title and a content snippet. Titles and snippets
+    are HTML-escaped, with matches wrapped in ``<mark>``. Databases without
+    FTS5 get an unranked LIKE search instead.
+    """
+    if db.engine.dialect.name != "sqlite":
+        return _like_search(query, limit, offset, article_type)
+
+    match = fts_query(query)
+    if match is None:
+        return [], False
+
+    type_filter = "AND a.type = :type" if article_type else ""
+    rows = db.session.execute(
+        text(f"""
+            SELECT a.id, a.type, a.source_url,
+                   highlight(article_fts, 0, :start, :end) AS title,
+                   snippet(article_fts, 1, :start, :end, '…', 32) AS snippet,
+                   bm25(article_fts, 5.0, 1.0) AS rank
+            FROM article_fts
+            JOIN article a ON a.id = article_fts.rowid
+            WHERE article_fts MATCH :match {type_filter}
+            ORDER BY rank
+            LIMIT :limit OFFSET :offset
+        """),
+        {
+            "match": match,
+            "type": article_type,
+            "start": _MATCH_START,
+            "end": _MATCH_END,
+            "limit": limit + 1,
+            "offset": offset,
+        },
+    ).mappings().all()
+
+    results = [
+        {
+            "id": row["id"],
+            "title": _highlighted(row["title"]),
+            "type": row["type"],
+            "source_url": row["source_url"],
+            "snippet": _highlighted(row["snippet"]),
+            "score": round(-row["rank"], 4),
+        }
+        for row in rows[:limit]
+    ]
+    return results, len(rows) > limit
+
+
+def _like_search(query, limit, offset, article_type):
+    tokens = TOKEN_RE.findall(query)
+    if not tokens:
+        return [], False
+    q = Article.query.options(load_only(Article.id, Article.title, Article.type, Article.source_url))
+    for token in tokens:
+        pattern = f"%{token}%"
+        q = q.filter(or_(Article.title.ilike(pattern), Article.content.ilike(pattern)))
+    if article_type:
+        q = q.filter(Article.type == article_type)
+    articles = q.order_by(Article.id.desc()).offset(offset).limit(limit + 1).all()
+    results = [
+        {"id": a.id, "title": html.escape(a.title), "type": a.type, "source_url": a.source_url, "snippet": None, "score": None}
+        for a in articles[:limit]
+    ]
+    return results, len(articles) > limit
@@ -0,0 +1,172 @@
+import math
+import re
+import threading
+import zlib
+from collections import Counter
+
+import numpy as np
+
+from models import db, Article
+from config import Config
+from services.article_index import HASH_LENGTH, ArticleIndex
+from services.index_files import load_arrays, save_arrays
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "the and for are but not you all any can her was one our out has have had this that with from they will "
+    "your what when which their there been into more also than them then its about would should could".split()
+)
+
+
+def embed(text, dim):
+    """Hashed embedding: signed feature hashing of unigrams and bigrams, sublinear tf, L2-normalized."""
+    words = [w for w in WORD_RE.findall((text or "").lower()) if len(w) > 2 and w not in STOPWORDS]
+    features = Counter(words)
+    features.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, count in features.items():
+        h = zlib.crc32(feature.encode("utf-8"))
+        sign = 1.0 if (h // dim) & 1 else -1.0
+        vector[h % dim] += sign * (1.0 + math.log(count))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SimilarityIndex(ArticleIndex):
+    """Vector index over original articles for picking similar fallback references.
+
+    The bulk of the index lives in a snapshot of .npy files under ``path``
+    (see services.index_files) whose vectors are opened with memory mapping,
+    so start-up does not re-embed the archive. Changes
+    since the last save are held in memory as a small delta and folded into
+    the files once it exceeds ``compact_rows``.
+
+    Before each query the index syncs with the article table (see
+    services.article_index): only new rows and rows written since the last
+    sync are read, and only those whose hash changed are re-embedded.
+    Originals linked to another one through ``duplicate_of`` are left out.
+    """
+
+    def __init__(self, path, dim, compact_rows):
+        self.path = path
+        self.dim = dim
+        self.compact_rows = compact_rows
+        self._lock = threading.RLock()
+        self._load()
+        self._init_sync()
+
+    def _load(self):
+        base_vectors = np.zeros((0, self.dim), dtype=np.float32)
+        base_ids = np.zeros(0, dtype=np.int64)
+        base_hashes = np.zeros(0, dtype=f"S{HASH_LENGTH}")
+        arrays = load_arrays(self.path, ("vectors", "ids", "hashes"), mmap_names=("vectors",))
+        # Ignore a snapshot from a different dimension
+        if arrays is not None and arrays["vectors"].ndim == 2 and arrays["vectors"].shape[1] == self.dim:
+            base_vectors, base_ids, base_hashes = arrays["vectors"], arrays["ids"], arrays["hashes"]
+
+        self._base_vectors = base_vectors
+        self._base_ids = base_ids
+        self._base_live = np.ones(len(base_ids), dtype=bool)
+        self._base_rows = {int(article_id): row for row, article_id in enumerate(base_ids)}
+        self._hashes = {int(i): h.decode() for i, h in zip(base_ids, base_hashes)}
+        # id -> vector for rows added or changed since the last save
+        self._delta = {}
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def upsert(self, article_id, content_hash, content):
+        vector = embed(content, self.dim)
+        with self._lock:
+            row = self._base_rows.get(article_id)
+            if row is not None:
+                self._base_live[row] = False
+            self._delta[article_id] = vector
+            self._hashes[article_id] = (content_hash or "")[:HASH_LENGTH]
+
+    def remove(self, article_id):
+        with self._lock:
+            row = self._base_rows.get(article_id)
+            if row is not None:
+                self._base_live[row] = False
+            self._delta.pop(article_id, None)
+            self._hashes.pop(article_id, None)
+
+    def _index_rows(self, rows):
+        for article_id, content_hash, content in rows:
+            self.upsert(article_id, content_hash, content)
+
+    def _synced(self):
+        dead_rows = int((~self._base_live).sum())
+        if not len(self._base_ids) or max(len(self._delta), dead_rows) >= self.compact_rows:
+            self.save()
+
+    def most_similar(self, text, k=2, exclude_ids=()):
+        """Ids of the ``k`` indexed articles most similar to ``text`` (cosine), best first."""
+        query = embed(text, self.dim)
+        with self._lock:
+            delta_ids = np.fromiter(self._delta.keys(), dtype=np.int64, count=len(self._delta))
+            delta_vectors = np.stack(list(self._delta.values())) if self._delta else np.zeros((0, self.dim), dtype=np.float32)
+            live = self._base_live.copy()
+            base_vectors, base_ids = self._base_vectors, self._base_ids
+
+        ids = np.concatenate([base_ids[live], delta_ids])
+        # One matrix-vector product over the (memory-mapped) base plus the delta
+        scores = np.concatenate([np.asarray(base_vectors @ query)[live], delta_vectors @ query])
+        if exclude_ids:
+            scores[np.isin(ids, list(exclude_ids))] = -np.inf
+        if not len(ids):
+            return []
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [int(ids[i]) for i in top if np.isfinite(scores[i])]
+
+    def save(self):
+        """Fold the delta into a new on-disk snapshot and re-open it memory-mapped."""
+        with self._lock:
+            live = self._base_live
+            ids = np.concatenate([self._base_ids[live], np.fromiter(self._delta.keys(), dtype=np.int64, count=len(self._delta))])
+            vectors = np.concatenate([
+                np.asarray(self._base_vectors[live]),
+                np.stack(list(self._delta.values())) if self._delta else np.zeros((0, self.dim), dtype=np.float32),
+            ])
+            hashes = np.array([self._hashes[int(i)] for i in ids], dtype=f"S{HASH_LENGTH}")
+
+            save_arrays(self.path, {"vectors": vectors, "ids": ids, "hashes": hashes})
+            self._load()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SimilarityIndex(
+                    Config.SIMILARITY_INDEX_DIR,
+                    dim=Config.SIMILARITY_DIM,
+                    compact_rows=Config.SIMILARITY_COMPACT_ROWS,
+                )
+    return _index
+
+
+def similar_original_articles(article, k=2):
+    """The ``k`` original articles most similar to ``article``, most similar first.
+
+    Near-duplicate copies of the article are never returned: copies linked
+    to it are not indexed, and the original it is itself a copy of is
+    excluded.
+    """
+    index = get_similarity_index()
+    index.sync()
+    exclude = {article.id, getattr(article, "duplicate_of", None)} - {None}
+    ids = index.most_similar(article.content, k=k, exclude_ids=exclude)
+    if not ids:
+        return []
+    by_id = {a.id: a for a in Article.query.filter(Article.id.in_(ids))}
+    return [by_id[i] for i in ids if i in by_id]
@@ -0,0 +1,329 @@
+"""Request ids, timing spans and Prometheus-style metrics.
+
+A trace is opened per HTTP request (and per background rewrite job) and
+carries a request id. ``span(name)`` times a block of work: the duration
+always feeds the ``stage_duration_seconds`` histogram and, inside a trace,
+is collected so the whole request is logged as one JSON line with its
+spans when it finishes. Calls to external services also feed
+``dependency_duration_seconds``. ``render_metrics()`` returns everything
+in the Prometheus text format for the /metrics endpoint.
+"""
+
+import contextvars
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config import Config
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current = contextvars.ContextVar("trace", default=None)
+REQUEST_ID_RE = re.compile(r"^[\w.-]{1,64}$")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: dict(value, buckets=list(value["buckets"])) for key, value in self._series.items()}
+        for key, value in sorted(series.items()):
+            labels = list(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets, value["buckets"]):
+                lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', bound)])} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', '+Inf')])} {value['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {value['sum']:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {value['count']}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "stage_duration_seconds", "Time spent per pipeline stage (search, fetch_url, parse, llm, db_commit, ...)",
+    ("stage", "outcome"),
+)
+DEPENDENCY_SECONDS = Histogram(
+    "dependency_duration_seconds", "Latency of calls to external dependencies",
+    ("dependency", "outcome"),
+)
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Latency of API requests by endpoint",
+    ("method", "endpoint", "status"),
+)
+
+# Extra collectors (e.g. outbound HTTP counters) registered by other modules
+_collectors = []
+
+
+def register_collector(collector):
+    """``collector()`` returns Prometheus text lines appended to /metrics."""
+    _collectors.append(collector)
+
+
+def render_metrics():
+    lines = []
+    for histogram in (REQUEST_SECONDS, STAGE_SECONDS, DEPENDENCY_SECONDS):
+        lines.extend(histogram.render())
+    for collector in _collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
+
+
+def observe_dependency(dependency, seconds, outcome="ok"):
+    DEPENDENCY_SECONDS.observe(seconds, dependency=dependency, outcome=outcome)
+
+
+class Trace:
+    def __init__(self, request_id, name):
+        self.request_id = request_id
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        with self._lock:
+            self.spans.append(record)
+
+    def finish(self, **fields):
+        if not Config.TRACE_LOG:
+            return
+        record = {
+            "request_id": self.request_id,
+            "trace": self.name,
+            "ms": round((time.perf_counter() - self.started) * 1000, 1),
+            **fields,
+            "spans": self.spans,
+        }
+        print(json.dumps(record, default=str), flush=True)
+
+
+def new_request_id():
+    return uuid.uuid4().hex
+
+
+def current_request_id():
+    trace = _current.get()
+    return trace.request_id if trace else None
+
+
+def start_trace(request_id, name):
+    """Open a trace in the current context; returns (trace, token) for end_trace."""
+    trace = Trace(request_id, name)
+    return trace, _current.set(trace)
+
+
+def end_trace(trace, token, **fields):
+    try:
+        _current.reset(token)
+    except ValueError:
+        # Finished from another context, e.g. after a streamed response
+        _current.set(None)
+    trace.finish(**fields)
+
+
+@contextmanager
+def trace(request_id, name):
+    trace_, token = start_trace(request_id, name)
+    outcome = {"outcome": "ok"}
+    try:
+        yield trace_
+    except BaseException:
+        outcome["outcome"] = "error"
+        raise
+    finally:
+        end_trace(trace_, token, **outcome)
+
+
+def record_span(name, started, outcome="ok", dependency=None, **attrs):
+    """Record a finished span that began at ``started`` (a perf_counter value)."""
+    seconds = time.perf_counter() - started
+    STAGE_SECONDS.observe(seconds, stage=name, outcome=outcome)
+    if dependency:
+        observe_dependency(dependency, seconds, outcome)
+    trace_ = _current.get()
+    if trace_ is not None:
+        trace_.add({
+            "span": name,
+            "start_ms": round((started - trace_.started) * 1000, 1),
+            "ms": round(seconds * 1000, 1),
+            **({"outcome": outcome} if outcome != "ok" else {}),
+            **attrs,
+        })
+
+
+@contextmanager
+def span(name, dependency=None, **attrs):
+    """Time a block of work as a stage (and as a dependency call when ``dependency`` is set).
+
+    Yields the span's attribute dict so the block can add to it.
+    """
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield attrs
+    except BaseException as e:
+        outcome = "error"
+        attrs["error"] = f"{type(e).__name__}: {e}"[:200]
+        raise
+    finally:
+        record_span(name, started, outcome, dependency, **attrs)
+
+
+def traced(name):
+    """Decorator form of ``span`` for a whole function."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def copy_context_run(fn):
+    """Wrap ``fn`` to run in a copy of the caller's context, e.g. in a thread pool."""
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
+
+
+# Every database commit is a "db_commit" span
+@event.listens_for(Session, "before_commit")
+def _commit_started(session):
+    session.info["commit_started"] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_commit")
+def _commit_finished(session):
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        record_span("db_commit", started)
+
+
+@event.listens_for(Session, "after_rollback")
+def _commit_failed(session):
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        record_span("db_commit", started, outcome="error")
+
+
+class SamplingProfiler:
+    """Samples one thread's stack at a fixed interval into collapsed-stack counts.
+
+    The output (``frame;frame;frame count`` per line) can be fed straight to
+    flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def init_app(app):
+    """Trace every request: request id header, latency histogram, optional profiling."""
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_trace():
+        incoming = request.headers.get("X-Request-ID", "")
+        request_id = incoming if REQUEST_ID_RE.match(incoming) else new_request_id()
+        g.trace, g.trace_token = start_trace(request_id, f"{request.method} {request.path}")
+        g.profiler = None
+        if Config.PROFILING_ENABLED and (request.args.get("profile") == "1" or request.headers.get("X-Profile") == "1"):
+            g.profiler = SamplingProfiler(threading.get_ident(), Config.PROFILE_INTERVAL).start()
+
+    @app.after_request
+    def _finish_request_trace(response):
+        trace_ = g.get("trace")
+        if trace_ is None:
+            return response
+        response.headers["X-Request-ID"] = trace_.request_id
+        g.trace_status = response.status_code
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - trace_.started,
+            method=request.method, endpoint=endpoint, status=response.status_code,
+        )
+        profiler = g.get("profiler")
+        if profiler is not None:
+            profiler.stop()
+            # Clients only get an opaque id: not the server's path, and not
+            # the request id they may have chosen themselves
+            profile_id = uuid.uuid4().hex
+            os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+            with open(os.path.join(Config.PROFILE_DIR, f"{profile_id}.folded"), "w", encoding="utf-8") as f:
+                f.write(profiler.collapsed())
+            response.headers["X-Profile-ID"] = profile_id
+        return response
+
+    @app.teardown_request
+    def _log_request_trace(exc):
+        trace_ = g.pop("trace", None)
+        if trace_ is not None:
+            # Streamed responses end here, after their body has been sent
+            end_trace(trace_, g.pop("trace_token"), status=g.get("trace_status", 500))
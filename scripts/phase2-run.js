@@ -15,6 +15,8 @@
 //      - Scrapes the first 2 blog/article links
 //      - Calls the Cohere LLM to rewrite the content
 //      - Saves the updated article via the CRUD API
+//    The rewrite runs as a background job, so the script polls
+//    /rewrite/jobs/:jobId until it finishes.
 //
 // Usage:
 //   # Rewrite ALL original articles
@@ -39,11 +41,33 @@ async function fetchArticles() {
   return res.data;
 }
 
+const POLL_INTERVAL_MS = 2000;
+
 async function rewriteArticle(id) {
   const url = `${BACKEND_BASE_URL}/rewrite/${id}`;
   console.log(`[Phase2] Rewriting article id=${id} via: ${url}`);
   const res = await axios.post(url);
-  return res.data;
+  let job = res.data;
+  let lastStage = null;
+
+  // The rewrite runs as a background job; poll it until it finishes.
+  while (job.status !== "succeeded") {
+    if (job.status === "failed") {
+      throw new Error(job.error || "Rewrite job failed");
+    }
+    if (job.stage && job.stage !== lastStage) {
+      console.log(`[Phase2] Job ${job.id} stage: ${job.stage}`);
+      lastStage = job.stage;
+    }
+    await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+    const status = await axios.get(`${BACKEND_BASE_URL}/rewrite/jobs/${job.id}`);
+    job = status.data;
+  }
+
+  const article = await axios.get(
+    `${BACKEND_BASE_URL}/articles/${job.result_article_id}`,
+  );
+  return article.data;
 }
 
 async function main() {
@@ -50,6 +50,17 @@ export interface Article {
   references: string[];
 }
 
+export interface RewriteJob {
+  id: string;
+  article_id: number;
+  status: "queued" | "running" | "succeeded" | "failed";
+  stage: "search" | "fetch" | "rewrite" | "store" | null;
+  error: string | null;
+  result_article_id: number | null;
+}
+
+const REWRITE_POLL_INTERVAL_MS = 2000;
+
 // API functions
 export const fetchArticles = async (): Promise<Article[]> => {
   const response = await api.get<Article[]>("/articles/");
@@ -61,9 +72,20 @@ export const fetchArticleById = async (id: string | number): Promise<Article> =>
   return response.data;
 };
 
+// Rewrites run as background jobs: submit one, poll until it finishes,
+// then load the updated article it created.
 export const rewriteArticle = async (id: string | number): Promise<Article> => {
-  const response = await api.post<Article>(`/rewrite/${id}`);
-  return response.data;
+  const submitted = await api.post<RewriteJob>(`/rewrite/${id}`);
+  let job = submitted.data;
+  while (job.status !== "succeeded") {
+    if (job.status === "failed") {
+      throw new Error(job.error || "Failed to rewrite article");
+    }
+    await new Promise((resolve) => setTimeout(resolve, REWRITE_POLL_INTERVAL_MS));
+    const response = await api.get<RewriteJob>(`/rewrite/jobs/${job.id}`);
+    job = response.data;
+  }
+  return fetchArticleById(job.result_article_id as number);
 };
 
 export const scrapeArticles = async (): Promise<{ message: string; scraped: number; added: number; skipped: number }> => {